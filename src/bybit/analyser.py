@@ -1,10 +1,15 @@
 import datetime
 
+import numpy as np
+import pandas as pd
+
+from bybit.ticker import Ticker
+
 
 class Analyser:
     # TODO: Still not perfect (take history)
     @staticmethod
-    def get_gap(longTickers: dict, shortTickers: dict) -> dict:
+    def get_gap(longTickers: Ticker, shortTickers: Ticker, now: float | None = None) -> dict:
         """Get the gap between two future contracts with their tickers.
 
         WARNING: We suppose the longTickers is closer to delivery than shortTickers.
@@ -12,8 +17,9 @@ class Analyser:
         WARNING: Results in decimal form. Not in percentage.
 
         Args:
-            longTickers (dict): Tickers of the first future contract
-            shortTickers (dict): Tickers of the second future contract
+            longTickers (Ticker): Tickers of the first future contract
+            shortTickers (Ticker): Tickers of the second future contract
+            now (float | None): Epoch in seconds, defaults to the current time (give it when comparing many pairs)
 
         Return:
             dict:
@@ -26,15 +32,12 @@ class Analyser:
                 funding: The cumulative funding rate until the delivery (0 if not perpetual)
 
         """
-        # | Volume of the future contract
-        longVolume = float(longTickers["turnover24h"])
-        shortVolume = float(shortTickers["turnover24h"])
-        # - Cumulative volume
-        cumVolume = longVolume + shortVolume
+        # | Cumulative volume of the future contracts
+        cumVolume = longTickers.volume + shortTickers.volume
 
         # | Price of the future contract
-        longPrice = float(longTickers["lastPrice"])
-        shortPrice = float(shortTickers["lastPrice"])
+        longPrice = longTickers.last
+        shortPrice = shortTickers.last
         # - Calculate the gap
         gap = shortPrice - longPrice
         # - Calculate the coefficient
@@ -42,17 +45,16 @@ class Analyser:
         # - Calculate the return on investment
         roi = coeff - 0.0022
 
-        # | Time to delivery for the contracts, epoch in milliseconds (convert to seconds)
-        longDelivery = int(longTickers["deliveryTime"]) / 1000
-        shortDelivery = int(shortTickers["deliveryTime"]) / 1000
-        todayDate = datetime.datetime.now(datetime.UTC).timestamp()
+        # | Time to delivery for the contracts, epoch in seconds
+        if now is None:
+            now = datetime.datetime.now(datetime.UTC).timestamp()
         # - Time to delivery
         # Sometimes, its a perpetual contract, so we need to check if the delivery time is 0
-        maximumTime = longDelivery if longDelivery != 0 else shortDelivery
-        daysLeft = (maximumTime - todayDate) / 86400 + 1
+        maximumTime = longTickers.delivery if longTickers.delivery != 0 else shortTickers.delivery
+        daysLeft = (maximumTime - now) / 86400 + 1
 
         # | Cumulate funding rate until the delivery
-        funding = float(longTickers.get("fundingRate", 0)) * (int((maximumTime - todayDate) / (8 * 3600)) - 1)
+        funding = longTickers.funding * (int((maximumTime - now) / (8 * 3600)) - 1)
 
         apr = roi * 365 / daysLeft if daysLeft != 0 else 0
         return {
@@ -66,7 +68,127 @@ class Analyser:
         }
 
     @staticmethod
-    def position_calculator(ticker: str, side: str, quantityUSDC: float, leverage: int = 1) -> dict:
+    def ticker_arrays(tickers: list[Ticker]) -> dict:
+        """Gather the fields used by the gaps into arrays, one value per ticker.
+
+        Args:
+            tickers (list[Ticker]): Tickers of the contracts
+
+        Return:
+            dict: price, volume (turnover24h), delivery (epoch in seconds, 0 if none) and funding arrays
+
+        """
+        return {
+            "price": np.array([t.last for t in tickers], dtype=np.float64),
+            "volume": np.array([t.volume for t in tickers], dtype=np.float64),
+            "delivery": np.array([t.delivery for t in tickers], dtype=np.float64),
+            "funding": np.array([t.funding for t in tickers], dtype=np.float64),
+        }
+
+    @staticmethod
+    def gap_arrays(long: dict, short: dict, now: float) -> dict:
+        """Get the gaps of every long x short pair from ticker arrays (see ticker_arrays).
+
+        Args:
+            long (dict): Ticker arrays of the contracts to buy (rows)
+            short (dict): Ticker arrays of the contracts to sell (columns)
+            now (float): Epoch in seconds
+
+        Return:
+            dict: The same keys as get_gap, each a (len(long), len(short)) array
+
+        """
+        longPrice = long["price"][:, None]
+        shortPrice = short["price"][None, :]
+        longDelivery = long["delivery"][:, None]
+        shortDelivery = short["delivery"][None, :]
+
+        gap = shortPrice - longPrice
+        coeff = np.round(shortPrice / longPrice - 1, 3)
+        roi = coeff - 0.0022
+
+        # Perpetuals and spots have no delivery time, the other contract gives it
+        maximumTime = np.where(longDelivery != 0, longDelivery, shortDelivery)
+        daysLeft = (maximumTime - now) / 86400 + 1
+        funding = long["funding"][:, None] * (np.trunc((maximumTime - now) / (8 * 3600)) - 1)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            apr = np.where(daysLeft != 0, roi * 365 / daysLeft, 0)
+
+        return {
+            "gap": gap,
+            "coeff": coeff,
+            "roi": roi,
+            "apr": apr,
+            "cumFunding": funding,
+            "cumVolume": long["volume"][:, None] + short["volume"][None, :],
+            "daysLeft": daysLeft,
+        }
+
+    @staticmethod
+    def gap_matrix(longTickers: list[Ticker], shortTickers: list[Ticker], now: float | None = None) -> dict:
+        """Get the gaps of every long x short pair at once, like get_gap but with array operations.
+
+        WARNING: Results in decimal form. Not in percentage.
+
+        Args:
+            longTickers (list[Ticker]): Tickers of the contracts to buy
+            shortTickers (list[Ticker]): Tickers of the contracts to sell
+            now (float | None): Epoch in seconds, defaults to the current time
+
+        Return:
+            dict: The same keys as get_gap, each a (len(longTickers), len(shortTickers)) array
+
+        """
+        if now is None:
+            now = datetime.datetime.now(datetime.UTC).timestamp()
+        return Analyser.gap_arrays(Analyser.ticker_arrays(longTickers), Analyser.ticker_arrays(shortTickers), now)
+
+    @staticmethod
+    def gap_frame(longSymbols: list[str], shortSymbols: list[str], gaps: dict, **extra: np.ndarray) -> pd.DataFrame:
+        """Flatten a gap matrix into the table of all_gaps_pd, row by row, sorted by DaysLeft.
+
+        Args:
+            longSymbols (list[str]): The symbols of the rows
+            shortSymbols (list[str]): The symbols of the columns
+            gaps (dict): The gap matrix (see gap_arrays)
+            extra (np.ndarray): More columns, each a (len(longSymbols), len(shortSymbols)) array
+
+        """
+        # Define the column types
+        column_types = {
+            "Buy": "string",
+            "Sell": "string",
+            "Gap": "float",
+            "Coeff": "float",
+            "ROI": "float",
+            "APR": "float",
+            "CumFundingRate": "float",
+            "CumVolume": "int",
+            "DaysLeft": "int",
+        }
+
+        df_gaps = pd.DataFrame(
+            {
+                "Buy": np.repeat(longSymbols, len(shortSymbols)),
+                "Sell": np.tile(shortSymbols, len(longSymbols)),
+                "Gap": gaps["gap"].ravel(),
+                "Coeff": gaps["coeff"].ravel(),
+                "ROI": gaps["roi"].ravel(),
+                "APR": gaps["apr"].ravel(),
+                "CumFundingRate": gaps["cumFunding"].ravel(),
+                "CumVolume": gaps["cumVolume"].ravel(),
+                "DaysLeft": np.maximum(0, np.trunc(gaps["daysLeft"].ravel())),
+            }
+        ).astype(column_types)
+        for name, values in extra.items():
+            df_gaps[name] = values.ravel()
+
+        # Sort by DaysLeft
+        return df_gaps.sort_values(by="DaysLeft", kind="stable").reset_index(drop=True)
+
+    @staticmethod
+    def position_calculator(ticker: Ticker, side: str, quantityUSDC: float, leverage: int = 1) -> dict:
         """Check information about a position before entering it.
 
         User submits a USDC quantity, and we calculate the amount of contracts to buy/sell.
@@ -76,7 +198,7 @@ class Analyser:
         Source for calculations: https://www.bybit.com/en/help-center/article/Order-Cost-USDT-ContractUSDT_Perpetual_Contract
 
         Args:
-            ticker (str): The future contract to enter a position on
+            ticker (Ticker): Tickers of the future contract to enter a position on
             side (str): Either "Buy" or "Sell"
             quantityUSDC (float | int): Price in USDC of contracts to buy/sell
             leverage (int): The leverage to use
@@ -89,7 +211,7 @@ class Analyser:
         # We could use the marketUnit parameter to "quoteCoin", but we want to control the quantity
 
         # Retrieve last price
-        orderPrice = float(ticker["lastPrice"])
+        orderPrice = ticker.last
         # Taker fees are 0.055%
         takerFees = 0.00055
         # Calculate the quantity of contracts to Buy/Sell and floor round to 3 decimals
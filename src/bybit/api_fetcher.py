@@ -1,16 +1,24 @@
 import asyncio
+import datetime
 import logging
 import sys
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 from beartype import beartype
 from pybit.exceptions import InvalidRequestError
-from pybit.unified_trading import HTTP, WebSocket
+from pybit.unified_trading import HTTP
 
 # Custom imports
 from bybit.analyser import Analyser
-from bybit.utils import get_epoch, load_klines_parquet, save_klines_parquet
+from bybit.instruments import InstrumentRegistry
+from bybit.scheduler import Priority, RequestScheduler
+from bybit.sockets import WebSocketManager
+from bybit.store import BASE_INTERVAL, FundingStore, KlineStore
+from bybit.ticker import Ticker
+from bybit.transport import AsyncHTTP
+from bybit.utils import INTERVALS_MS, KLINE_COLUMNS, KlineAccumulator, get_epoch
 
 sys.path.append(str(Path("keys.py").resolve().parent))
 
@@ -21,62 +29,70 @@ except ImportError:
 
 # Constants
 PERPETUALS = ["BTCUSDT", "BTCPERP", "BTCUSD", "ETHUSDT", "ETHPERP", "ETHUSD"]
+# Maximum number of funding rates per request
+FUNDING_PAGE = 200
+# Key given to a local server (see MockExchange)
+MOCK_KEY = "mock"
 
 
 class Fetcher:
-    __slots__ = ["logger", "session", "ws", "ws_spot"]
+    __slots__ = ["async_session", "instruments", "logger", "scheduler", "session", "sockets"]
 
     @beartype
-    def __init__(self, demo: bool = False) -> None:
+    def __init__(self, demo: bool = False, endpoint: str | None = None) -> None:
         """Initialize the Bybit session.
 
         Args:
             demo (bool): If True, will use the demo keys
+            endpoint (str | None): Base URL of a Bybit compatible server (e.g. a MockExchange) instead of Bybit,
+                its WebSockets are served on the same host. No keys are needed
 
         Defines:
-            - session (HTTP): The HTTP session
+            - session (HTTP): The HTTP session, for synchronous calls
+            - async_session (AsyncHTTP): The asynchronous HTTP session, used by every async method
+            - scheduler (RequestScheduler): Rate limits and priorities of every asynchronous request
+            - instruments (InstrumentRegistry): Cached metadata of every instrument
+            - sockets (WebSocketManager): One long-lived WebSocket per channel, shared by the subscribers
             - logger (logging.Logger): Logger for the fetcher
 
         """
-        if demo:
-            self.session = HTTP(api_key=keys.demobybitPKey, api_secret=keys.demobybitSKey, demo=True)
-        else:
-            self.session = HTTP(api_key=keys.bybitPKey, api_secret=keys.bybitSKey)
-
-        self.ws = None
-        # TODO: In the future, have a dictionary of WebSocket sessions
-        self.ws_spot = None
+        self.scheduler = RequestScheduler()
 
-        self.logger = logging.getLogger("greekMaster.client.fetcher")
+        if endpoint:
+            # A local server accepts any key
+            apiKey, apiSecret = MOCK_KEY, MOCK_KEY
+        elif demo:
+            apiKey, apiSecret = keys.demobybitPKey, keys.demobybitSKey
+        else:
+            apiKey, apiSecret = keys.bybitPKey, keys.bybitSKey
 
-    def start_linear_ws(self) -> None:
-        """Start the WebSocket session for linear contracts."""
-        self.ws = WebSocket(
-            api_key=keys.demobybitPKey,
-            api_secret=keys.demobybitSKey,
-            testnet=False,
-            channel_type="linear",
-            ping_interval=5,
-            ping_timeout=4,
+        self.session = HTTP(api_key=apiKey, api_secret=apiSecret, demo=demo)
+        if endpoint:
+            self.session.endpoint = endpoint
+        self.async_session = AsyncHTTP(
+            api_key=apiKey, api_secret=apiSecret, demo=demo, endpoint=endpoint, scheduler=self.scheduler
+        )
+        self.sockets = WebSocketManager(
+            api_key=apiKey,
+            api_secret=apiSecret,
+            demo=demo,
+            endpoint=endpoint.replace("http", "ws", 1) if endpoint else None,
         )
 
-    def start_spot_ws(self) -> None:
-        """Start the WebSocket session for spot contracts."""
-        self.ws_spot = WebSocket(
-            api_key=keys.demobybitPKey,
-            api_secret=keys.demobybitSKey,
-            testnet=False,
-            channel_type="spot",
-            ping_interval=5,
-            ping_timeout=4,
+        # The snapshot holds the instruments of Bybit, the ones of a local server stay in memory
+        self.instruments = (
+            InstrumentRegistry(self.session, snapshot=None) if endpoint else InstrumentRegistry(self.session)
         )
 
+        self.logger = logging.getLogger("greekMaster.client.fetcher")
+
     def close_websockets(self) -> None:
         """Close the WebSocket sessions."""
-        for ws in [self.ws, self.ws_spot]:
-            if ws:
-                ws.exit()
-                self.logger.info("WebSocket closed")
+        self.sockets.close()
+
+    async def close(self) -> None:
+        """Close the pooled HTTP connections."""
+        await self.async_session.close()
 
     def get_wallet(self) -> dict:
         """Give information on BTC, USDC, USDT in UNIFIED account.
@@ -116,25 +132,29 @@ class Fetcher:
             "USDT": get_info(usdtDict),
         }
 
-    async def get_funding_rates(self, klines_df: pd.DataFrame, product: str) -> pd.DataFrame:
+    async def get_funding_rates(
+        self, klines_df: pd.DataFrame, product: str, store: FundingStore | None = None
+    ) -> pd.DataFrame:
         """Associate the funding rate of a contract to each kline.
 
         This function fetches all required funding rates by paginating through
         Bybit's API until all klines are covered.
+        With a store, only the funding rates settled since the last update are fetched (and the ones
+        older than the stored history, if the klines go further back), then saved.
 
         Args:
             klines_df (pd.DataFrame): The DataFrame containing the klines.
             product (str): The product to get the funding rates from.
+            store (FundingStore | None): The funding history of the product.
 
         Returns:
             pd.DataFrame: The DataFrame with the funding rates.
 
         """
-        end_time = klines_df["startTime"].max()  # Newest timestamp in klines
         limit = klines_df["startTime"].min()  # Oldest timestamp in klines
 
-        # Start with the current fundingRate
-        current_funding = self.session.get_tickers(symbol=product, category="linear")["result"]["list"]
+        # Start with the current fundingRate, it is a prediction so it is never stored
+        current_funding = (await self.async_session.get_tickers(symbol=product, category="linear"))["result"]["list"]
 
         current_funding_df = pd.DataFrame(current_funding)
         # Remove a 7 hours, 59 minutes and 50 seconds in epoch milliseconds
@@ -146,39 +166,21 @@ class Fetcher:
         if "fundingRate" in klines_df.columns:
             klines_df = klines_df.rename(columns={"fundingRate": "existingFundingRate"})
 
-        while True:
-            # Query funding rate history
-            params = {
-                "category": "linear",
-                "symbol": product,
-                "endTime": end_time,
-            }
-            response = self.session.get_funding_rate_history(**params)["result"]["list"]
-
-            self.logger.info(f"Fetched {len(response)} new funding rate data points.")
-
-            if not response:  # No more data
-                break
-
-            # Convert to DataFrame and append
-            df_funding = pd.DataFrame(response)[["fundingRateTimestamp", "fundingRate"]]
-            df_funding["fundingRateTimestamp"] = df_funding["fundingRateTimestamp"].astype(int)
-            df_funding["fundingRate"] = df_funding["fundingRate"].astype(float)
-            funding_data.append(df_funding)
-
-            # Update start_time for the next batch (use last timestamp)
-            end_time = df_funding["fundingRateTimestamp"].min()
-
-            # If last funding rate is beyond the max kline timestamp, stop
-            if end_time < limit:
-                break
-
-            await asyncio.sleep(0.1)
-
-        # Combine all funding data
-        if not funding_data:
-            msg = "No funding rate data found."
-            raise ValueError(msg)
+        bounds = store.bounds(product) if store is not None else None
+        if bounds is None:
+            fetched = await self._get_funding_pages(product, None, limit)
+        else:
+            oldest, newest = bounds
+            # The tail settled since the last update
+            fetched = await self._get_funding_pages(product, None, newest)
+            # The head, if the klines go further back than the stored history
+            if limit < oldest:
+                fetched += await self._get_funding_pages(product, oldest - 1, limit)
+
+        if store is not None:
+            funding_data.append(store.append(product, pd.concat(fetched) if fetched else funding_data[0].iloc[:0]))
+        else:
+            funding_data.extend(fetched)
 
         df_funding_final = pd.concat(funding_data).sort_values("fundingRateTimestamp")
 
@@ -200,15 +202,58 @@ class Fetcher:
 
         return df_merged
 
+    async def _get_funding_pages(self, product: str, end_time: int | None, stop: int) -> list[pd.DataFrame]:
+        """Page the funding rate history backward, from end_time (or now) until stop.
+
+        Args:
+            product (str): The perpetual
+            end_time (int | None): Newest fundingRateTimestamp to fetch, None for now
+            stop (int): The paging stops once a funding rate at or before stop is fetched
+        Returns:
+            list[pd.DataFrame]: One DataFrame per page (fundingRateTimestamp, fundingRate)
+
+        Link: https://bybit-exchange.github.io/docs/v5/market/history-fund-rate
+
+        """
+        pages = []
+        while True:
+            # Query funding rate history
+            params = {"category": "linear", "symbol": product, "limit": FUNDING_PAGE}
+            if end_time is not None:
+                params["endTime"] = end_time
+            response = await self.async_session.get_funding_rate_history(priority=Priority.BACKFILL, **params)
+            response = response["result"]["list"]
+
+            self.logger.info(f"Fetched {len(response)} new funding rate data points.")
+
+            if not response:  # No more data
+                break
+
+            # Convert to DataFrame and append
+            df_funding = pd.DataFrame(response)[["fundingRateTimestamp", "fundingRate"]]
+            df_funding["fundingRateTimestamp"] = df_funding["fundingRateTimestamp"].astype(int)
+            df_funding["fundingRate"] = df_funding["fundingRate"].astype(float)
+            pages.append(df_funding)
+
+            # The next page ends right before the oldest funding rate of this one
+            end_time = int(df_funding["fundingRateTimestamp"].min()) - 1
+
+            # A short page is the first funding rate of the contract
+            if len(response) < FUNDING_PAGE or end_time < stop:
+                break
+
+        return pages
+
     # TODO: Add a verbose parameter
     @beartype
-    async def get_history_pd(
+    async def get_history_pd(  # noqa: PLR0913
         self,
         product: str,
         interval: str = "m",
         dateLimit: str = "01/01/2024",
         category: str = "linear",
         dest: str | None = None,
+        parallel: bool = False,
     ) -> pd.DataFrame:
         """Get the history of a future product until dateLimit.
 
@@ -217,6 +262,8 @@ class Fetcher:
         We do it this way, because we cannot know when the product started
         Also, when a product has no more klines, it will not throw an error
 
+        With parallel, the range is split in windows of 1000 candles fetched concurrently instead (see _get_windows).
+
         Warning: the last candle will not be at dateLimit, but a little after it
 
         Link: https://bybit-exchange.github.io/docs/v5/market/kline
@@ -225,38 +272,33 @@ class Fetcher:
             interval (str): The interval of the data
             dateLimit (str): The last date of fetched data
             category (str): The category of the product
-            dest (str | None): The destination folder to save the data
+            dest (str | None): The root of the kline store (see KlineStore)
+            parallel (bool): If True, fetch independent time windows concurrently
         Returns:
-            A DataFrame containing the accumulated data
+            A DataFrame containing the newly fetched data (the full history is in the store)
         """
-        file_name = f"{product}_{interval}"
-        if category == "spot":
-            file_name += "_spot.parquet"
-        else:
-            file_name += ".parquet"
-
-        if dest:
-            file_name = Path(dest) / file_name
-
+        store = KlineStore(dest or ".")
         dateLimit = get_epoch(dateLimit)
 
+        # Histories saved before the store existed are imported once
+        legacy = store.root / f"{product}_{interval}{'_spot' if category == 'spot' else ''}.parquet"
+        if store.bounds(product, interval, category) is None and legacy.is_file():
+            store.import_file(legacy, product, interval, category)
+
         ORANGE = "\033[38;5;214m"
         RESET = "\033[0m"
         self.logger.info(f"Fetching data for {ORANGE}{product}{RESET} in {ORANGE}{interval}{RESET} interval.")
-        try:
-            acc_data = load_klines_parquet(file_name)
-            self.logger.info(f"Loaded {len(acc_data)} existing data points.")
-            timestamp_key = "start"
-            timestamp = acc_data.iloc[0]["startTime"]
 
-        except FileNotFoundError:
-            # Initialize an empty DataFrame for accumulated data
-            acc_data = pd.DataFrame(
-                columns=["startTime", "openPrice", "highPrice", "lowPrice", "closePrice", "volume", "turnover"],
-            )
+        # The bounds come from the manifest, no kline is read
+        bounds = store.bounds(product, interval, category)
+        if bounds is not None:
+            oldest, timestamp = bounds
+            self.logger.info(f"Existing data from {oldest} to {timestamp}.")
+            timestamp_key = "start"
+        else:
             self.logger.info("No previous data found, starting fresh.")
+            oldest = timestamp = None
             timestamp_key = "end"
-            timestamp = None
 
         params = {
             "symbol": product,
@@ -265,34 +307,15 @@ class Fetcher:
             "limit": 1000,
         }
 
-        while True:
-            if timestamp:
-                params[timestamp_key] = timestamp
-
-            response = self.session.get_kline(**params)["result"]["list"]
-            new_data = pd.DataFrame(
-                response,
-                columns=["startTime", "openPrice", "highPrice", "lowPrice", "closePrice", "volume", "turnover"],
-            )
-
-            self.logger.info(f"Fetched {len(new_data)} new data points.")
-
-            if timestamp_key == "start":
-                acc_data = pd.concat([new_data, acc_data.iloc[1:]], ignore_index=True)
-            else:
-                acc_data = pd.concat([acc_data.iloc[:-1], new_data], ignore_index=True)
-
-            numberCandles = len(new_data)
-            if numberCandles > 0:
-                timestamp = (
-                    acc_data.iloc[0]["startTime"] if timestamp_key == "start" else acc_data.iloc[-1]["startTime"]
-                )
-
-            if numberCandles < 1000 or int(acc_data.iloc[-1]["startTime"]) < dateLimit:
-                break
+        if parallel and interval in INTERVALS_MS:
+            # Newest candle we have, or the first one we want
+            start = timestamp or max(dateLimit, await self.get_listing_date(product, category))
+            new_data = await self._get_windows(params, start)
+        else:
+            new_data = await self._get_pages(params, timestamp_key, timestamp, oldest, dateLimit)
 
         # Affect types
-        acc_data = acc_data.astype(
+        new_data = new_data.astype(
             {
                 "startTime": "int",
                 "openPrice": "float",
@@ -304,12 +327,113 @@ class Fetcher:
             }
         )
 
-        if product in PERPETUALS:
-            acc_data = await self.get_funding_rates(klines_df=acc_data, product=product)
+        if product in PERPETUALS and not new_data.empty:
+            new_data = await self.get_funding_rates(klines_df=new_data, product=product, store=FundingStore(store.root))
+
+        # Only the months touched by the new candles are written
+        store.append(product, interval, new_data, category)
+        return new_data
+
+    @beartype
+    async def get_listing_date(self, product: str, category: str = "linear") -> int:
+        """Find when a product got its first candle.
 
-        if not acc_data.empty:
-            save_klines_parquet(file_name, acc_data)
-        return acc_data
+        The instruments endpoint does not list expired contracts, so we probe the klines instead:
+        the oldest monthly candle gives the month, then the oldest daily candle of that month gives the day.
+
+        Args:
+            product (str): The product to look for
+            category (str): The category of the product
+        Returns:
+            int: Epoch in milliseconds of the first day of trading (0 if there is no candle)
+
+        """
+        params = {"symbol": product, "category": category, "start": 0, "limit": 1000}
+
+        months = await self.async_session.get_kline(interval="M", priority=Priority.BACKFILL, **params)
+        if not months["result"]["list"]:
+            return 0
+        params["start"] = int(months["result"]["list"][-1][0])
+        params["end"] = params["start"] + 32 * INTERVALS_MS["D"]
+
+        days = await self.async_session.get_kline(interval="D", priority=Priority.BACKFILL, **params)
+        return int(days["result"]["list"][-1][0]) if days["result"]["list"] else params["start"]
+
+    async def _get_pages(
+        self, params: dict, timestamp_key: str, timestamp: int | None, oldest: int | None, dateLimit: int
+    ) -> pd.DataFrame:
+        """Fetch the klines one page of 1000 candles at a time, each cursor depends on the previous page.
+
+        Args:
+            params (dict): The kline parameters (symbol, category, interval, limit)
+            timestamp_key (str): "start" to fetch after the newest candle, "end" to fetch before the oldest
+            timestamp (int | None): The first cursor
+            oldest (int | None): The oldest existing startTime
+            dateLimit (int): Epoch in milliseconds of the oldest candle to fetch
+        Returns:
+            pd.DataFrame: The fetched klines, newest first
+
+        """
+        accumulator = KlineAccumulator()
+
+        while True:
+            if timestamp:
+                params[timestamp_key] = timestamp
+
+            response = (await self.async_session.get_kline(priority=Priority.BACKFILL, **params))["result"]["list"]
+            accumulator.add(response)
+
+            self.logger.info(f"Fetched {len(response)} new data points.")
+
+            numberCandles = len(response)
+            if numberCandles > 0:
+                # Pages are newest first
+                timestamp = int(response[0][0]) if timestamp_key == "start" else int(response[-1][0])
+                oldest = accumulator.oldest if oldest is None else min(oldest, accumulator.oldest)
+
+            if numberCandles < 1000 or (oldest is not None and oldest < dateLimit):
+                break
+
+        return accumulator.to_frame()
+
+    async def _get_windows(
+        self, params: dict, start: int, end: int | None = None, empty: list | None = None
+    ) -> pd.DataFrame:
+        """Fetch the klines from start until end, with one concurrent request per window of 1000 candles.
+
+        The windows do not depend on each other, so the scheduler runs them as fast as the rate limit allows.
+
+        Args:
+            params (dict): The kline parameters (symbol, category, interval, limit)
+            start (int): Epoch in milliseconds of the first candle
+            end (int | None): Epoch in milliseconds of the last candle, now if None
+            empty (list | None): Filled with the (start, end) of the windows the exchange has no candle for
+        Returns:
+            pd.DataFrame: The klines, newest first
+
+        """
+        step = INTERVALS_MS[params["interval"]] * params["limit"]
+        end = int(datetime.datetime.now(datetime.UTC).timestamp() * 1000) if end is None else end
+        windows = range(start - start % INTERVALS_MS[params["interval"]], end + 1, step)
+
+        self.logger.info(f"Fetching {len(windows)} windows concurrently.")
+
+        async def _fetch_window(windowStart: int) -> list:
+            windowEnd = min(windowStart + step - 1, end)
+            response = await self.async_session.get_kline(
+                start=windowStart, end=windowEnd, priority=Priority.BACKFILL, **params
+            )
+            page = response["result"]["list"]
+            if not page and empty is not None:
+                empty.append((windowStart, windowEnd))
+            return page
+
+        accumulator = KlineAccumulator()
+        for page in await asyncio.gather(*[_fetch_window(windowStart) for windowStart in windows]):
+            accumulator.add(page)
+
+        self.logger.info(f"Fetched {len(accumulator)} new data points.")
+        return accumulator.to_frame()
 
     # TODO: Add inverse contracts file handling
     @beartype
@@ -321,10 +445,13 @@ class Fetcher:
         spot: bool = True,
         perpetual: bool = True,
         inverse: bool = True,
+        parallel: bool = False,
     ) -> None:
         """Save the klines of all the Perpetual/Future/Inverse contracts in parquet format.
 
-        Checks if a parquet file exists to update it, else creates a new one
+        Each history is a dataset of the kline store in dest, only the new candles are fetched and written
+        All the histories are fetched concurrently, the scheduler keeps them under the rate limits
+        Only the 1-minute klines are downloaded, the larger intervals are resampled from them (see KlineStore.resample)
 
         Args:
             coin (str): The coin to consider (e.g., "BTC").
@@ -333,38 +460,162 @@ class Fetcher:
             spot (bool): Include spot contracts.
             perpetual (bool): Include perpetual contracts.
             inverse (bool): Include inverse contracts.
+            parallel (bool): Fetch each history with concurrent time windows.
 
         """
         allContracts = self.get_linearNames(inverse=inverse, perpetual=perpetual, coin=coin)
 
         # Combine perpetual and future contracts
         allContracts = allContracts["perpetual"] + allContracts["future"]
-
-        async def _fetch_history(contract: str, interval: str, category: str = "linear") -> None:
-            await self.get_history_pd(
-                product=contract, dateLimit=datelimit, interval=interval, dest=dest, category=category
+        store = KlineStore(dest)
+
+        async def _fetch_history(contract: str, category: str = "linear") -> None:
+            new_data = await self.get_history_pd(
+                product=contract,
+                dateLimit=datelimit,
+                interval=BASE_INTERVAL,
+                dest=dest,
+                category=category,
+                parallel=parallel,
             )
+            if not new_data.empty:
+                # Parquet work, off the loop
+                await asyncio.to_thread(
+                    store.resample,
+                    contract,
+                    int(new_data["startTime"].min()),
+                    int(new_data["startTime"].max()),
+                    category,
+                )
 
-        tasks = []
-
-        for contract in allContracts:
-            tasks.extend(
-                [_fetch_history(contract, "15"), _fetch_history(contract, "5"), _fetch_history(contract, "1")],
-            )
+        tasks = [_fetch_history(contract) for contract in allContracts]
 
         # spot
         if spot:
-            tasks.extend(
-                [
-                    _fetch_history(f"{coin}USDT", "15", category="spot"),
-                    _fetch_history(f"{coin}USDT", "5", category="spot"),
-                    _fetch_history(f"{coin}USDT", "1", category="spot"),
-                ],
-            )
+            tasks.append(_fetch_history(f"{coin}USDT", category="spot"))
 
-        # TODO: This code will wait for other tasks, because we use I/O bound tasks
         await asyncio.gather(*tasks)
 
+    async def check_resampled(
+        self, product: str, interval: str, category: str = "linear", dest: str = "store", samples: int = 3
+    ) -> pd.DataFrame:
+        """Compare resampled klines with the ones of the exchange, on a few random pages of the stored range.
+
+        Args:
+            product (str): The product of the klines
+            interval (str): The resampled interval
+            category (str): The category of the product
+            dest (str): The root of the kline store
+            samples (int): Number of pages of 200 candles to download
+        Returns:
+            pd.DataFrame: The differing candles, stored values suffixed with _store and downloaded ones with _exchange
+
+        """
+        store = KlineStore(dest)
+        bounds = store.bounds(product, interval, category)
+        if bounds is None:
+            msg = f"No {interval} klines of {product} in {dest}"
+            raise FileNotFoundError(msg)
+
+        size = INTERVALS_MS[interval]
+        rng = np.random.default_rng()
+        # The newest candle may still be open on either side
+        first, last = bounds[0] // size, max(bounds[0] // size, bounds[1] // size - 200)
+        starts = rng.integers(first, last, samples, endpoint=True)
+
+        async def _fetch_page(start: int) -> list:
+            response = await self.async_session.get_kline(
+                symbol=product,
+                category=category,
+                interval=interval,
+                start=start * size,
+                end=(start + 199) * size,
+                limit=200,
+                priority=Priority.BACKFILL,
+            )
+            return response["result"]["list"]
+
+        accumulator = KlineAccumulator()
+        for page in await asyncio.gather(*[_fetch_page(int(start)) for start in starts]):
+            accumulator.add(page)
+        exchange = accumulator.to_frame()
+        stored = store.load(product, interval, category, start=int(starts.min()) * size, columns=KLINE_COLUMNS[1:])
+
+        merged = exchange.merge(stored, on="startTime", suffixes=("_exchange", "_store"))
+        merged = merged[merged["startTime"] < bounds[1]]
+        # Sums of floats, not of decimals
+        differing = np.zeros(len(merged), dtype=bool)
+        for column in KLINE_COLUMNS[1:]:
+            differing |= ~np.isclose(merged[f"{column}_store"], merged[f"{column}_exchange"], rtol=1e-9)
+
+        self.logger.info(f"Compared {len(merged)} {interval} candles of {product}, {differing.sum()} differ.")
+        return merged[differing].reset_index(drop=True)
+
+    async def repair_history(
+        self, product: str, interval: str = BASE_INTERVAL, category: str = "linear", dest: str = "store"
+    ) -> pd.DataFrame:
+        """Fetch the candles missing inside a stored history (see KlineStore.holes).
+
+        All the holes are fetched concurrently, in windows of 1000 candles, and written in their partitions.
+        What is still missing afterwards is marked as empty, and not fetched again, only where the exchange answered
+        with no candle at all. A short page (e.g. a failing request) is not proof, its hole is asked again next time.
+        The larger intervals are resampled over the repaired range.
+
+        Args:
+            product (str): The product of the klines
+            interval (str): The interval of the klines
+            category (str): The category of the product
+            dest (str): The root of the kline store
+        Returns:
+            pd.DataFrame: The holes (start, end, candles) and the number of candles fetched for each (repaired)
+
+        """
+        store = KlineStore(dest)
+        holes = await asyncio.to_thread(store.holes, product, interval, category)
+        holes["repaired"] = 0
+        if holes.empty:
+            return holes
+
+        self.logger.info(f"Repairing {holes['candles'].sum()} candles of {product} in {len(holes)} holes.")
+        params = {"symbol": product, "category": category, "interval": interval, "limit": 1000}
+        empty: list[tuple[int, int]] = []
+        pages = await asyncio.gather(
+            *[self._get_windows(params, int(hole.start), int(hole.end), empty) for hole in holes.itertuples()]
+        )
+        new_data = pd.concat(pages, ignore_index=True)
+
+        startTime = np.sort(new_data["startTime"].to_numpy(np.int64))
+        after = np.searchsorted(startTime, holes["end"].to_numpy(), side="right")
+        holes["repaired"] = after - np.searchsorted(startTime, holes["start"].to_numpy())
+
+        if not new_data.empty:
+            if product in PERPETUALS:
+                new_data = await self.get_funding_rates(
+                    klines_df=new_data, product=product, store=FundingStore(store.root)
+                )
+            await asyncio.to_thread(store.append, product, interval, new_data, category)
+            if interval == BASE_INTERVAL:
+                await asyncio.to_thread(store.resample, product, int(startTime[0]), int(startTime[-1]), category)
+
+        # The holes can only shrink, the remaining ones inside windows answered empty do not exist on the exchange
+        remaining = await asyncio.to_thread(store.holes, product, interval, category)
+        spans: list[list[int]] = []
+        for first, last in sorted(empty):
+            if spans and first <= spans[-1][1] + INTERVALS_MS[interval]:
+                spans[-1][1] = max(spans[-1][1], last)
+            else:
+                spans.append([first, last])
+        spans = np.array(spans, dtype=np.int64).reshape(-1, 2)
+        first, last = remaining["start"].to_numpy()[:, None], remaining["end"].to_numpy()[:, None]
+        confirmed = remaining[((first >= spans[:, 0]) & (last <= spans[:, 1])).any(axis=1)]
+        store.mark_empty(product, interval, confirmed[["start", "end"]].to_numpy().tolist(), category)
+
+        self.logger.info(
+            f"Repaired {holes['repaired'].sum()} candles, {confirmed['candles'].sum()} do not exist, "
+            f"{remaining['candles'].sum() - confirmed['candles'].sum()} will be asked again."
+        )
+        return holes
+
     # TODO: Maybe add error handling for the case where the contract does not exist
     @beartype
     def get_spot(self, coin: str = "BTC") -> list:
@@ -376,13 +627,7 @@ class Fetcher:
             list: List of all the products
 
         """
-        markets = []
-        pair = self.session.get_instruments_info(symbol=f"{coin}USDT", category="spot")["result"]["list"][0]
-        markets.append(pair)
-        pair = self.session.get_instruments_info(symbol=f"{coin}USDC", category="spot")["result"]["list"][0]
-        markets.append(pair)
-
-        return markets
+        return [self.instruments.get(f"{coin}USDT", "spot"), self.instruments.get(f"{coin}USDC", "spot")]
 
     @beartype
     def get_linearNames(
@@ -401,19 +646,15 @@ class Fetcher:
         Return:
             dict: The future contracts. The keys are "perpetual" and "future"
         """
-        # Sadly, I do not think there is a better way to do this
-        # But the contracts themself are not always queried
-        pairs = self.session.get_instruments_info(category="linear", baseCoin=coin)
         markets = {"perpetual": [], "future": []}
-        for p in pairs["result"]["list"]:
+        for p in self.instruments.select(category="linear", baseCoin=coin, quoteCoin=quoteCoins):
             # Looks like BTC-01NOV24
-            if p["quoteCoin"] in quoteCoins:
-                if p["contractType"] == "LinearFutures":
-                    markets["future"].append(p["symbol"])
-                elif perpetual and p["contractType"] == "LinearPerpetual":
-                    markets["perpetual"].append(p["symbol"])
-                elif inverse and p["contractType"] == "InverseFutures":
-                    markets["future"].append(p["symbol"])
+            if p["contractType"] == "LinearFutures":
+                markets["future"].append(p["symbol"])
+            elif perpetual and p["contractType"] == "LinearPerpetual":
+                markets["perpetual"].append(p["symbol"])
+            elif inverse and p["contractType"] == "InverseFutures":
+                markets["future"].append(p["symbol"])
 
         return markets
 
@@ -444,69 +685,23 @@ class Fetcher:
         # Get future and spot contracts
         market = self.get_linearNames(coin=coin, inverse=inverse, perpetual=perpetual, quoteCoins=quoteCoins)
 
-        shortTickers = [
-            self.session.get_tickers(symbol=future, category="linear")["result"] for future in market["future"]
-        ]
-
-        longTickers = [
-            self.session.get_tickers(symbol=perpetual, category="linear")["result"] for perpetual in market["perpetual"]
-        ]
+        # One request for the whole linear table, parsed once
+        linear = {t["symbol"]: Ticker.parse(t) for t in self.session.get_tickers(category="linear")["result"]["list"]}
+        shortTickers = [linear[future] for future in market["future"] if future in linear]
+        longTickers = [linear[perpetual] for perpetual in market["perpetual"] if perpetual in linear]
+        longSymbols = [t.symbol for t in longTickers]
 
         if spot:
+            # Spot contracts don't have a delivery time
+            spots = {t["symbol"]: Ticker.parse(t) for t in self.session.get_tickers(category="spot")["result"]["list"]}
             for stableCoin in ["USDT", "USDC"]:
-                if stableCoin in quoteCoins:
-                    response = self.session.get_tickers(symbol=f"{coin}{stableCoin}", category="spot")["result"]
-                    response["list"][0]["deliveryTime"] = 0  # Spot contracts don't have a delivery time
-                    response["list"][0]["symbol"] = f"{coin}{stableCoin} (Spot)"
-                    longTickers.append(response)
-
-        # Define the column types
-        column_types = {
-            "Buy": "string",
-            "Sell": "string",
-            "Gap": "float",
-            "Coeff": "float",
-            "ROI": "float",
-            "APR": "float",
-            "CumFundingRate": "float",
-            "CumVolume": "int",
-            "DaysLeft": "int",
-        }
-
-        df_gaps = pd.DataFrame(columns=column_types.keys()).astype(column_types)
-
-        # Calculate gaps
-        for _i, long in enumerate(longTickers):
-            for short in shortTickers:
-                # Cross only the products in different categories
-                longInfo = long["list"][0]
-                shortInfo = short["list"][0]
-                gap = Analyser.get_gap(longInfo, shortInfo)
-
-                row = pd.DataFrame(
-                    [
-                        {
-                            "Buy": longInfo["symbol"],
-                            "Sell": shortInfo["symbol"],
-                            "Gap": gap["gap"],
-                            "Coeff": gap["coeff"],
-                            "ROI": gap["roi"],
-                            "APR": gap["apr"],
-                            "CumFundingRate": gap["cumFunding"],
-                            "CumVolume": gap["cumVolume"],
-                            "DaysLeft": max(0, int(gap["daysLeft"])),
-                        },
-                    ],
-                )
-
-                df_gaps = pd.concat([df_gaps, row], ignore_index=True)
-
-        df_gaps = df_gaps.astype(column_types)
-
-        # Sort by DaysLeft
-        df_gaps = df_gaps.sort_values(by="DaysLeft")
+                if stableCoin in quoteCoins and f"{coin}{stableCoin}" in spots:
+                    longTickers.append(spots[f"{coin}{stableCoin}"])
+                    longSymbols.append(f"{coin}{stableCoin} (Spot)")
 
-        return df_gaps.reset_index(drop=True)
+        # Calculate the gaps of every long x short pair
+        gaps = Analyser.gap_matrix(longTickers, shortTickers)
+        return Analyser.gap_frame(longSymbols, [t.symbol for t in shortTickers], gaps)
 
     async def get_greeks(self, baseCoin: str | None = None) -> dict:
         """Get the greeks for a given symbol.
@@ -519,8 +714,8 @@ class Fetcher:
         """
         try:
             if baseCoin:
-                return self.session.get_coin_greeks(baseCoin=baseCoin)["result"]["list"][0]
-            return self.session.get_coin_greeks()["result"]["list"][0]
+                return (await self.async_session.get_coin_greeks(baseCoin=baseCoin))["result"]["list"][0]
+            return (await self.async_session.get_coin_greeks())["result"]["list"][0]
         except Exception as e:
             self.logger.warning(f"Error: {e}")
             return None
@@ -536,7 +731,7 @@ class Fetcher:
             info (dict): The size and value of the position
 
         """
-        position = self.session.get_positions(symbol=symbol, category="linear")["result"]["list"][0]
+        position = (await self.async_session.get_positions(symbol=symbol, category="linear"))["result"]["list"][0]
         return {"qty": position["size"], "positionValue": position["positionValue"]}
 
     @beartype
@@ -553,7 +748,7 @@ class Fetcher:
         categories = ["linear", "inverse"]
         for category in categories:
             try:
-                return self.session.set_leverage(
+                return await self.async_session.set_leverage(
                     symbol=symbol,
                     category=category,
                     buyLeverage=leverage,
@@ -588,7 +783,7 @@ class Fetcher:
         """
         resp = None
         try:
-            resp = self.session.place_order(
+            resp = await self.async_session.place_order(
                 symbol=symbol,
                 category=category,
                 side=side,
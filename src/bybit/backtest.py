@@ -0,0 +1,327 @@
+import datetime
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+from bybit.analyser import Analyser
+from bybit.store import BASE_INTERVAL, KlineStore
+from bybit.ticker import Ticker
+from bybit.utils import INTERVALS_MS
+
+# Constants
+# Dated futures of a coin (e.g. BTC-27DEC24, BTCUSDT-27DEC24)
+FUTURE_PATTERN = r"^{coin}(USDT)?-\d{{2}}[A-Z]{{3}}\d{{2}}$"
+# The futures are delivered at 08:00 UTC
+DELIVERY_HOUR = 8
+# The delivery price is the average index over the last 30 minutes
+SETTLEMENT_MS = 30 * 60_000
+# Spot taker fees are 0.1%, paid on both trades of the spot leg
+SPOT_TAKER_FEES = 0.001
+FUNDING_MS = 8 * 3_600_000
+DAY_MS = 86_400_000
+SELECTORS = ["quickest", "best"]
+# Without a good gap, the best selector tries again an hour later
+RESELECT_MS = 3_600_000
+
+
+def delivery_time(symbol: str) -> int:
+    """Give the delivery time of a dated future from its symbol (e.g. BTC-27DEC24), epoch in milliseconds."""
+    date = datetime.datetime.strptime(symbol.rsplit("-", 1)[1], "%d%b%y").replace(
+        hour=DELIVERY_HOUR, tzinfo=datetime.UTC
+    )
+    return int(date.timestamp() * 1000)
+
+
+class CashAndCarry:
+    __slots__ = [
+        "cumFunding",
+        "deliveries",
+        "fundingRate",
+        "futures",
+        "logger",
+        "long",
+        "longPrice",
+        "perpetual",
+        "prices",
+        "times",
+    ]
+
+    def __init__(  # noqa: PLR0913
+        self,
+        times: np.ndarray,
+        longPrice: np.ndarray,
+        futures: list[str],
+        prices: np.ndarray,
+        long: str = "BTCUSDT",
+        fundingRate: np.ndarray | None = None,
+    ) -> None:
+        """Backtest of the GreekMaster.stable_collateral cycle on stored klines.
+
+        Each round selects a future, waits for its gap over the long leg, buys the long leg and shorts
+        the future, holds until the delivery, sells the long leg, and rolls into the next future.
+        Everything is on NumPy arrays aligned on the candles of the long leg: a round is a few array
+        operations on its window, so a year of 1-minute candles over all the expiries runs in a second.
+
+        Args:
+            times (np.ndarray): startTime of the candles, int64 epoch in milliseconds, oldest first
+            longPrice (np.ndarray): closePrice of the long leg (spot or perpetual) at each time
+            futures (list[str]): The dated futures (e.g. BTC-27DEC24)
+            prices (np.ndarray): (len(futures), len(times)) closePrice of the futures, NaN without a candle
+            long (str): The long leg, a perpetual pays the funding
+            fundingRate (np.ndarray | None): Funding rate of a perpetual long leg at each time
+
+        """
+        self.times = times
+        self.longPrice = longPrice
+        self.long = long
+        self.logger = logging.getLogger("greekMaster.backtest")
+
+        # Sorted by delivery, like the DaysLeft of the selectors (from_store sorts them, the prices are not copied)
+        self.deliveries = np.array([delivery_time(future) for future in futures], dtype=np.int64)
+        self.futures = futures
+        self.prices = prices
+        if (np.diff(self.deliveries) < 0).any():
+            order = np.argsort(self.deliveries, kind="stable")
+            self.deliveries = self.deliveries[order]
+            self.futures = [futures[k] for k in order]
+            self.prices = prices[order]
+
+        # Funding paid by one contract of the long leg until each candle: a round reads two values
+        self.fundingRate = fundingRate
+        self.perpetual = fundingRate is not None
+        settled = (times % FUNDING_MS == 0) if self.perpetual else np.zeros(len(times), dtype=bool)
+        payments = np.where(settled, longPrice * (fundingRate if self.perpetual else 0), 0)
+        self.cumFunding = np.concatenate([[0.0], np.cumsum(payments)])
+
+    @classmethod
+    def from_store(  # noqa: PLR0913
+        cls,
+        root: str = "store",
+        coin: str = "BTC",
+        long: str | None = None,
+        interval: str = BASE_INTERVAL,
+        start: int | str | None = None,
+        end: int | str | None = None,
+    ) -> "CashAndCarry":
+        """Load the long leg and all the stored futures of a coin from the kline store.
+
+        Args:
+            root (str): The root of the kline store
+            coin (str): The coin of the contracts
+            long (str | None): The long leg, the USDT spot if None, else a perpetual (e.g. BTCPERP)
+            interval (str): The interval of the klines
+            start (int | str | None): Oldest startTime to load, epoch in milliseconds or a date (see get_epoch)
+            end (int | str | None): Newest startTime to load, epoch in milliseconds or a date (see get_epoch)
+
+        """
+        store = KlineStore(root)
+        category = "spot" if long is None else "linear"
+        long = long or f"{coin}USDT"
+
+        columns = ["closePrice"] if category == "spot" else ["closePrice", "fundingRate"]
+        longKlines = store.load(long, interval, category, start=start, end=end, columns=columns).iloc[::-1]
+        times = longKlines["startTime"].to_numpy(np.int64)
+
+        pattern = re.compile(FUTURE_PATTERN.format(coin=coin))
+        futures = sorted(
+            (
+                product
+                for product, datasetInterval, datasetCategory in store.datasets()
+                if datasetInterval == interval and datasetCategory == "linear" and pattern.match(product)
+            ),
+            key=delivery_time,
+        )
+
+        # Each future on the times of the long leg, NaN where it has no candle
+        prices = np.full((len(futures), len(times)), np.nan)
+        for k, future in enumerate(futures):
+            klines = store.load(future, interval, start=start, end=end, columns=["closePrice"])
+            futureTimes = klines["startTime"].to_numpy(np.int64)
+            index = np.searchsorted(times, futureTimes).clip(max=len(times) - 1)
+            found = times[index] == futureTimes
+            prices[k, index[found]] = klines["closePrice"].to_numpy()[found]
+
+        return cls(
+            times,
+            longKlines["closePrice"].to_numpy(np.float64),
+            futures,
+            prices,
+            long=long,
+            fundingRate=longKlines["fundingRate"].fillna(0).to_numpy(np.float64) if category == "linear" else None,
+        )
+
+    def _select(self, i: int, selector: str, maxDays: float) -> int | None:
+        """Choose the future of a round at candle i, like GreekMaster.quickest_gap and best_gap.
+
+        Returns:
+            int | None: The index of the future, None if none is listed
+
+        """
+        alive = np.flatnonzero((self.deliveries > self.times[i]) & ~np.isnan(self.prices[:, i]))
+        if len(alive) == 0:
+            return None
+        if selector == "quickest":
+            return int(alive[0])
+
+        # The ticker arrays of gap_arrays, the volumes and fundings do not change the choice
+        nothing = np.zeros(len(alive))
+        long = {"price": self.longPrice[i : i + 1], "volume": nothing[:1], "delivery": nothing[:1]}
+        shorts = {"price": self.prices[alive, i], "volume": nothing, "delivery": self.deliveries[alive] / 1000}
+        now = self.times[i] / 1000
+        gaps = Analyser.gap_arrays({**long, "funding": nothing[:1]}, {**shorts, "funding": nothing}, now)
+        candidates = (gaps["coeff"][0] > 0) & (gaps["daysLeft"][0] < maxDays)
+        if not candidates.any():
+            return None
+        return int(alive[np.flatnonzero(candidates)[np.argmax(gaps["coeff"][0][candidates])]])
+
+    def _next_listing(self, i: int) -> int:
+        """Give the first candle after i where a future not yet delivered has a price."""
+        listed = ~np.isnan(self.prices[:, i + 1 :]) & (self.deliveries[:, None] > self.times[None, i + 1 :])
+        later = np.flatnonzero(listed.any(axis=0))
+        return i + 1 + int(later[0]) if len(later) else len(self.times)
+
+    def run(  # noqa: PLR0913
+        self,
+        minimumGap: float = -0.2,
+        quantityUSDC: float = 10_000.0,
+        selector: str = "quickest",
+        maxDays: float = 25,
+        leverage: int = 1,
+        compound: bool = True,
+    ) -> pd.DataFrame:
+        """Replay the rounds of stable_collateral over the loaded candles.
+
+        Round:
+            - Select a future (quickest: nearest delivery, best: highest Coeff with less than maxDays left)
+            - Enter on the first candle where (short / long - 1) * 100 >= minimumGap, like most_basic_arb
+            - Size the short with Analyser.position_calculator, buy the same value of the long leg
+            - At the delivery, the short settles at the average long price of the last 30 minutes,
+              the long leg is sold on the first candle after it
+            - The next round starts at the delivery (roll-over)
+        A round whose gap never reaches minimumGap waits until the delivery without trading.
+
+        Args:
+            minimumGap (float): The minimum gap in percent to enter
+            quantityUSDC (float): The balance of the first round
+            selector (str): "quickest" or "best"
+            maxDays (float): The maximum number of days left of the best selector
+            leverage (int): The leverage of the short
+            compound (bool): If True, each round trades the balance left by the previous one
+        Returns:
+            pd.DataFrame: One row per trade (times are epoch in milliseconds, pnl and fees in USDC)
+
+        """
+        if selector not in SELECTORS:
+            msg = f"Unknown selector {selector}, use one of {SELECTORS}"
+            raise ValueError(msg)
+
+        times = self.times
+        interval = int(times[1] - times[0]) if len(times) > 1 else INTERVALS_MS[BASE_INTERVAL]
+        balance = quantityUSDC
+        trades = []
+        i = 0
+
+        while i < len(times):
+            k = self._select(i, selector, maxDays)
+            if k is None:
+                listed = (self.deliveries > times[i]) & ~np.isnan(self.prices[:, i])
+                i = int(np.searchsorted(times, times[i] + RESELECT_MS)) if listed.any() else self._next_listing(i)
+                continue
+
+            # The window of the round, until the delivery
+            d = int(np.searchsorted(times, self.deliveries[k]))
+            if d >= len(times):
+                # Not delivered in the loaded candles
+                break
+            with np.errstate(invalid="ignore"):
+                coeff = (self.prices[k, i:d] / self.longPrice[i:d] - 1) * 100
+            hits = np.flatnonzero(coeff >= minimumGap)
+            if len(hits) == 0:
+                i = d
+                continue
+            e = i + int(hits[0])
+
+            # Entry, sized as the client does
+            short = Analyser.position_calculator(Ticker(self.futures[k], self.prices[k, e]), "Sell", balance, leverage)
+            quantity = short["quantityContracts"]
+            shortFees = short["orderCost"] - short["value"] / leverage
+
+            # Settlement on the average of the last 30 minutes (at least one candle), the long leg is sold after
+            settlement = float(self.longPrice[max(e, d - max(1, SETTLEMENT_MS // interval)) : d].mean())
+            longExit = float(self.longPrice[d])
+
+            if self.perpetual:
+                long = Analyser.position_calculator(Ticker(self.long, self.longPrice[e]), "Buy", balance, leverage)
+                longFees = long["orderCost"] - long["value"] / leverage
+                funding = quantity * (self.cumFunding[d + 1] - self.cumFunding[e + 1])
+                longPnl = quantity * (longExit - self.longPrice[e]) - longFees - funding
+            else:
+                # The same value of spot, the fee of the buy is taken in coin and the one of the sale in USDC
+                spotQuantity = short["value"] / self.longPrice[e] * (1 - SPOT_TAKER_FEES)
+                longFees = (short["value"] + spotQuantity * longExit) * SPOT_TAKER_FEES
+                funding = 0.0
+                longPnl = spotQuantity * longExit * (1 - SPOT_TAKER_FEES) - short["value"]
+
+            pnl = longPnl + quantity * (self.prices[k, e] - settlement) - shortFees
+
+            days = (times[d] - times[e]) / DAY_MS
+            trades.append(
+                {
+                    "symbol": self.futures[k],
+                    "selected": int(times[i]),
+                    "entry": int(times[e]),
+                    "delivery": int(times[d]),
+                    "coeff": float(coeff[hits[0]]),
+                    "longEntry": float(self.longPrice[e]),
+                    "shortEntry": float(self.prices[k, e]),
+                    "quantity": quantity,
+                    "settlement": settlement,
+                    "longExit": longExit,
+                    "fees": shortFees + longFees,
+                    "funding": funding,
+                    "pnl": pnl,
+                    "balance": balance,
+                    "roi": pnl / balance,
+                    "apr": pnl / balance * 365 / days if days > 0 else 0.0,
+                }
+            )
+
+            if compound:
+                balance += pnl
+            i = d
+
+        self.logger.info(f"Backtested {len(trades)} rounds, from {quantityUSDC:.2f} to {balance:.2f} USDC.")
+        return pd.DataFrame(trades)
+
+    @staticmethod
+    def summary(trades: pd.DataFrame, quantityUSDC: float = 10_000.0) -> dict:
+        """Summarize the trades of a run.
+
+        Returns:
+            dict:
+                trades: Number of rounds traded
+                pnl: Total P&L in USDC
+                roi: Total P&L over the first balance
+                apr: The ROI over the time from the first selection to the last delivery, per year
+                invested: Share of that time with a position open
+                fees: Total fees in USDC
+                funding: Total funding paid in USDC
+
+        """
+        if trades.empty:
+            return {"trades": 0, "pnl": 0.0, "roi": 0.0, "apr": 0.0, "invested": 0.0, "fees": 0.0, "funding": 0.0}
+
+        duration = (trades["delivery"].iloc[-1] - trades["selected"].iloc[0]) / DAY_MS
+        invested = (trades["delivery"] - trades["entry"]).sum() / DAY_MS
+        roi = trades["pnl"].sum() / quantityUSDC
+        return {
+            "trades": len(trades),
+            "pnl": float(trades["pnl"].sum()),
+            "roi": float(roi),
+            "apr": float(roi * 365 / duration) if duration > 0 else 0.0,
+            "invested": float(invested / duration) if duration > 0 else 0.0,
+            "fees": float(trades["fees"].sum()),
+            "funding": float(trades["funding"].sum()),
+        }
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import threading
+from collections import deque
+from collections.abc import Callable, Hashable
+
+# Constants
+# Distinct keys waiting for the loop, a client streams two of them
+BUS_CAPACITY = 64
+
+
+class TickerBus:
+    __slots__ = [
+        "capacity",
+        "counters",
+        "latest",
+        "lock",
+        "logger",
+        "loop",
+        "pending",
+        "ready",
+        "scheduled",
+        "task",
+    ]
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, capacity: int = BUS_CAPACITY) -> None:
+        """Hand the messages of the WebSocket threads to the event loop, keeping only the latest one per key.
+
+        The sockets publish, a single task on the loop consumes. A key waits at most once in the ring:
+        a new message for a waiting key replaces the previous one (conflated), so a burst of ticks
+        is one evaluation against the newest values. When the ring is full, new keys are dropped.
+
+        The lock only guards a few dictionary and deque operations, the threads never wait on the loop.
+
+        Args:
+            loop (asyncio.AbstractEventLoop): The loop of the consumer
+            capacity (int): Maximum number of keys waiting for the loop
+
+        """
+        self.loop = loop
+        self.capacity = capacity
+
+        # Keys in arrival order, and their latest message
+        self.pending: deque[Hashable] = deque()
+        self.latest: dict[Hashable, object] = {}
+        self.lock = threading.Lock()
+
+        # Set on the loop when the ring gets a key, scheduled avoids one wake-up per message
+        self.ready = asyncio.Event()
+        self.scheduled = False
+        self.task: asyncio.Task | None = None
+
+        self.counters = {"published": 0, "delivered": 0, "conflated": 0, "dropped": 0, "batches": 0}
+        self.logger = logging.getLogger("greekMaster.client.bus")
+
+    def publish(self, key: Hashable, message: object) -> None:
+        """Give a message to the loop, called from the WebSocket threads.
+
+        Args:
+            key (Hashable): What to conflate on (e.g. the symbol)
+            message (object): The message (e.g. a Ticker)
+
+        """
+        with self.lock:
+            self.counters["published"] += 1
+            if key in self.latest:
+                self.counters["conflated"] += 1
+            elif len(self.pending) >= self.capacity:
+                self.counters["dropped"] += 1
+                return
+            else:
+                self.pending.append(key)
+            self.latest[key] = message
+
+            wake = not self.scheduled
+            self.scheduled = True
+
+        if wake:
+            self.loop.call_soon_threadsafe(self.ready.set)
+
+    def drain(self) -> dict[Hashable, object]:
+        """Take the waiting messages.
+
+        Returns:
+            dict[Hashable, object]: The latest message of each waiting key, in arrival order
+
+        """
+        with self.lock:
+            batch = {key: self.latest.pop(key) for key in self.pending}
+            self.pending.clear()
+            self.scheduled = False
+            self.counters["delivered"] += len(batch)
+            self.counters["batches"] += 1
+        return batch
+
+    async def consume(self, handler: Callable[[dict[Hashable, object]], None]) -> None:
+        """Give every batch to the handler, on the loop, until cancelled.
+
+        Args:
+            handler (Callable): Called with the batch of drain()
+
+        """
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            batch = self.drain()
+            if batch:
+                try:
+                    handler(batch)
+                except Exception:
+                    self.logger.exception("Error in the handler of the ticker bus")
+
+    def start(self, handler: Callable[[dict[Hashable, object]], None]) -> None:
+        """Run the consumer as a task of the loop (see consume)."""
+        self.task = self.loop.create_task(self.consume(handler))
+
+    def close(self) -> None:
+        """Stop the consumer, and log the counters."""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.logger.info(f"Ticker bus: {self.stats()}")
+
+    def stats(self) -> dict:
+        """Give the counters.
+
+        Returns:
+            dict:
+                published: Messages given by the sockets
+                delivered: Messages given to the handler
+                conflated: Messages replaced by a newer one before the loop took them
+                dropped: Messages of new keys refused because the ring was full
+                batches: Number of drains
+
+        """
+        with self.lock:
+            return dict(self.counters)
@@ -1,8 +1,8 @@
 import asyncio
 import logging
+import time
 from abc import ABC, abstractmethod
 from collections.abc import Callable
-from time import sleep
 
 from beartype import beartype
 
@@ -10,20 +10,25 @@ from bybit.analyser import Analyser
 
 # Custom imports
 from bybit.api_fetcher import Fetcher
+from bybit.bus import TickerBus
+from bybit.ticker import Ticker
 
 
 class BybitClient(ABC):
     __slots__ = [
         "active",
         "balance",
+        "bus",
         "fetcher",
         "logger",
         "longContract",
         "shortContract",
+        "subscriptions",
+        "triggered",
     ]
 
     @beartype
-    def __init__(self, demo: bool = False) -> None:
+    def __init__(self, demo: bool = False, endpoint: str | None = None, fetcher: Fetcher | None = None) -> None:
         """Logic for a pair of products.
 
         It contains all the strategies for a pair of products.
@@ -39,15 +44,27 @@ class BybitClient(ABC):
 
         longContract and shortContract are dictionnaries of this form:
         {
-            "data": Last Kline data,
+            "data": Last Ticker,
             "symbol": Contract symbol,
             "qty": Position quantity,
         }
+
+        Args:
+            demo (bool): If True, will use the demo keys
+            endpoint (str | None): Base URL of a local server instead of Bybit (see Fetcher)
+            fetcher (Fetcher | None): A fetcher to use instead of a new one (e.g. a SimulatedFetcher of a replay)
+
         """
-        self.fetcher = Fetcher(demo=demo)
+        self.fetcher = fetcher or Fetcher(demo=demo, endpoint=endpoint)
         self.longContract: dict = {}
         self.shortContract: dict = {}
         self.balance = 0
+        # Tokens of the WebSocket subscriptions of the round
+        self.subscriptions: list[int] = []
+        # Carries the tickers of the round from the sockets to the strategy
+        self.bus: TickerBus | None = None
+        # Resolved by the strategy with the time of the triggering tick (perf_counter), awaited by the executor
+        self.triggered: asyncio.Future | None = None
 
         self.active = False
 
@@ -75,12 +92,9 @@ class BybitClient(ABC):
         # Check if the data is complete
         if self.longContract.get("data") is None or self.shortContract.get("data") is None:
             return
-        longTickers = self.longContract["data"]["data"]
-        shortTickers = self.shortContract["data"]["data"]
-
-        # | Price of the future contract
-        longPrice = float(longTickers["lastPrice"])
-        shortPrice = float(shortTickers["lastPrice"])
+        # | Price of the future contract, parsed by the socket
+        longPrice = self.longContract["data"].last
+        shortPrice = self.shortContract["data"].last
         # - Calculate the gap
         coeff = (shortPrice / longPrice - 1) * 100
 
@@ -88,14 +102,27 @@ class BybitClient(ABC):
         if coeff >= minimumGap:
             self.logger.info("Arbitrage found")
             self.active = False
+            self._trigger()
+
+    def _trigger(self) -> None:
+        """Wake up the executor on its event loop, the strategy may run on the loop or on a WebSocket thread."""
+        triggeredAt = time.perf_counter()
+
+        def resolve() -> None:
+            # Both tickers may trigger before the executor wakes up
+            if not self.triggered.done():
+                self.triggered.set_result(triggeredAt)
+
+        self.triggered.get_loop().call_soon_threadsafe(resolve)
 
     @abstractmethod
-    def _activate_websockets(self, short_handler: Callable, long_handler: Callable) -> None:
+    async def _activate_websockets(self, short_handler: Callable, long_handler: Callable) -> None:
         """Tells which websocket to activate, subscribes to the tickers, and more.
 
         Should be implemented in the child class, depending on the used products.
 
-        WARNING: Do not forget to sleep between starting the websockets and subscribing to the tickers.
+        The sockets are shared through fetcher.sockets, keep the subscription tokens in self.subscriptions.
+        Return once the subscriptions are acknowledged (see WebSocketManager.ticker_streams).
         """
 
     async def _setup_contracts(
@@ -114,23 +141,38 @@ class BybitClient(ABC):
             self.logger.error("Strategy not implemented")
             raise NotImplementedError
 
-        # Define handlers
-        def short_handler(message: str) -> None:
-            if self.active:
-                self.shortContract["data"] = message
-                strategy(minimumGap=minimumGap)
-            else:
-                self.logger.warning("Not active anymore. Ignoring short websocket...")
-
-        def long_handler(message: str) -> None:
-            if self.active:
-                self.longContract["data"] = message
-                strategy(minimumGap=minimumGap)
-            else:
-                self.logger.warning("Not active anymore. Ignoring long websocket...")
+        # The sockets only publish the messages, the strategy runs on the loop with the newest pair
+        self.bus = TickerBus(asyncio.get_running_loop())
+
+        def on_tickers(batch: dict) -> None:
+            if not self.active:
+                self.logger.warning("Not active anymore. Ignoring websocket...")
+                return
+            if "short" in batch:
+                self.shortContract["data"] = batch["short"]
+            if "long" in batch:
+                self.longContract["data"] = batch["long"]
+            strategy(minimumGap=minimumGap)
+
+        def short_handler(ticker: Ticker) -> None:
+            self.bus.publish("short", ticker)
+
+        def long_handler(ticker: Ticker) -> None:
+            self.bus.publish("long", ticker)
+
+        # The strategy resolves it
+        self.triggered = asyncio.get_running_loop().create_future()
+        self.bus.start(on_tickers)
 
         # Logic to activate websockets, and subscribe to the tickers (extra setup before: leverage, spot handling...)
-        self._activate_websockets(short_handler, long_handler)
+        try:
+            await self._activate_websockets(short_handler, long_handler)
+        except BaseException:
+            # e.g. a subscription refused or not acknowledged, nothing will resolve the trigger
+            self.logger.exception("Could not listen to the tickers")
+            self._deactivate_websockets()
+            self.triggered.cancel()
+            raise
 
         # Stream tickers for both contracts using the same handler
         self.active = True
@@ -177,21 +219,31 @@ class BybitClient(ABC):
         # Setup the contracts
         await self._setup_contracts(strategy, minimumGap)
 
-        # TODO: Find a way to call entry in callbacks to avoid busy waiting
-        while self.active:  # noqa: ASYNC110
-            await asyncio.sleep(0.1)
+        # Wakes up on the triggering tick
+        triggeredAt = await self.triggered
+        self.logger.info(f"Entering {(time.perf_counter() - triggeredAt) * 1000:.2f} ms after the trigger")
 
         try:
             await self._enter_amount()
+            self.logger.info(f"Entered {(time.perf_counter() - triggeredAt) * 1000:.2f} ms after the trigger")
 
         except Exception:
             self.logger.exception("Error when entering arbitrage position")
             self.logger.exception("Exiting", stack_info=False)
-            self.fetcher.close_websockets()
+            self._deactivate_websockets()
             raise
 
-        # Not active anymore, close the Websockets
-        self.fetcher.close_websockets()
+        # Not active anymore, leave the tickers (the sockets stay open for the next round)
+        self._deactivate_websockets()
+
+    def _deactivate_websockets(self) -> None:
+        """Unsubscribe from the tickers of the round, and stop the ticker bus."""
+        for token in self.subscriptions:
+            self.fetcher.sockets.unsubscribe(token)
+        self.subscriptions = []
+        if self.bus is not None:
+            self.bus.close()
+            self.bus = None
 
 
 class UlysseSpotFut(BybitClient):
@@ -200,7 +252,7 @@ class UlysseSpotFut(BybitClient):
     async def _enter_amount(self) -> dict:
         """Places the entry order."""
         # We do not need the long info, because we can take how much we want
-        shortTickers = self.shortContract["data"]["data"]
+        shortTickers = self.shortContract["data"]
 
         # Calculate the position
         shortPosition = Analyser.position_calculator(shortTickers, "Sell", self.balance)
@@ -228,20 +280,17 @@ class UlysseSpotFut(BybitClient):
             category="spot",
         )
 
-    def _activate_websockets(self, short_handler: Callable, long_handler: Callable) -> None:
+    async def _activate_websockets(self, short_handler: Callable, long_handler: Callable) -> None:
         # TODO: This cannot be definitive
         self.longContract["symbol"] = self.longContract["symbol"].replace(" (Spot)", "")
 
-        # Start the websockets
-        self.fetcher.start_linear_ws()
-        self.fetcher.start_spot_ws()
-
-        # Sleep to give websockets time to initialize
-        sleep(5)
-
-        # Subscribe to the tickers
-        self.fetcher.ws_spot.ticker_stream(symbol=self.longContract["symbol"], callback=long_handler)
-        self.fetcher.ws.ticker_stream(symbol=self.shortContract["symbol"], callback=short_handler)
+        # Subscribe to the tickers, the sockets are opened on first use then reused by every round
+        self.subscriptions = await self.fetcher.sockets.ticker_streams(
+            [
+                ("spot", self.longContract["symbol"], long_handler),
+                ("linear", self.shortContract["symbol"], short_handler),
+            ]
+        )
 
     async def base_executor(
         self,
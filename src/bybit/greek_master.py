@@ -3,15 +3,17 @@ import datetime
 import logging
 from collections.abc import Callable
 
+import pandas as pd
 import schedule
 from beartype import beartype
 
 from bybit.client import BybitClient
+from bybit.live import LiveGapMatrix
 from bybit.utils import get_date
 
 
 class GreekMaster:
-    __slots__ = ["client", "fetcher", "logger", "sch", "watching"]
+    __slots__ = ["client", "fetcher", "live", "logger", "sch", "watching"]
 
     @beartype
     def __init__(self, client: BybitClient) -> None:
@@ -29,6 +31,7 @@ class GreekMaster:
         Defines:
             - client (BybitClient): Client for the Bybit API
             - fetcher (Fetcher): Fetcher for the Bybit API
+            - live (LiveGapMatrix | None): Gaps fed by the tickers streams, read by the selectors (see watch_gaps)
             - contracts (list): List of all the current contracts
             - logger (logging.Logger): Logger for the client
             - watching: Boolean to know if GreekMaster has control
@@ -44,6 +47,7 @@ class GreekMaster:
         self.client: BybitClient = client
 
         self.fetcher = self.client.fetcher
+        self.live = None
 
         self.logger = logging.getLogger("greekMaster")
 
@@ -129,11 +133,7 @@ class GreekMaster:
 
         Short contract is always supposed to be a future contract (perpetual/linear/inverse)
         """
-        epochTime = int(
-            self.fetcher.session.get_tickers(symbol=self.client.shortContract["symbol"], category="linear")["result"][
-                "list"
-            ][0]["deliveryTime"],
-        )
+        epochTime = int(self.fetcher.instruments.get(self.client.shortContract["symbol"])["deliveryTime"])
 
         self.logger.info(f"Delivery date at 8:00AM UTC for: {get_date(epochTime)}")
 
@@ -153,6 +153,46 @@ class GreekMaster:
         # Clear the schedule
         self._new_round()
 
+    def watch_gaps(self, coin: str = "BTC", quoteCoins: list[str] = ["USDC"]) -> None:
+        """Keep a live spot x future gap matrix, so the selectors do not send any request.
+
+        Args:
+            coin (str): The coin to consider
+            quoteCoins (list[str]): The quote coins to consider
+
+        """
+        self.live = LiveGapMatrix(self.fetcher, coin=coin, quoteCoins=quoteCoins, spot=True, perpetual=False)
+        self.live.start()
+
+    def _gaps(self, quoteCoins: list[str]) -> pd.DataFrame:
+        """Give the spot x future gaps of some quote coins.
+
+        They come from the live matrix if it runs and covers these quote coins, without its stale pairs.
+        The REST API gives them when no pair is fresh (e.g. at startup, or after a disconnection).
+        """
+        if self.live is not None and set(quoteCoins) <= set(self.live.selection["quoteCoins"]):
+            # The contracts of the matrix quoted in these coins, under the names of its snapshot
+            names = [
+                name
+                for index, symbols in [
+                    (self.live.long_index, self.live.long_symbols),
+                    (self.live.short_index, self.live.short_symbols),
+                ]
+                for (category, symbol), name in zip(index, symbols, strict=True)
+                if (self.fetcher.instruments.get(symbol, category) or {}).get("quoteCoin") in quoteCoins
+            ]
+            gaps = self.live.snapshot()
+            gaps = gaps.loc[~gaps["Stale"] & gaps["Buy"].isin(names) & gaps["Sell"].isin(names)]
+            if not gaps.empty:
+                return gaps
+            self.logger.warning(f"No fresh {quoteCoins} pair in the live gap matrix, asking the REST API")
+        return self.fetcher.all_gaps_pd(
+            inverse=False,
+            perpetual=False,
+            spot=True,
+            quoteCoins=quoteCoins,
+        )
+
     def best_gap(
         self,
         maxDays: int = 25,
@@ -167,12 +207,7 @@ class GreekMaster:
             dict: The best gap
 
         """
-        gaps = self.fetcher.all_gaps_pd(
-            inverse=False,
-            perpetual=False,
-            spot=True,
-            quoteCoins=quoteCoins,
-        )
+        gaps = self._gaps(quoteCoins)
 
         # Keep the positive coeffs
         gaps = gaps.loc[gaps["Coeff"] > 0]
@@ -187,12 +222,7 @@ class GreekMaster:
 
     def quickest_gap(self) -> dict:
         """Find the quickest gap for spot and future contracts."""
-        gaps = self.fetcher.all_gaps_pd(
-            inverse=False,
-            perpetual=False,
-            spot=True,
-            quoteCoins=["USDC"],
-        )
+        gaps = self._gaps(["USDC"])
 
         # Take the gap that finishes the soonest
         bestGap = gaps.loc[gaps["DaysLeft"].idxmin()]
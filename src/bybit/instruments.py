@@ -0,0 +1,164 @@
+import json
+import logging
+import time
+from pathlib import Path
+
+from pybit.unified_trading import HTTP
+
+# Constants
+CATEGORIES = ["linear", "spot"]
+INDEXES = ["baseCoin", "quoteCoin", "contractType"]
+# Instruments are listed or delivered a few times a week
+INSTRUMENTS_TTL = 6 * 60 * 60
+# An unknown symbol triggers a refresh, at most once per MISS_COOLDOWN seconds
+MISS_COOLDOWN = 60
+
+
+class InstrumentRegistry:
+    __slots__ = ["fetched_at", "index", "instruments", "last_miss", "logger", "session", "snapshot", "ttl"]
+
+    def __init__(
+        self, session: HTTP, snapshot: str | Path | None = "store/instruments.json", ttl: float = INSTRUMENTS_TTL
+    ) -> None:
+        """In-process registry of the instruments (symbols, contract types, delivery times, lot sizes).
+
+        Loaded once from the API (or from the snapshot if it is fresh enough), then every lookup is a dictionary hit.
+        It is refreshed when older than ttl, when invalidate() is called (e.g. on a listing/delivery event),
+        or when a symbol is unknown (a new listing).
+
+        Args:
+            session (HTTP): The session used to query the instruments
+            snapshot (str | Path | None): JSON file for a warm start, None to keep everything in memory
+            ttl (float): Age in seconds after which the instruments are fetched again
+
+        """
+        self.session = session
+        self.snapshot = Path(snapshot) if snapshot else None
+        self.ttl = ttl
+
+        # {category: {symbol: instrument}}
+        self.instruments: dict[str, dict[str, dict]] = {}
+        # {category: {field: {value: [instrument, ...]}}}
+        self.index: dict[str, dict[str, dict[str, list]]] = {}
+        self.fetched_at = 0.0
+        self.last_miss = 0.0
+
+        self.logger = logging.getLogger("greekMaster.client.fetcher.instruments")
+
+    def _build(self, instruments: dict[str, list]) -> None:
+        """Build the symbol map and the indexes from the instrument lists of each category."""
+        self.instruments = {category: {i["symbol"]: i for i in items} for category, items in instruments.items()}
+        self.index = {category: {field: {} for field in INDEXES} for category in instruments}
+        for category, items in instruments.items():
+            for instrument in items:
+                for field in INDEXES:
+                    if field in instrument:
+                        self.index[category][field].setdefault(instrument[field], []).append(instrument)
+
+    def _fetch(self, category: str) -> list:
+        """Fetch all the instruments of a category, following the pagination cursor.
+
+        Link: https://bybit-exchange.github.io/docs/v5/market/instrument
+        """
+        items = []
+        cursor = None
+        while True:
+            params = {"category": category, "limit": 1000}
+            if cursor:
+                params["cursor"] = cursor
+            result = self.session.get_instruments_info(**params)["result"]
+            items.extend(result["list"])
+            cursor = result.get("nextPageCursor")
+            if not cursor:
+                return items
+
+    def refresh(self) -> None:
+        """Fetch the instruments of every category, and write the snapshot."""
+        instruments = {category: self._fetch(category) for category in CATEGORIES}
+        self.fetched_at = time.time()
+        self._build(instruments)
+        self.logger.info(f"Loaded {sum(len(items) for items in instruments.values())} instruments.")
+
+        if self.snapshot:
+            self.snapshot.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename, a crash never leaves a half written snapshot
+            tmp = self.snapshot.with_suffix(".tmp")
+            with tmp.open("w") as f:
+                json.dump({"fetchedAt": self.fetched_at, "instruments": instruments}, f)
+            tmp.replace(self.snapshot)
+
+    def invalidate(self) -> None:
+        """Force a refresh on the next lookup, and ignore the snapshot."""
+        self.fetched_at = 0.0
+        if self.snapshot:
+            self.snapshot.unlink(missing_ok=True)
+
+    def _ensure(self) -> None:
+        """Load the instruments if they are missing or older than the ttl."""
+        if time.time() - self.fetched_at < self.ttl:
+            return
+
+        if self.snapshot and self.snapshot.is_file():
+            with self.snapshot.open() as f:
+                snapshot = json.load(f)
+            if time.time() - snapshot["fetchedAt"] < self.ttl:
+                self.fetched_at = snapshot["fetchedAt"]
+                self._build(snapshot["instruments"])
+                self.logger.info(f"Loaded the instruments from {self.snapshot}.")
+                return
+
+        self.refresh()
+
+    def get(self, symbol: str, category: str = "linear") -> dict | None:
+        """Give the instrument of a symbol.
+
+        Args:
+            symbol (str): The symbol (e.g. BTC-27DEC24)
+            category (str): The category of the symbol
+        Returns:
+            dict | None: The instrument, as returned by get_instruments_info. None if it does not exist
+
+        """
+        self._ensure()
+        instrument = self.instruments.get(category, {}).get(symbol)
+
+        # Maybe a new listing
+        if instrument is None and time.time() - self.last_miss > MISS_COOLDOWN:
+            self.last_miss = time.time()
+            self.refresh()
+            instrument = self.instruments.get(category, {}).get(symbol)
+
+        return instrument
+
+    def select(self, category: str = "linear", **criteria: str | list[str]) -> list[dict]:
+        """Give the instruments matching every criterion.
+
+        Args:
+            category (str): The category of the instruments
+            criteria: baseCoin, quoteCoin and/or contractType, a value or a list of accepted values
+        Returns:
+            list[dict]: The instruments
+
+        Example:
+            registry.select(baseCoin="BTC", quoteCoin=["USDC", "USDT"], contractType="LinearFutures")
+
+        """
+        self._ensure()
+        criteria = {field: [value] if isinstance(value, str) else value for field, value in criteria.items()}
+        index = self.index.get(category, {})
+
+        # Start from the smallest indexed field, then filter on the others
+        candidates = None
+        for field, values in criteria.items():
+            if field in index:
+                subset = [instrument for value in values for instrument in index[field].get(value, [])]
+                if candidates is None or len(subset) < len(candidates):
+                    candidates = subset
+        if candidates is None:
+            candidates = self.instruments.get(category, {}).values()
+
+        return [
+            instrument
+            for instrument in candidates
+            if all(instrument.get(field) in values for field, values in criteria.items())
+        ]
@@ -0,0 +1,246 @@
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from bybit.analyser import Analyser
+from bybit.api_fetcher import Fetcher
+from bybit.ticker import Ticker
+
+# Constants
+# A symbol without a tick for this many seconds is stale
+STALE_AFTER = 30.0
+
+
+class LiveGapMatrix:
+    __slots__ = [
+        "fetcher",
+        "latency",
+        "lock",
+        "logger",
+        "long",
+        "long_index",
+        "long_symbols",
+        "long_updated",
+        "matrix",
+        "selection",
+        "short",
+        "short_index",
+        "short_symbols",
+        "short_updated",
+        "staleAfter",
+        "subscriptions",
+    ]
+
+    def __init__(  # noqa: PLR0913
+        self,
+        fetcher: Fetcher,
+        coin: str = "BTC",
+        quoteCoins: list[str] = ["USDC"],
+        spot: bool = True,
+        perpetual: bool = False,
+        inverse: bool = False,
+        staleAfter: float = STALE_AFTER,
+    ) -> None:
+        """Spot/perpetual x future gap matrix, kept up to date by the tickers streams.
+
+        The tables are seeded with one get_tickers call per category, then every tick updates
+        the row (long contract) or the column (short contract) of its symbol.
+        Selectors read a snapshot, without any request.
+
+        The selection of contracts is the one of all_gaps_pd.
+
+        Args:
+            fetcher (Fetcher): The fetcher, for the instruments and the seed
+            coin (str): The coin to consider (e.g., "BTC").
+            quoteCoins (list[str]): Quote currencies to consider (e.g., ["USDC", "USDT"]).
+            spot (bool): Include spot contracts.
+            perpetual (bool): Use perpetual contracts.
+            inverse (bool): Use inverse contracts.
+            staleAfter (float): Seconds without a tick after which a symbol is stale
+
+        """
+        self.fetcher = fetcher
+        self.selection = {
+            "coin": coin,
+            "quoteCoins": quoteCoins,
+            "spot": spot,
+            "perpetual": perpetual,
+            "inverse": inverse,
+        }
+        self.staleAfter = staleAfter
+
+        # Ticks come from the WebSocket threads, snapshots from the selectors
+        self.lock = threading.Lock()
+
+        # Rows are long contracts, columns are short contracts
+        # {(category, symbol): row/column}
+        self.long_index: dict[tuple[str, str], int] = {}
+        self.short_index: dict[tuple[str, str], int] = {}
+        self.long_symbols: list[str] = []
+        self.short_symbols: list[str] = []
+        # Ticker arrays (see Analyser.ticker_arrays), and when each symbol was updated (monotonic seconds)
+        self.long: dict[str, np.ndarray] = {}
+        self.short: dict[str, np.ndarray] = {}
+        self.long_updated = np.zeros(0)
+        self.short_updated = np.zeros(0)
+        self.matrix: dict[str, np.ndarray] = {}
+
+        # Time between the reception of a tick and the update of the matrix, and age of the tick at that time
+        self.latency = {"ticks": 0, "updateTotal": 0.0, "updateMax": 0.0, "ageTotal": 0.0, "ageMax": 0.0}
+
+        # Tokens of the tickers subscriptions (see WebSocketManager)
+        self.subscriptions: list[int] = []
+        self.logger = logging.getLogger("greekMaster.client.fetcher.live")
+
+    def start(self) -> None:
+        """Seed the tables from REST, then subscribe to the tickers of every contract."""
+        coin = self.selection["coin"]
+        market = self.fetcher.get_linearNames(
+            coin=coin,
+            inverse=self.selection["inverse"],
+            perpetual=self.selection["perpetual"],
+            quoteCoins=self.selection["quoteCoins"],
+        )
+
+        # Parsed once, the stream gives Tickers too
+        linear = {
+            t["symbol"]: Ticker.parse(t) for t in self.fetcher.session.get_tickers(category="linear")["result"]["list"]
+        }
+        longs = [("linear", symbol, linear[symbol]) for symbol in market["perpetual"] if symbol in linear]
+        shorts = [("linear", symbol, linear[symbol]) for symbol in market["future"] if symbol in linear]
+
+        if self.selection["spot"]:
+            # Spot contracts don't have a delivery time
+            spots = {
+                t["symbol"]: Ticker.parse(t)
+                for t in self.fetcher.session.get_tickers(category="spot")["result"]["list"]
+            }
+            longs.extend(
+                ("spot", f"{coin}{stableCoin}", spots[f"{coin}{stableCoin}"])
+                for stableCoin in ["USDT", "USDC"]
+                if stableCoin in self.selection["quoteCoins"] and f"{coin}{stableCoin}" in spots
+            )
+
+        with self.lock:
+            self.long_index = {(category, symbol): i for i, (category, symbol, _) in enumerate(longs)}
+            self.short_index = {(category, symbol): j for j, (category, symbol, _) in enumerate(shorts)}
+            self.long_symbols = [
+                symbol if category == "linear" else f"{symbol} (Spot)" for category, symbol, _ in longs
+            ]
+            self.short_symbols = [symbol for _, symbol, _ in shorts]
+            self.long = Analyser.ticker_arrays([ticker for _, _, ticker in longs])
+            self.short = Analyser.ticker_arrays([ticker for _, _, ticker in shorts])
+            self.long_updated = np.full(len(longs), time.monotonic())
+            self.short_updated = np.full(len(shorts), time.monotonic())
+            self.matrix = Analyser.gap_arrays(self.long, self.short, time.time())
+
+        self.logger.info(f"Live gap matrix of {len(longs)} x {len(shorts)} contracts.")
+
+        # The sockets of the fetcher are shared, the client may already stream some of these tickers
+        for category, symbol in self.long_index.keys() | self.short_index.keys():
+            self.subscriptions.append(
+                self.fetcher.sockets.ticker_stream(
+                    category, symbol, lambda ticker, category=category: self.on_ticker(category, ticker)
+                )
+            )
+
+    def close(self) -> None:
+        """Unsubscribe from the tickers."""
+        for token in self.subscriptions:
+            self.fetcher.sockets.unsubscribe(token)
+        self.subscriptions = []
+
+    @staticmethod
+    def _set(arrays: dict, i: int, ticker: Ticker) -> None:
+        """Write the fields of a tick in row i of ticker arrays."""
+        arrays["price"][i] = ticker.last
+        arrays["volume"][i] = ticker.volume
+        if ticker.funding:
+            arrays["funding"][i] = ticker.funding
+
+    def on_ticker(self, category: str, ticker: Ticker) -> None:
+        """Update the row/column of a symbol with its tick.
+
+        Called from the WebSocket threads.
+
+        Args:
+            category (str): The category of the stream
+            ticker (Ticker): The tickers of the symbol
+
+        """
+        received = time.perf_counter()
+        key = (category, ticker.symbol)
+
+        with self.lock:
+            now = time.time()
+
+            if key in self.long_index:
+                i = self.long_index[key]
+                self._set(self.long, i, ticker)
+                row = Analyser.gap_arrays(
+                    {name: array[i : i + 1] for name, array in self.long.items()}, self.short, now
+                )
+                for name, values in row.items():
+                    self.matrix[name][i] = values[0]
+                self.long_updated[i] = time.monotonic()
+
+            if key in self.short_index:
+                j = self.short_index[key]
+                self._set(self.short, j, ticker)
+                column = Analyser.gap_arrays(
+                    self.long, {name: array[j : j + 1] for name, array in self.short.items()}, now
+                )
+                for name, values in column.items():
+                    self.matrix[name][:, j] = values[:, 0]
+                self.short_updated[j] = time.monotonic()
+
+            update = time.perf_counter() - received
+            # The timestamp is set by Bybit
+            age = now - ticker.ts if ticker.ts else 0.0
+            self.latency["ticks"] += 1
+            self.latency["updateTotal"] += update
+            self.latency["updateMax"] = max(self.latency["updateMax"], update)
+            self.latency["ageTotal"] += age
+            self.latency["ageMax"] = max(self.latency["ageMax"], age)
+
+    def snapshot(self) -> pd.DataFrame:
+        """Give a consistent copy of the gaps, in the format of all_gaps_pd.
+
+        Returns:
+            pd.DataFrame: The gaps, with two more columns:
+                Age: Seconds since the oldest tick of the pair
+                Stale: True if one of the contracts did not tick for staleAfter seconds
+
+        """
+        with self.lock:
+            matrix = {name: values.copy() for name, values in self.matrix.items()}
+            longUpdated = self.long_updated.copy()
+            shortUpdated = self.short_updated.copy()
+
+        age = time.monotonic() - np.minimum(longUpdated[:, None], shortUpdated[None, :])
+        return Analyser.gap_frame(self.long_symbols, self.short_symbols, matrix, Age=age, Stale=age > self.staleAfter)
+
+    def latency_stats(self) -> dict:
+        """Give the latency of the updates.
+
+        Returns:
+            dict:
+                ticks: Number of ticks
+                meanUpdate: Mean time from the reception of a tick to the updated matrix, in seconds
+                maxUpdate: Longest time from the reception of a tick to the updated matrix, in seconds
+                meanAge: Mean time from the exchange timestamp of a tick to the updated matrix, in seconds
+                maxAge: Longest time from the exchange timestamp of a tick to the updated matrix, in seconds
+
+        """
+        with self.lock:
+            ticks = self.latency["ticks"]
+            return {
+                "ticks": ticks,
+                "meanUpdate": self.latency["updateTotal"] / ticks if ticks else 0.0,
+                "maxUpdate": self.latency["updateMax"],
+                "meanAge": self.latency["ageTotal"] / ticks if ticks else 0.0,
+                "maxAge": self.latency["ageMax"],
+            }
@@ -0,0 +1,694 @@
+import asyncio
+import datetime
+import itertools
+import json
+import logging
+import threading
+import time
+from collections.abc import Callable
+from uuid import uuid4
+
+import numpy as np
+import pandas as pd
+from aiohttp import WSMsgType, web
+
+from bybit.scheduler import endpoint_class
+
+# Constants
+# Index price of the synthetic market, and yearly premium of a future over it
+BASE_PRICE = 60_000.0
+BASIS = 0.08
+PERPETUAL_PREMIUM = 0.0002
+# Taker fees, like the Analyser
+TAKER_FEES = 0.00055
+# Requests per second of each endpoint class (see scheduler.endpoint_class)
+MOCK_LIMITS = {"market": 50, "trade": 10, "position": 10, "account": 10}
+# Seconds between two pushes of the streams
+TICK_INTERVAL = 0.1
+DAY_MS = 86_400_000
+YEAR_MS = 365 * DAY_MS
+FUNDING_MS = 8 * 3_600_000
+# Duration of a candle in milliseconds ("M" is handled with calendar months)
+INTERVALS_MS = {
+    "1": 60_000,
+    "3": 180_000,
+    "5": 300_000,
+    "15": 900_000,
+    "30": 1_800_000,
+    "60": 3_600_000,
+    "120": 7_200_000,
+    "240": 14_400_000,
+    "360": 21_600_000,
+    "720": 43_200_000,
+    "D": DAY_MS,
+    "W": 7 * DAY_MS,
+}
+PRIVATE_TOPICS = ["position", "execution", "order", "wallet", "greeks"]
+WALLET = {"USDC": 100_000.0, "USDT": 0.0, "BTC": 0.0}
+
+
+def last_fridays(now: float, count: int = 4) -> list[datetime.datetime]:
+    """Give the next delivery dates of Bybit futures: the last Friday of the next months, at 08:00 UTC."""
+    deliveries = []
+    month = datetime.datetime.fromtimestamp(now, datetime.UTC).replace(day=1, hour=8, minute=0, second=0, microsecond=0)
+    while len(deliveries) < count:
+        following = (month + datetime.timedelta(days=32)).replace(day=1)
+        friday = following - datetime.timedelta(days=(following.weekday() - 4) % 7 or 7)
+        if friday.timestamp() > now:
+            deliveries.append(friday)
+        month = following
+    return deliveries
+
+
+class MockExchange:
+    __slots__ = [
+        "account",
+        "clock",
+        "counter",
+        "instruments",
+        "latency",
+        "limits",
+        "logger",
+        "loop",
+        "prices",
+        "rng",
+        "runner",
+        "sockets",
+        "subscribers",
+        "task",
+        "tickInterval",
+        "url",
+        "windows",
+    ]
+
+    def __init__(  # noqa: PLR0913
+        self,
+        klines: pd.DataFrame | None = None,
+        latency: float = 0.0,
+        limits: dict[str, int] | None = None,
+        tickInterval: float = TICK_INTERVAL,
+        clock: Callable[[], float] = time.time,
+        seed: int = 0,
+    ) -> None:
+        """Local stand-in for the Bybit v5 API, REST and WebSocket, to run the fetcher and the clients offline.
+
+        The market is a BTC index price: the close of the given klines (e.g. stored ones, see store.load_klines),
+        or a synthetic curve. Spots trade at the index, the perpetuals at a small premium, and the futures
+        at a premium decreasing until their delivery. Orders fill at market, on one account that accepts any key.
+
+        REST: kline, tickers, funding history, instruments, wallet, positions, orders, leverage, coin greeks.
+        WebSocket: tickers and kline streams on the public channels, position/order/execution/wallet when private.
+
+        Args:
+            klines (pd.DataFrame | None): Klines whose closePrice drives the index (startTime in milliseconds)
+            latency (float): Seconds added before every response and every push
+            limits (dict[str, int] | None): Requests per second of each endpoint class, MOCK_LIMITS if None
+            tickInterval (float): Seconds between two pushes of the streams
+            clock (Callable[[], float]): Gives the current epoch in seconds
+            seed (int): Seed of the noise of the ticks
+
+        """
+        self.clock = clock
+        self.latency = latency
+        self.limits = limits or MOCK_LIMITS
+        self.tickInterval = tickInterval
+        self.rng = np.random.default_rng(seed)
+
+        # Index price path of the given klines, oldest first
+        self.prices = None
+        if klines is not None:
+            klines = klines.sort_values("startTime")
+            self.prices = (klines["startTime"].to_numpy(np.float64), klines["closePrice"].to_numpy(np.float64))
+
+        # {category: {symbol: instrument}}
+        self.instruments = self._list_instruments()
+        # Balances by coin, positions by symbol (positive is long), their entry price and leverage
+        self.account = {"wallet": dict(WALLET), "positions": {}, "entries": {}, "leverage": {}}
+
+        # {(endpoint class, second): requests}
+        self.windows: dict[tuple[str, int], int] = {}
+        # {(channel, topic): {WebSocketResponse}}
+        self.subscribers: dict[tuple[str, str], set] = {}
+        self.sockets: set[web.WebSocketResponse] = set()
+        self.counter = itertools.count()
+
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.runner: web.AppRunner | None = None
+        self.task: asyncio.Task | None = None
+        self.url: str | None = None
+
+        self.logger = logging.getLogger("greekMaster.mock")
+
+    # Market
+    def _list_instruments(self) -> dict[str, dict[str, dict]]:
+        """List the spots, perpetuals and the next futures of BTC."""
+        now = self.clock()
+        launch = str(int((now - 365 * 86_400) * 1000))
+        lotSize = {"qtyStep": "0.001", "minOrderQty": "0.001", "maxOrderQty": "1000"}
+        spot = {
+            f"BTC{quote}": {
+                "symbol": f"BTC{quote}",
+                "baseCoin": "BTC",
+                "quoteCoin": quote,
+                "status": "Trading",
+                "lotSizeFilter": {"basePrecision": "0.000001", "quotePrecision": "0.0001", "minOrderQty": "0.000048"},
+                "priceFilter": {"tickSize": "0.01"},
+            }
+            for quote in ["USDT", "USDC"]
+        }
+
+        def linear(symbol: str, quote: str, contractType: str, deliveryTime: int = 0, launchTime: str = launch) -> dict:
+            return {
+                "symbol": symbol,
+                "contractType": contractType,
+                "status": "Trading",
+                "baseCoin": "BTC",
+                "quoteCoin": quote,
+                "settleCoin": quote,
+                "launchTime": launchTime,
+                "deliveryTime": str(deliveryTime),
+                "fundingInterval": 480 if contractType == "LinearPerpetual" else 0,
+                "lotSizeFilter": lotSize,
+                "priceFilter": {"tickSize": "0.5"},
+            }
+
+        linears = {
+            "BTCUSDT": linear("BTCUSDT", "USDT", "LinearPerpetual"),
+            "BTCPERP": linear("BTCPERP", "USDC", "LinearPerpetual"),
+        }
+        for delivery in last_fridays(now):
+            symbol = f"BTC-{delivery.strftime('%d%b%y').upper()}"
+            # Listed a quarter before the delivery
+            launchTime = str(int((delivery.timestamp() - 91 * 86_400) * 1000))
+            linears[symbol] = linear(symbol, "USDC", "LinearFutures", int(delivery.timestamp() * 1000), launchTime)
+
+        return {"spot": spot, "linear": linears}
+
+    def index_price(self, t: np.ndarray | float) -> np.ndarray | float:
+        """Give the index price at epoch t (milliseconds)."""
+        if self.prices is not None:
+            return np.interp(t, *self.prices)
+        days = np.asarray(t, dtype=np.float64) / DAY_MS
+        curve = 1 + 0.15 * np.sin(2 * np.pi * days / 365) + 0.02 * np.sin(2 * np.pi * days / 7)
+        return BASE_PRICE * (curve + 0.004 * np.sin(2 * np.pi * days * 3.3))
+
+    def price(self, category: str, symbol: str, t: np.ndarray | float) -> np.ndarray | float:
+        """Give the price of a contract at epoch t (milliseconds)."""
+        index = self.index_price(t)
+        if category == "spot":
+            return index
+        instrument = self.instruments["linear"][symbol]
+        if instrument["contractType"] == "LinearPerpetual":
+            return index * (1 + PERPETUAL_PREMIUM)
+        timeLeft = np.maximum(int(instrument["deliveryTime"]) - np.asarray(t, dtype=np.float64), 0)
+        return index * (1 + BASIS * timeLeft / YEAR_MS)
+
+    def funding_rate(self, t: np.ndarray | float) -> np.ndarray | float:
+        """Give the funding rate settled at epoch t (milliseconds)."""
+        return 0.0001 + 0.00005 * np.sin(2 * np.pi * np.asarray(t, dtype=np.float64) / (7 * DAY_MS))
+
+    def ticker(self, category: str, symbol: str) -> dict:
+        """Give the tickers of a contract now, as get_tickers does (numbers as strings)."""
+        now = int(self.clock() * 1000)
+        last = float(self.price(category, symbol, now)) * (1 + self.rng.normal(0, 2e-5))
+        ticker = {
+            "symbol": symbol,
+            "lastPrice": f"{last:.2f}",
+            "bid1Price": f"{last - 0.5:.2f}",
+            "ask1Price": f"{last + 0.5:.2f}",
+            "bid1Size": "1.5",
+            "ask1Size": "1.5",
+            "prevPrice24h": f"{float(self.price(category, symbol, now - DAY_MS)):.2f}",
+            "volume24h": "1500.5",
+            "turnover24h": f"{1500.5 * last:.2f}",
+        }
+        if category == "linear":
+            instrument = self.instruments["linear"][symbol]
+            perpetual = instrument["contractType"] == "LinearPerpetual"
+            ticker |= {
+                "markPrice": f"{last:.2f}",
+                "indexPrice": f"{float(self.index_price(now)):.2f}",
+                "fundingRate": f"{float(self.funding_rate(now)):.6f}" if perpetual else "",
+                "nextFundingTime": str(now - now % FUNDING_MS + FUNDING_MS) if perpetual else "0",
+                "deliveryTime": instrument["deliveryTime"],
+                "openInterest": "1000",
+            }
+        return ticker
+
+    def _kline_times(self, interval: str, start: int | None, end: int, limit: int, first: int) -> list[int]:
+        """Give the startTimes of a kline request, oldest first (see klines for the selection)."""
+        oldest = max(start or 0, first)
+        if interval == "M":
+            months = pd.date_range(
+                pd.Timestamp(oldest, unit="ms").to_period("M").to_timestamp(), pd.Timestamp(end, unit="ms"), freq="MS"
+            )
+            times = [int(month.timestamp() * 1000) for month in months]
+            return times[:limit] if start is not None else times[-limit:]
+
+        step = INTERVALS_MS[interval]
+        oldest = -(-oldest // step) * step
+        newest = end - end % step
+        if start is not None:
+            return list(range(oldest, min(newest, oldest + (limit - 1) * step) + 1, step))
+        return list(range(max(oldest, newest - (limit - 1) * step), newest + 1, step))
+
+    def klines(  # noqa: PLR0913
+        self, category: str, symbol: str, interval: str, start: int | None, end: int | None, limit: int
+    ) -> list:
+        """Give the candles of a contract, newest first, as get_kline does.
+
+        With a start, the first limit candles from start. Without, the last limit candles until end (or now).
+        """
+        instrument = self.instruments[category][symbol]
+        end = min(end if end is not None else int(self.clock() * 1000), int(self.clock() * 1000))
+        # No candle after the delivery
+        if int(instrument.get("deliveryTime", 0)):
+            end = min(end, int(instrument["deliveryTime"]))
+        times = self._kline_times(interval, start, end, limit, int(instrument.get("launchTime", 0)))
+        if not times:
+            return []
+
+        startTimes = np.array(times, dtype=np.float64)
+        step = INTERVALS_MS.get(interval, 30 * DAY_MS)
+        openPrice = self.price(category, symbol, startTimes)
+        closePrice = self.price(category, symbol, startTimes + step)
+        middle = self.price(category, symbol, startTimes + step / 2)
+        highPrice = np.maximum.reduce([openPrice, closePrice, middle]) * 1.0005
+        lowPrice = np.minimum.reduce([openPrice, closePrice, middle]) * 0.9995
+        volume = step / 60_000 * 1.5
+        return [
+            [str(t), f"{o:.2f}", f"{h:.2f}", f"{lo:.2f}", f"{c:.2f}", f"{volume:.3f}", f"{volume * c:.2f}"]
+            for t, o, h, lo, c in reversed(list(zip(times, openPrice, highPrice, lowPrice, closePrice, strict=True)))
+        ]
+
+    def fundings(self, symbol: str, end: int | None, limit: int) -> list[dict]:
+        """Give the funding rates settled until end (or now), newest first."""
+        first = int(self.instruments["linear"][symbol]["launchTime"])
+        end = min(end if end is not None else int(self.clock() * 1000), int(self.clock() * 1000))
+        newest = end - end % FUNDING_MS
+        times = np.arange(newest, max(first, newest - limit * FUNDING_MS), -FUNDING_MS)
+        rates = self.funding_rate(times)
+        return [
+            {"symbol": symbol, "fundingRate": f"{rate:.6f}", "fundingRateTimestamp": str(t)}
+            for t, rate in zip(times.tolist(), rates, strict=True)
+        ]
+
+    # Account
+    def _settle(self) -> None:
+        """Close the positions of the delivered futures at their last price."""
+        now = int(self.clock() * 1000)
+        for symbol, size in list(self.account["positions"].items()):
+            delivery = int(self.instruments["linear"].get(symbol, {}).get("deliveryTime", 0))
+            if size and delivery and now >= delivery:
+                position = self.account["positions"].pop(symbol)
+                price = float(self.price("linear", symbol, delivery))
+                quote = self.instruments["linear"][symbol]["settleCoin"]
+                self.account["wallet"][quote] += position * (price - self.account["entries"][symbol])
+                self.logger.info(f"{symbol} delivered at {price:.2f}")
+
+    def wallet(self) -> dict:
+        """Give the wallet of the account, as get_wallet_balance does."""
+        self._settle()
+        now = int(self.clock() * 1000)
+        index = float(self.index_price(now))
+        margin = sum(
+            abs(size) * float(self.price("linear", symbol, now)) / self.account["leverage"].get(symbol, 1)
+            for symbol, size in self.account["positions"].items()
+        )
+        coins = []
+        for coin, quantity in self.account["wallet"].items():
+            usdValue = quantity * index if coin == "BTC" else quantity
+            coins.append(
+                {
+                    "coin": coin,
+                    "equity": f"{quantity:.8f}",
+                    "walletBalance": f"{quantity:.8f}",
+                    "usdValue": f"{usdValue:.4f}",
+                    "totalPositionIM": f"{margin:.4f}" if coin == "USDC" else "0",
+                }
+            )
+        total = sum(float(coin["usdValue"]) for coin in coins)
+        return {"accountType": "UNIFIED", "totalEquity": f"{total:.4f}", "coin": coins}
+
+    def position(self, symbol: str) -> dict:
+        """Give the position of a linear contract, as get_positions does."""
+        self._settle()
+        size = self.account["positions"].get(symbol, 0.0)
+        if not size:
+            return {"symbol": symbol, "side": "", "size": "0", "positionValue": "", "avgPrice": "0"}
+        entry = self.account["entries"][symbol]
+        return {
+            "symbol": symbol,
+            "side": "Buy" if size > 0 else "Sell",
+            "size": f"{abs(size):g}",
+            "positionValue": f"{abs(size) * entry:.4f}",
+            "avgPrice": f"{entry:.2f}",
+            "leverage": str(self.account["leverage"].get(symbol, 1)),
+        }
+
+    def order(self, params: dict) -> tuple[int, str, dict]:
+        """Fill a market order.
+
+        Returns:
+            tuple: (retCode, retMsg, result)
+
+        """
+        category, symbol, side = params.get("category"), params.get("symbol"), params.get("side")
+        if symbol not in self.instruments.get(category, {}):
+            return 10001, "params error: symbol invalid", {}
+        quantity = float(params["qty"])
+        price = float(self.price(category, symbol, int(self.clock() * 1000)))
+        wallet = self.account["wallet"]
+
+        if category == "spot":
+            quote = self.instruments["spot"][symbol]["quoteCoin"]
+            # Market buys are in quote coin, sells in base coin
+            if side == "Buy":
+                if quantity > wallet[quote]:
+                    return 170131, "Insufficient balance.", {}
+                wallet[quote] -= quantity
+                wallet["BTC"] += quantity / price * (1 - TAKER_FEES)
+            else:
+                if quantity > wallet["BTC"] + 1e-9:
+                    return 170131, "Insufficient balance.", {}
+                wallet["BTC"] -= quantity
+                wallet[quote] += quantity * price * (1 - TAKER_FEES)
+        else:
+            self._settle()
+            quote = self.instruments["linear"][symbol]["settleCoin"]
+            size = self.account["positions"].get(symbol, 0.0)
+            signed = quantity if side == "Buy" else -quantity
+            if params.get("reduceOnly") in (True, "true") and (size == 0 or size * signed > 0):
+                return 110017, "current position is zero, cannot fix reduce-only order qty", {}
+            entries = self.account["entries"]
+            if size * signed >= 0:
+                # Opening or increasing, average the entry
+                entries[symbol] = (abs(size) * entries.get(symbol, price) + quantity * price) / (abs(size) + quantity)
+            else:
+                # Reducing, realize the profit of the closed part
+                closed = min(quantity, abs(size))
+                wallet[quote] += closed * (price - entries[symbol]) * (1 if size > 0 else -1)
+            wallet[quote] -= quantity * price * TAKER_FEES
+            self.account["positions"][symbol] = round(size + signed, 8)
+
+        orderId = str(uuid4())
+        self._push_private(
+            "order",
+            [{"orderId": orderId, "symbol": symbol, "side": side, "qty": params["qty"], "orderStatus": "Filled"}],
+        )
+        self._push_private("wallet", [self.wallet()])
+        if category == "linear":
+            self._push_private("position", [self.position(symbol)])
+        return 0, "OK", {"orderId": orderId, "orderLinkId": ""}
+
+    # REST
+    def _limited(self, path: str) -> tuple[bool, dict]:
+        """Count a request in the window of its endpoint class.
+
+        Returns:
+            tuple: (True if over the limit, the limit headers)
+
+        """
+        name = endpoint_class(path)
+        second = int(time.time())
+        if (name, second) not in self.windows:
+            # A new window, forget the previous ones
+            self.windows = {key: count for key, count in self.windows.items() if key[1] == second}
+        count = self.windows[name, second] = self.windows.get((name, second), 0) + 1
+        limit = self.limits.get(name, MOCK_LIMITS["market"])
+        headers = {
+            "X-Bapi-Limit": str(limit),
+            "X-Bapi-Limit-Status": str(max(limit - count, 0)),
+            "X-Bapi-Limit-Reset-Timestamp": str((second + 1) * 1000),
+        }
+        return count > limit, headers
+
+    async def _handle(self, request: web.Request) -> web.Response:  # noqa: C901, PLR0911, PLR0912
+        """Answer a REST request."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        path = request.path
+        params = dict(request.query)
+        if request.method == "POST":
+            params = json.loads(await request.text() or "{}")
+
+        limited, headers = self._limited(path)
+        if limited:
+            return self._reply(10006, "Too many visits!", {}, headers)
+
+        private = path.startswith(("/v5/account", "/v5/asset", "/v5/position", "/v5/order"))
+        if private and "X-BAPI-API-KEY" not in request.headers:
+            return self._reply(10003, "API key is invalid.", {}, headers)
+
+        category = params.get("category")
+        symbol = params.get("symbol")
+        if category and category not in self.instruments:
+            return self._reply(10001, "Illegal category", {}, headers)
+        if symbol and category in self.instruments and symbol not in self.instruments[category]:
+            return self._reply(10001, "params error: symbol invalid", {}, headers)
+
+        def integer(key: str) -> int | None:
+            return int(params[key]) if params.get(key) not in (None, "") else None
+
+        match path:
+            case "/v5/market/kline":
+                result = {
+                    "symbol": symbol,
+                    "category": category,
+                    "list": self.klines(
+                        category,
+                        symbol,
+                        params["interval"],
+                        integer("start"),
+                        integer("end"),
+                        min(integer("limit") or 200, 1000),
+                    ),
+                }
+            case "/v5/market/tickers":
+                symbols = [symbol] if symbol else list(self.instruments[category])
+                result = {"category": category, "list": [self.ticker(category, s) for s in symbols]}
+            case "/v5/market/funding/history":
+                result = {
+                    "category": category,
+                    "list": self.fundings(symbol, integer("endTime"), min(integer("limit") or 200, 200)),
+                }
+            case "/v5/market/instruments-info":
+                items = list(self.instruments[category].values())
+                offset = integer("cursor") or 0
+                limit = min(integer("limit") or 500, 1000)
+                cursor = str(offset + limit) if offset + limit < len(items) else ""
+                result = {"category": category, "list": items[offset : offset + limit], "nextPageCursor": cursor}
+            case "/v5/account/wallet-balance":
+                result = {"list": [self.wallet()]}
+            case "/v5/asset/coin-greeks":
+                greeks = {"totalDelta": "0", "totalGamma": "0", "totalVega": "0", "totalTheta": "0"}
+                result = {"list": [{"baseCoin": params.get("baseCoin", "BTC")} | greeks]}
+            case "/v5/position/list":
+                result = {"category": category, "list": [self.position(symbol)]}
+            case "/v5/position/set-leverage":
+                if category != "linear":
+                    return self._reply(10001, "Illegal category", {}, headers)
+                leverage = float(params["buyLeverage"])
+                if self.account["leverage"].get(symbol, 1) == leverage:
+                    return self._reply(110043, "leverage not modified", {}, headers)
+                self.account["leverage"][symbol] = leverage
+                result = {}
+            case "/v5/order/create":
+                retCode, retMsg, result = self.order(params)
+                return self._reply(retCode, retMsg, result, headers)
+            case _:
+                return web.json_response({"retCode": 404, "retMsg": "Not found"}, status=404)
+
+        return self._reply(0, "OK", result, headers)
+
+    def _reply(self, retCode: int, retMsg: str, result: dict, headers: dict) -> web.Response:
+        """Build a response in the Bybit format."""
+        body = {
+            "retCode": retCode,
+            "retMsg": retMsg,
+            "result": result,
+            "retExtInfo": {},
+            "time": int(self.clock() * 1000),
+        }
+        return web.json_response(body, headers=headers)
+
+    # WebSocket
+    async def _websocket(self, request: web.Request) -> web.WebSocketResponse:
+        """Serve a public (/v5/public/{channel}) or the private (/v5/private) WebSocket."""
+        channel = request.match_info.get("channel", "private")
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.add(ws)
+        connId = str(next(self.counter))
+
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                data = json.loads(message.data)
+                answer = self._command(channel, ws, data)
+                answer["conn_id"] = connId
+                await ws.send_json(answer)
+
+                if data.get("op") == "subscribe" and channel != "private":
+                    # The first message of a stream is a snapshot
+                    for topic in data.get("args", []):
+                        await self._push(channel, topic, {ws})
+        finally:
+            self.sockets.discard(ws)
+            for subscribers in self.subscribers.values():
+                subscribers.discard(ws)
+        return ws
+
+    def _command(self, channel: str, ws: web.WebSocketResponse, data: dict) -> dict:
+        """Apply a ping/auth/subscribe/unsubscribe command, and give its answer."""
+        op = data.get("op")
+        answer = {"success": True, "ret_msg": "", "req_id": data.get("req_id"), "op": op}
+        topics = data.get("args", [])
+
+        if op == "ping":
+            answer["ret_msg"] = "pong"
+        elif op == "auth":
+            answer["success"] = channel == "private"
+        elif op in ("subscribe", "unsubscribe"):
+            if channel == "private" and not set(topics) <= set(PRIVATE_TOPICS):
+                return answer | {"success": False, "ret_msg": f"Invalid topics: {topics}"}
+            for topic in topics:
+                subscribers = self.subscribers.setdefault((channel, topic), set())
+                if op == "subscribe":
+                    subscribers.add(ws)
+                else:
+                    subscribers.discard(ws)
+        return answer
+
+    def _message(self, channel: str, topic: str) -> dict | None:
+        """Build the message of a public topic (tickers.{symbol} or kline.{interval}.{symbol})."""
+        now = int(self.clock() * 1000)
+        kind, *rest = topic.split(".")
+        symbol = rest[-1]
+        if symbol not in self.instruments.get(channel, {}):
+            return None
+        if kind == "tickers":
+            data = self.ticker(channel, symbol)
+            # The stream gives the delivery time as a date
+            if data.get("deliveryTime", "0") != "0":
+                delivery = datetime.datetime.fromtimestamp(int(data["deliveryTime"]) / 1000, datetime.UTC)
+                data["deliveryTime"] = delivery.strftime("%Y-%m-%dT%H:%M:%SZ")
+            return {"topic": topic, "type": "snapshot", "ts": now, "cs": next(self.counter), "data": data}
+        if kind == "kline":
+            interval = rest[0]
+            candle = self.klines(channel, symbol, interval, None, now, 1)
+            if not candle:
+                return None
+            startTime, openPrice, highPrice, lowPrice, closePrice, volume, turnover = candle[0]
+            step = INTERVALS_MS.get(interval, 30 * DAY_MS)
+            data = {
+                "start": int(startTime),
+                "end": int(startTime) + step - 1,
+                "interval": interval,
+                "open": openPrice,
+                "close": closePrice,
+                "high": highPrice,
+                "low": lowPrice,
+                "volume": volume,
+                "turnover": turnover,
+                "confirm": False,
+                "timestamp": now,
+            }
+            return {"topic": topic, "type": "snapshot", "ts": now, "data": [data]}
+        return None
+
+    async def _push(self, channel: str, topic: str, sockets: set) -> None:
+        """Send the current message of a topic to some sockets."""
+        message = self._message(channel, topic)
+        if message is None:
+            return
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for ws in list(sockets):
+            if not ws.closed:
+                try:
+                    await ws.send_json(message)
+                except ConnectionResetError:
+                    self.logger.warning(f"A subscriber of {topic} left")
+
+    def _push_private(self, topic: str, data: list) -> None:
+        """Send an account update to the private subscribers of a topic."""
+        message = {"id": str(uuid4()), "topic": topic, "creationTime": int(self.clock() * 1000), "data": data}
+        for ws in list(self.subscribers.get(("private", topic), ())):
+            if not ws.closed:
+                self.loop.create_task(ws.send_json(message))
+
+    async def _stream(self) -> None:
+        """Push every subscribed public topic, each tickInterval."""
+        while True:
+            await asyncio.sleep(self.tickInterval)
+            await asyncio.gather(
+                *(
+                    self._push(channel, topic, sockets)
+                    for (channel, topic), sockets in list(self.subscribers.items())
+                    if sockets and channel != "private"
+                )
+            )
+
+    # Server
+    def application(self) -> web.Application:
+        """Build the aiohttp application (REST and WebSockets on the same host)."""
+        app = web.Application()
+        app.router.add_get("/v5/public/{channel}", self._websocket)
+        app.router.add_get("/v5/private", self._websocket)
+        app.router.add_route("*", "/v5/{path:.*}", self._handle)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve on the running loop.
+
+        Args:
+            host (str): The interface to listen on
+            port (int): The port, 0 for a free one
+        Returns:
+            str: The base URL, to give to Fetcher(endpoint=...)
+
+        """
+        self.loop = asyncio.get_running_loop()
+        self.runner = web.AppRunner(self.application())
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        port = self.runner.addresses[0][1]
+        self.task = self.loop.create_task(self._stream())
+
+        self.url = f"http://{host}:{port}"
+        self.logger.info(f"Mock exchange on {self.url}")
+        return self.url
+
+    async def stop(self) -> None:
+        """Stop the streams and the server."""
+        if self.task is not None:
+            self.task.cancel()
+        for ws in list(self.sockets):
+            await ws.close()
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    def start_in_thread(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve from a loop of its own, in a daemon thread.
+
+        Needed when the caller blocks its loop, like the synchronous pybit session of the Fetcher.
+
+        Returns:
+            str: The base URL, to give to Fetcher(endpoint=...)
+
+        """
+        started = threading.Event()
+        loop = asyncio.new_event_loop()
+
+        def serve() -> None:
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start(host, port))
+            started.set()
+            loop.run_forever()
+
+        threading.Thread(target=serve, name="mock-exchange", daemon=True).start()
+        started.wait()
+        return self.url
@@ -0,0 +1,256 @@
+import datetime
+import json
+import logging
+import queue
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+import zstandard
+
+# Constants
+# Messages waiting for the writer, beyond them the new ones are dropped
+RECORDER_CAPACITY = 65_536
+# Uncompressed bytes of a zstd frame, and the longest time a message waits in the buffer
+FRAME_BYTES = 1 << 20
+FLUSH_SECONDS = 1.0
+# Messages taken from the queue per wake-up of the writer
+WRITER_BATCH = 1024
+# One file per hour of receive time, the files are named to the minute
+ROTATION_SECONDS = 3600
+COMPRESSION_LEVEL = 3
+TICKS_SUFFIX = ".jsonl.zst"
+
+
+class TickRecorder:
+    __slots__ = [
+        "buffer",
+        "capacity",
+        "compressor",
+        "counters",
+        "file",
+        "level",
+        "lock",
+        "logger",
+        "period",
+        "queue",
+        "root",
+        "rotation",
+        "thread",
+    ]
+
+    def __init__(
+        self,
+        root: str | Path = "store/ticks",
+        capacity: int = RECORDER_CAPACITY,
+        rotation: int = ROTATION_SECONDS,
+        level: int = COMPRESSION_LEVEL,
+    ) -> None:
+        """Append every WebSocket message, with its local receive time, to hourly zstd logs.
+
+        The messages are the text sent by Bybit (snapshots and deltas), before pybit merges them.
+        The sockets only put them in a bounded queue (see record), a writer thread adds them as JSON lines
+        to independent zstd frames of about FRAME_BYTES.
+        A frame is written when it is full, after FLUSH_SECONDS, or at the rotation: a crash loses at most
+        the frame being built. When the queue is full the messages are dropped and counted, the socket threads
+        never wait on the disk. The queue and the frame bound the memory.
+
+        Each line is [receive time in ns, channel, message],
+        the files are root/YYYYMMDD-HHMM.jsonl.zst (UTC start of their period).
+
+        Args:
+            root (str | Path): Folder of the logs
+            capacity (int): Maximum number of messages waiting for the writer
+            rotation (int): Seconds of receive time per file, a multiple of 60
+            level (int): zstd compression level
+
+        """
+        if rotation <= 0 or rotation % 60:
+            msg = f"The rotation must be a multiple of 60 seconds, not {rotation}"
+            raise ValueError(msg)
+        self.root = Path(root)
+        self.capacity = capacity
+        self.rotation = rotation
+        self.level = level
+
+        self.queue: queue.Queue = queue.Queue(maxsize=capacity)
+        self.lock = threading.Lock()
+        self.counters = {"recorded": 0, "dropped": 0, "written": 0, "frames": 0, "bytes": 0, "files": 0}
+
+        # Owned by the writer thread
+        self.compressor = zstandard.ZstdCompressor(level=level)
+        self.buffer = bytearray()
+        self.file = None
+        self.period: int | None = None
+        self.thread: threading.Thread | None = None
+
+        self.logger = logging.getLogger("greekMaster.recorder")
+
+    def start(self) -> None:
+        """Start the writer thread."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.thread = threading.Thread(target=self._write_loop, name="tick-recorder", daemon=True)
+        self.thread.start()
+
+    def record(self, channel: str, message: str) -> None:
+        """Queue a message, called from the WebSocket threads (see WebSocketManager.tap).
+
+        Args:
+            channel (str): The channel of the socket
+            message (str): The JSON text of the message
+
+        """
+        try:
+            self.queue.put_nowait((time.time_ns(), channel, message))
+        except queue.Full:
+            with self.lock:
+                self.counters["dropped"] += 1
+            return
+        with self.lock:
+            self.counters["recorded"] += 1
+
+    def path(self, period: int) -> Path:
+        """Give the file of a rotation period."""
+        start = datetime.datetime.fromtimestamp(period * self.rotation, datetime.UTC)
+        return self.root / f"{start:%Y%m%d-%H%M}{TICKS_SUFFIX}"
+
+    def _write_loop(self) -> None:
+        """Add the queued messages to the frame, and write it when it is full or old enough, until None is queued."""
+        deadline = time.monotonic() + FLUSH_SECONDS
+        running = True
+        while running:
+            batch = []
+            try:
+                batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                # Take what is waiting without blocking, one wake-up for many messages
+                while len(batch) < WRITER_BATCH:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            for item in batch:
+                if item is None:
+                    running = False
+                    break
+                receivedAt, channel, message = item
+                period = receivedAt // (self.rotation * 1_000_000_000)
+                if period != self.period:
+                    self._rotate(period)
+                # The text is already JSON, only a line break outside a string could split it
+                if "\n" in message:
+                    message = message.replace("\n", "")
+                self.buffer += f'[{receivedAt},"{channel}",{message}]\n'.encode()
+
+            if len(self.buffer) >= FRAME_BYTES or time.monotonic() >= deadline:
+                self._flush()
+                deadline = time.monotonic() + FLUSH_SECONDS
+        self._flush()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def _rotate(self, period: int) -> None:
+        """Write the frame of the previous period, and append to the file of the new one."""
+        self._flush()
+        if self.file is not None:
+            self.file.close()
+        self.period = period
+        # Appended, a restart within the hour adds frames to the same file
+        self.file = self.path(period).open("ab")
+        with self.lock:
+            self.counters["files"] += 1
+        self.logger.info(f"Recording to {self.file.name}")
+
+    def _flush(self) -> None:
+        """Compress the buffer into one frame and write it."""
+        if not self.buffer:
+            return
+        frame = self.compressor.compress(bytes(self.buffer))
+        self.file.write(frame)
+        self.file.flush()
+        with self.lock:
+            self.counters["written"] += self.buffer.count(b"\n")
+            self.counters["frames"] += 1
+            self.counters["bytes"] += len(frame)
+        self.buffer.clear()
+
+    def close(self) -> None:
+        """Write the waiting messages, stop the writer thread, and log the counters."""
+        if self.thread is not None:
+            # Waits for a free slot, the writer keeps emptying the queue
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        self.logger.info(f"Tick recorder: {self.stats()}")
+
+    def stats(self) -> dict:
+        """Give the counters.
+
+        Returns:
+            dict:
+                recorded: Messages queued
+                dropped: Messages refused because the queue was full
+                written: Messages written to the disk
+                frames: Number of zstd frames written
+                bytes: Compressed bytes written
+                files: Number of files opened
+
+        """
+        with self.lock:
+            return dict(self.counters)
+
+
+def read_ticks(files: str | Path | list[str | Path]) -> Iterator[tuple[int, str, dict]]:
+    """Read the messages of recorded logs, in the order of the files.
+
+    A frame cut by a crash ends the file.
+
+    Args:
+        files (str | Path | list[str | Path]): Log files, or a folder of logs (read in time order)
+
+    Returns:
+        Iterator[tuple[int, str, dict]]: (receive time in ns, channel, message) of each message
+
+    """
+    if isinstance(files, str | Path) and Path(files).is_dir():
+        files = sorted(Path(files).glob(f"*{TICKS_SUFFIX}"))
+    elif isinstance(files, str | Path):
+        files = [files]
+
+    decompressor = zstandard.ZstdDecompressor()
+    for file in files:
+        with Path(file).open("rb") as f, decompressor.stream_reader(f, read_across_frames=True) as reader:
+            rest = b""
+            try:
+                while chunk := reader.read(FRAME_BYTES):
+                    lines = (rest + chunk).split(b"\n")
+                    rest = lines.pop()
+                    for line in lines:
+                        receivedAt, channel, message = json.loads(line)
+                        yield receivedAt, channel, message
+            except zstandard.ZstdError:
+                logging.getLogger("greekMaster.recorder").warning(f"{file} ends with a truncated frame")
+
+
+def merge_tickers(records: Iterable[tuple[int, str, dict]]) -> Iterator[tuple[str, dict]]:
+    """Merge the deltas of the recorded tickers streams into full messages, like pybit gives them to the callbacks.
+
+    Args:
+        records (Iterable[tuple[int, str, dict]]): Recorded messages (see read_ticks)
+
+    Returns:
+        Iterator[tuple[str, dict]]: (channel, message) of each ticker, for TickTape.from_messages
+
+    """
+    data: dict[tuple[str, str], dict] = {}
+    for _, channel, message in records:
+        topic = message.get("topic", "")
+        if not topic.startswith("tickers."):
+            continue
+        key = (channel, topic)
+        if message["type"] == "snapshot" or key not in data:
+            data[key] = dict(message["data"])
+        else:
+            data[key].update(message["data"])
+        yield channel, {**message, "type": "snapshot", "data": dict(data[key])}
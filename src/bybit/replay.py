@@ -0,0 +1,566 @@
+import asyncio
+import itertools
+import logging
+import re
+import time
+from collections.abc import Callable, Iterable
+
+import numpy as np
+
+from bybit.api_fetcher import Fetcher
+from bybit.backtest import SETTLEMENT_MS, SPOT_TAKER_FEES, delivery_time
+from bybit.client import BybitClient
+from bybit.greek_master import GreekMaster
+from bybit.store import BASE_INTERVAL, KlineStore
+from bybit.ticker import Ticker
+from bybit.utils import INTERVALS_MS
+
+# Constants
+# Loop iterations given after a tick: one wakes the bus, one runs the strategy on the pair
+LOOP_STEPS = 2
+# Linear taker fees, like Analyser.position_calculator
+LINEAR_TAKER_FEES = 0.00055
+QUOTE_COINS = ("USDC", "USDT")
+TICKER_FIELDS = ["last", "bid", "ask", "mark", "funding", "delivery", "volume"]
+DATED_FUTURE = re.compile(r"-\d{2}[A-Z]{3}\d{2}$")
+
+
+def split_spot(symbol: str) -> tuple[str, str]:
+    """Give the base and quote coins of a spot symbol (e.g. BTCUSDC -> BTC, USDC)."""
+    quote = next(coin for coin in QUOTE_COINS if symbol.endswith(coin))
+    return symbol[: -len(quote)], quote
+
+
+class VirtualClock:
+    __slots__ = ["now"]
+
+    def __init__(self, now: float = 0.0) -> None:
+        """Time of a replay, epoch in seconds: the timestamp of the last tick given to the handlers."""
+        self.now = now
+
+    def advance(self, now: float) -> None:
+        """Move the clock forward, never backward."""
+        self.now = max(self.now, now)
+
+
+class TickTape:
+    __slots__ = ["columns", "keys", "positions", "streams", "times"]
+
+    def __init__(
+        self, streams: list[tuple[str, str]], times: np.ndarray, keys: np.ndarray, columns: dict[str, np.ndarray]
+    ) -> None:
+        """Ticker messages of several streams, as columns ordered by time.
+
+        The Tickers are only built when they are replayed, so a year of 1-minute ticks fits in a few arrays.
+
+        Args:
+            streams (list[tuple[str, str]]): (channel, symbol) of each stream
+            times (np.ndarray): Timestamp of each tick, epoch in seconds
+            keys (np.ndarray): Index of the stream of each tick
+            columns (dict[str, np.ndarray]): Each field of the Ticker (see TICKER_FIELDS), for each tick
+
+        """
+        order = np.argsort(times, kind="stable")
+        self.streams = streams
+        self.times = np.asarray(times, dtype=np.float64)[order]
+        self.keys = np.asarray(keys, dtype=np.int32)[order]
+        self.columns = {field: np.asarray(columns[field], dtype=np.float64)[order] for field in TICKER_FIELDS}
+
+        # Positions of the ticks of each stream, for the fills
+        self.positions = [np.flatnonzero(self.keys == key) for key in range(len(streams))]
+
+    @classmethod
+    def from_messages(cls, messages: Iterable[tuple[str, dict]]) -> "TickTape":
+        """Build a tape from recorded messages of the tickers streams.
+
+        Args:
+            messages (Iterable[tuple[str, dict]]): (channel, message) pairs, the messages as pybit gives them
+                (e.g. merge_tickers of the logs of a TickRecorder)
+
+        """
+        streams: dict[tuple[str, str], int] = {}
+        times, keys = [], []
+        columns = {field: [] for field in TICKER_FIELDS}
+        for channel, message in messages:
+            ticker = Ticker.from_message(message)
+            keys.append(streams.setdefault((channel, ticker.symbol), len(streams)))
+            times.append(ticker.ts)
+            for field in TICKER_FIELDS:
+                columns[field].append(getattr(ticker, field))
+        return cls(list(streams), np.array(times), np.array(keys), columns)
+
+    @classmethod
+    def from_store(
+        cls,
+        streams: list[tuple[str, str]],
+        root: str = "store",
+        interval: str = BASE_INTERVAL,
+        start: int | str | None = None,
+        end: int | str | None = None,
+    ) -> "TickTape":
+        """Build a synthetic tape from stored klines: one tick per candle, at its close, priced at its close.
+
+        The klines have no order book, the bid and ask are the close.
+
+        Args:
+            streams (list[tuple[str, str]]): (channel, symbol) of each stream, spot or linear
+            root (str): The root of the kline store
+            interval (str): The interval of the klines
+            start (int | str | None): Oldest startTime to load, epoch in milliseconds or a date (see get_epoch)
+            end (int | str | None): Newest startTime to load, epoch in milliseconds or a date (see get_epoch)
+
+        """
+        store = KlineStore(root)
+        times, keys = [], []
+        columns = {field: [] for field in TICKER_FIELDS}
+        for key, (channel, symbol) in enumerate(streams):
+            klines = store.load(symbol, interval, channel, start=start, end=end, columns=["closePrice"])
+            close = klines["closePrice"].to_numpy(np.float64)
+            times.append((klines["startTime"].to_numpy(np.int64) + INTERVALS_MS[interval]) / 1000)
+            keys.append(np.full(len(close), key))
+            delivery = delivery_time(symbol) / 1000 if DATED_FUTURE.search(symbol) else 0.0
+            fields = {"last": close, "bid": close, "ask": close, "mark": close if channel != "spot" else 0.0}
+            fields |= {"funding": 0.0, "delivery": delivery, "volume": 0.0}
+            for field in TICKER_FIELDS:
+                columns[field].append(np.broadcast_to(fields[field], close.shape))
+        return cls(
+            streams,
+            np.concatenate(times),
+            np.concatenate(keys),
+            {field: np.concatenate(values) for field, values in columns.items()},
+        )
+
+    def __len__(self) -> int:
+        """Give the number of ticks."""
+        return len(self.times)
+
+    def ticker(self, i: int) -> Ticker:
+        """Build the Ticker of the tick i."""
+        columns = self.columns
+        return Ticker(
+            self.streams[self.keys[i]][1],
+            float(columns["last"][i]),
+            float(columns["bid"][i]),
+            float(columns["ask"][i]),
+            float(columns["mark"][i]),
+            float(columns["funding"][i]),
+            float(columns["delivery"][i]),
+            float(columns["volume"][i]),
+            float(self.times[i]),
+        )
+
+    def key(self, channel: str, symbol: str) -> int:
+        """Give the index of a stream, ValueError if it is not on the tape."""
+        return self.streams.index((channel, symbol))
+
+    def quote(self, key: int, ts: float) -> int | None:
+        """Give the position of the last tick of a stream at or before ts, None if there is none."""
+        positions = self.positions[key]
+        k = np.searchsorted(self.times[positions], ts, side="right") - 1
+        return int(positions[k]) if k >= 0 else None
+
+    def average(self, key: int, start: float, end: float) -> float | None:
+        """Give the average last price of a stream between start and end, None without a tick."""
+        positions = self.positions[key]
+        lower, upper = np.searchsorted(self.times[positions], [start, end], side="right")
+        if lower == upper:
+            return None
+        return float(self.columns["last"][positions[lower:upper]].mean())
+
+
+class SimulatedSockets:
+    __slots__ = ["counter", "handlers", "tape", "tokens"]
+
+    def __init__(self, tape: TickTape) -> None:
+        """Subscriptions of a replay, in place of the WebSocketManager: the ReplayEngine calls the handlers.
+
+        Args:
+            tape (TickTape): The tape the subscriptions are on
+
+        """
+        self.tape = tape
+        # {stream: {token: handler}}
+        self.handlers: dict[int, dict[int, Callable]] = {}
+        self.tokens: dict[int, int] = {}
+        self.counter = itertools.count()
+
+    async def ticker_streams(self, streams: list[tuple[str, str, Callable]], timeout: float = 0.0) -> list[int]:  # noqa: ASYNC109, ARG002
+        """Subscribe to several tickers at once (see WebSocketManager.ticker_streams)."""
+        tokens = []
+        for channel, symbol, handler in streams:
+            key = self.tape.key(channel, symbol)
+            token = next(self.counter)
+            self.tokens[token] = key
+            self.handlers.setdefault(key, {})[token] = handler
+            tokens.append(token)
+        return tokens
+
+    def unsubscribe(self, token: int) -> None:
+        """Remove a subscriber (see WebSocketManager.unsubscribe)."""
+        key = self.tokens.pop(token, None)
+        if key is None:
+            return
+        handlers = self.handlers[key]
+        handlers.pop(token)
+        if not handlers:
+            del self.handlers[key]
+
+    def close(self) -> None:
+        """Forget every subscription."""
+        self.handlers.clear()
+        self.tokens.clear()
+
+
+class SimulatedFetcher(Fetcher):
+    __slots__ = ["clock", "fills", "latency", "leverages", "positions", "slippage", "tape", "wallet"]
+
+    def __init__(
+        self,
+        tape: TickTape,
+        clock: VirtualClock,
+        latency: float = 0.05,
+        slippage: float = 0.0,
+        wallet: dict[str, float] | None = None,
+    ) -> None:
+        """Account of a replay, in place of the Fetcher of a client: the orders fill on the tape.
+
+        A market order fills on the last tick of its symbol latency seconds after the clock,
+        at the ask for a buy and the bid for a sell, moved against the order by the slippage.
+        The spot fees are taken in the received coin, the linear fees in the settlement coin.
+        Only the methods used by the clients and GreekMaster are simulated, the others need a session.
+
+        Args:
+            tape (TickTape): The replayed tape
+            clock (VirtualClock): The clock of the replay
+            latency (float): Seconds between an order and its fill
+            slippage (float): Fraction of the price lost on each fill (e.g. 0.0002 for 2 bps)
+            wallet (dict[str, float] | None): Balance of each coin, 10000 USDC if None
+
+        """
+        self.tape = tape
+        self.clock = clock
+        self.latency = latency
+        self.slippage = slippage
+        self.wallet = dict(wallet or {"USDC": 10_000.0})
+        # {symbol: (quantity, entry price)}, the quantity is negative for a short
+        self.positions: dict[str, tuple[float, float]] = {}
+        self.leverages: dict[str, str] = {}
+        self.fills: list[dict] = []
+
+        self.sockets = SimulatedSockets(tape)
+        self.logger = logging.getLogger("greekMaster.replay.fetcher")
+
+    async def close(self) -> None:
+        """Nothing to close."""
+
+    def close_websockets(self) -> None:
+        """Forget the subscriptions."""
+        self.sockets.close()
+
+    def _fill_price(self, category: str, symbol: str, side: str) -> tuple[float, float]:
+        """Give the fill time and price of a market order sent now."""
+        filledAt = self.clock.now + self.latency
+        i = self.tape.quote(self.tape.key(category, symbol), filledAt)
+        if i is None:
+            msg = f"No price for {symbol} at {filledAt}"
+            raise ValueError(msg)
+        columns = self.tape.columns
+        if side == "Buy":
+            price = (columns["ask"][i] or columns["last"][i]) * (1 + self.slippage)
+        else:
+            price = (columns["bid"][i] or columns["last"][i]) * (1 - self.slippage)
+        return filledAt, float(price)
+
+    def _trade_linear(self, symbol: str, quantity: float, side: str, price: float) -> float:
+        """Update the position of a linear contract, and give its realized P&L."""
+        held, entry = self.positions.get(symbol, (0.0, 0.0))
+        signed = quantity if side == "Buy" else -quantity
+        if held * signed >= 0:
+            # Opened or increased, the entry is the average of the trades
+            remaining = held + signed
+            self.positions[symbol] = (remaining, (held * entry + signed * price) / remaining)
+            return 0.0
+
+        realized = min(abs(held), abs(signed)) * (price - entry) * np.sign(held)
+        remaining = held + signed
+        if abs(remaining) < 1e-12:
+            self.positions.pop(symbol)
+        else:
+            # Reduced, or flipped at the price
+            self.positions[symbol] = (remaining, entry if remaining * held > 0 else price)
+        return float(realized)
+
+    async def set_leverage(self, symbol: str, leverage: str) -> dict | None:
+        """Remember the leverage of a symbol."""
+        self.leverages[symbol] = leverage
+        return None
+
+    async def place_order(
+        self,
+        symbol: str,
+        quantity: float,
+        side: str,
+        category: str,
+        reduce_only: bool = False,  # noqa: ARG002
+    ) -> dict:
+        """Fill a market order on the tape (see Fetcher.place_order).
+
+        Like Bybit, a spot buy is a quantity of quote coin, a spot sell a quantity of base coin.
+
+        Returns:
+            dict: The fill
+
+        """
+        filledAt, price = self._fill_price(category, symbol, side)
+        if category == "spot":
+            base, quote = split_spot(symbol)
+            if side == "Buy":
+                self.wallet[quote] = self.wallet.get(quote, 0.0) - quantity
+                received = quantity / price * (1 - SPOT_TAKER_FEES)
+                self.wallet[base] = self.wallet.get(base, 0.0) + received
+                fee = quantity * SPOT_TAKER_FEES
+            else:
+                self.wallet[base] = self.wallet.get(base, 0.0) - quantity
+                received = quantity * price * (1 - SPOT_TAKER_FEES)
+                self.wallet[quote] = self.wallet.get(quote, 0.0) + received
+                fee = quantity * price * SPOT_TAKER_FEES
+            pnl = 0.0
+        else:
+            settleCoin = "USDT" if symbol.endswith("USDT") else "USDC"
+            fee = quantity * price * LINEAR_TAKER_FEES
+            pnl = self._trade_linear(symbol, quantity, side, price)
+            self.wallet[settleCoin] = self.wallet.get(settleCoin, 0.0) + pnl - fee
+
+        fill = {
+            "time": filledAt,
+            "symbol": symbol,
+            "category": category,
+            "side": side,
+            "quantity": quantity,
+            "price": price,
+            "fee": fee,
+            "pnl": pnl,
+        }
+        self.fills.append(fill)
+        self.logger.info(f"Filled {side} {quantity} {symbol} at {price:.2f}")
+        return fill
+
+    def _settle(self, symbol: str) -> None:
+        """Deliver a dated future at the average price of its last 30 minutes."""
+        quantity, entry = self.positions.pop(symbol)
+        delivery = delivery_time(symbol) / 1000
+        key = self.tape.key("linear", symbol)
+        price = self.tape.average(key, delivery - SETTLEMENT_MS / 1000, delivery)
+        if price is None:
+            price = float(self.tape.columns["last"][self.tape.quote(key, delivery)])
+        pnl = quantity * (price - entry)
+        settleCoin = "USDT" if symbol.endswith("USDT") else "USDC"
+        self.wallet[settleCoin] = self.wallet.get(settleCoin, 0.0) + pnl
+        fill = {"time": delivery, "symbol": symbol, "category": "linear", "side": "Delivery"}
+        self.fills.append(fill | {"quantity": abs(quantity), "price": price, "fee": 0.0, "pnl": pnl})
+        self.logger.info(f"{symbol} delivered at {price:.2f}")
+
+    async def get_position(self, symbol: str) -> dict:
+        """Give the position of a linear contract, a dated future is delivered once the clock reaches it."""
+        if symbol in self.positions and DATED_FUTURE.search(symbol) and self.clock.now >= delivery_time(symbol) / 1000:
+            self._settle(symbol)
+        quantity, entry = self.positions.get(symbol, (0.0, 0.0))
+        if quantity == 0:
+            return {"qty": "0", "positionValue": ""}
+        return {"qty": str(abs(quantity)), "positionValue": str(abs(quantity) * entry)}
+
+    def get_wallet(self) -> dict:
+        """Give the wallet in the format of Fetcher.get_wallet (without margin, everything is available)."""
+        wallet = {"Balance": self.equity()}
+        for coin in ["BTC", "USDC", "USDT"]:
+            quantity = self.wallet.get(coin)
+            wallet[coin] = (
+                None
+                if quantity is None
+                else {"Quantity": quantity, "Available": quantity, "TotalPositionIM": 0.0, "usdValue": 0.0}
+            )
+        return wallet
+
+    async def get_greeks(self, baseCoin: str | None = None) -> dict | None:  # noqa: ARG002
+        """No options in a replay."""
+        return None
+
+    def mark(self, channel: str, symbol: str) -> float | None:
+        """Give the last price of a stream at the clock, None without a tick."""
+        i = self.tape.quote(self.tape.key(channel, symbol), self.clock.now)
+        return None if i is None else float(self.tape.columns["last"][i])
+
+    def equity(self) -> float:
+        """Value of the account in quote coins: the coins at their last spot price, and the open positions."""
+        value = 0.0
+        for coin, quantity in self.wallet.items():
+            if coin in QUOTE_COINS:
+                value += quantity
+                continue
+            price = next(
+                (
+                    self.mark("spot", symbol)
+                    for channel, symbol in self.tape.streams
+                    if channel == "spot" and symbol.startswith(coin) and symbol[len(coin) :] in QUOTE_COINS
+                ),
+                None,
+            )
+            value += quantity * (price or 0.0)
+        for symbol, (quantity, entry) in self.positions.items():
+            value += quantity * ((self.mark("linear", symbol) or entry) - entry)
+        return value
+
+
+class ReplayEngine:
+    __slots__ = ["busy", "clock", "cursor", "events", "fetcher", "logger", "tape"]
+
+    def __init__(
+        self,
+        tape: TickTape,
+        latency: float = 0.05,
+        slippage: float = 0.0,
+        wallet: dict[str, float] | None = None,
+    ) -> None:
+        """Event-driven replay of a tape through the unchanged client code.
+
+        The ticks are given one by one to the handlers of the client (short_handler, long_handler),
+        on a virtual clock and as fast as the loop runs them. The client trades on a SimulatedFetcher,
+        so its executor, its strategy and the delivery exit of GreekMaster are the production ones.
+
+        Args:
+            tape (TickTape): The ticks to replay
+            latency (float): Seconds between an order and its fill
+            slippage (float): Fraction of the price lost on each fill
+            wallet (dict[str, float] | None): Balance of each coin at the start
+
+        """
+        self.tape = tape
+        self.clock = VirtualClock(float(tape.times[0]) if len(tape) else 0.0)
+        self.fetcher = SimulatedFetcher(tape, self.clock, latency=latency, slippage=slippage, wallet=wallet)
+        # Next tick to replay, ticks given to a handler, and wall time spent replaying
+        self.cursor = 0
+        self.events = 0
+        self.busy = 0.0
+
+        self.logger = logging.getLogger("greekMaster.replay")
+
+    async def feed(self, stop: Callable[[], bool], until: float = np.inf) -> None:
+        """Give the ticks to the handlers until stop() is True, the clock reaches until, or the tape ends.
+
+        Each tick is followed by LOOP_STEPS iterations of the loop, so the strategy sees it before the next one.
+        The ticks of streams without a subscriber are skipped at once.
+
+        Args:
+            stop (Callable[[], bool]): Checked before each tick
+            until (float): Epoch in seconds of the first tick not to replay
+
+        """
+        tape, handlers = self.tape, self.fetcher.sockets.handlers
+        keys, times = tape.keys, tape.times
+        end = int(np.searchsorted(times, until, side="left"))
+        while self.cursor < end and not stop():
+            i = self.cursor
+            self.cursor += 1
+            callbacks = handlers.get(keys[i])
+            if callbacks is None:
+                if not handlers:
+                    # Nobody listens, jump to the end
+                    self.cursor = end
+                continue
+            self.clock.advance(float(times[i]))
+            ticker = tape.ticker(i)
+            for callback in list(callbacks.values()):
+                callback(ticker)
+            self.events += 1
+            for _ in range(LOOP_STEPS):
+                await asyncio.sleep(0)
+        if self.cursor >= end and until != np.inf:
+            self.clock.advance(until)
+
+    async def run_round(  # noqa: PLR0913
+        self,
+        client: BybitClient,
+        long: str,
+        short: str,
+        balance: float,
+        leverage: str = "1",
+        minimumGap: float = -0.2,
+    ) -> dict | None:
+        """Replay one round of the client: enter with base_executor, then exit on the delivery with GreekMaster.
+
+        Args:
+            client (BybitClient): A client built with this engine's fetcher
+            long (str): The long symbol (e.g. BTCUSDT (Spot))
+            short (str): The short dated future (e.g. BTC-27DEC24)
+            balance (float): The quantity to invest, in USDC
+            leverage (str): The leverage of the future
+            minimumGap (float): The minimum gap in percent of the strategy
+
+        Returns:
+            dict | None: The round (entry and exit times, P&L in quote coin), None without an entry before the delivery
+
+        """
+        started = time.perf_counter()
+        master = GreekMaster(client)
+        master._new_round()  # noqa: SLF001
+        client.balance = balance
+        client.longContract["symbol"] = long
+        client.shortContract["symbol"] = short
+        equity = self.fetcher.equity()
+
+        executor = asyncio.create_task(client.base_executor(client.most_basic_arb, leverage, minimumGap))
+        # The handlers are subscribed by the executor, the strategy stops the feed when it triggers
+        while not self.fetcher.sockets.handlers and not executor.done():  # noqa: ASYNC110
+            await asyncio.sleep(0)
+        # The future is not streamed after its delivery
+        delivery = delivery_time(short) / 1000
+        await self.feed(stop=lambda: not client.active or executor.done(), until=delivery)
+
+        if client.active and not executor.done():
+            executor.cancel()
+            client._deactivate_websockets()  # noqa: SLF001
+            self.busy += time.perf_counter() - started
+            self.logger.info(f"No entry on {short} before its delivery")
+            return None
+        await executor
+        enteredAt = self.clock.now
+
+        # Like GreekMaster._friday_job, the position is checked every second once the delivery is there
+        master.watching = True
+        await self.feed(stop=lambda: False, until=delivery)
+        while master.watching:
+            await master._exit_on_delivery()  # noqa: SLF001
+            self.clock.advance(self.clock.now + 1)
+
+        self.busy += time.perf_counter() - started
+        return {
+            "long": long,
+            "short": short,
+            "entry": enteredAt,
+            "exit": self.clock.now,
+            "balance": balance,
+            "pnl": self.fetcher.equity() - equity,
+        }
+
+    def report(self) -> dict:
+        """Give the throughput and the simulated P&L of the replay.
+
+        Returns:
+            dict:
+                events: Ticks given to the handlers
+                seconds: Wall time of the rounds
+                eventsPerSecond: Throughput of the replay
+                fills: Number of fills
+                fees: Fees paid, in quote coin
+                equity: Value of the account at the clock (see SimulatedFetcher.equity)
+
+        """
+        fills = self.fetcher.fills
+        return {
+            "events": self.events,
+            "seconds": self.busy,
+            "eventsPerSecond": self.events / self.busy if self.busy else 0.0,
+            "fills": len(fills),
+            "fees": sum(fill["fee"] for fill in fills),
+            "equity": self.fetcher.equity(),
+        }
@@ -0,0 +1,316 @@
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    """Priority of a request, lower goes first."""
+
+    TRADE = 0
+    ACCOUNT = 1
+    MARKET = 2
+    BACKFILL = 3
+
+
+# Endpoint class of each path prefix
+ENDPOINT_CLASSES = {
+    "/v5/order": "trade",
+    "/v5/position": "position",
+    "/v5/account": "account",
+    "/v5/asset": "account",
+    "/v5/market": "market",
+}
+
+# Default rate (requests per second) and burst of each endpoint class
+# Link: https://bybit-exchange.github.io/docs/v5/rate-limit
+# The IP limit is 600 requests per 5 seconds for everything, so the sum stays under 120/s
+DEFAULT_LIMITS = {
+    "market": (50, 50),
+    "trade": (10, 10),
+    "position": (10, 10),
+    "account": (10, 10),
+}
+
+# Bybit answers with retCode 10006 when a limit is breached, or HTTP 429/403 for the IP limit
+RATE_LIMIT_CODES = {10006}
+RATE_LIMIT_STATUS = {403, 429}
+
+
+def endpoint_class(path: str) -> str:
+    """Give the endpoint class of a path (e.g. /v5/market/kline -> market)."""
+    return next((name for prefix, name in ENDPOINT_CLASSES.items() if path.startswith(prefix)), "market")
+
+
+class TokenBucket:
+    __slots__ = ["blocked_until", "capacity", "rate", "tokens", "updated"]
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """Token bucket for one endpoint class.
+
+        Args:
+            rate (float): Tokens added per second
+            capacity (float): Maximum number of tokens (burst)
+
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        # Set when the exchange says the limit is exhausted
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Give the number of seconds before a token is available (0 if one is available now)."""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        """Consume a token, delay() must have returned 0."""
+        self.tokens -= 1
+
+    def block(self, seconds: float) -> None:
+        """Give no token for the next seconds."""
+        self.tokens = 0
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def sync(self, headers: dict) -> None:
+        """Align the bucket with the limit headers returned by Bybit.
+
+        Headers:
+            X-Bapi-Limit: Limit of the endpoint, per second
+            X-Bapi-Limit-Status: Remaining requests in the current window
+            X-Bapi-Limit-Reset-Timestamp: End of the current window, epoch in milliseconds
+        """
+        if headers is None or "X-Bapi-Limit" not in headers:
+            return
+
+        limit = float(headers["X-Bapi-Limit"])
+        remaining = float(headers.get("X-Bapi-Limit-Status", limit))
+        self.rate = self.capacity = limit
+        self.tokens = min(self.tokens, remaining)
+
+        if remaining <= 0 and "X-Bapi-Limit-Reset-Timestamp" in headers:
+            self.block(int(headers["X-Bapi-Limit-Reset-Timestamp"]) / 1000 - time.time())
+
+
+class RequestScheduler:
+    __slots__ = [
+        "buckets",
+        "counter",
+        "dispatcher",
+        "inflight",
+        "logger",
+        "loop",
+        "max_retries",
+        "queues",
+        "stats",
+        "tasks",
+        "wakeup",
+        "workers",
+    ]
+
+    def __init__(self, workers: int = 8, limits: dict = DEFAULT_LIMITS, max_retries: int = 5) -> None:
+        """Schedule every REST request of a Fetcher.
+
+        Each endpoint class has its own token bucket and its own priority queue.
+        The dispatcher always starts the most urgent request whose bucket has a token,
+        so trading calls go ahead of backfill calls.
+        At most `workers` requests are in flight, and backfill can never take the last slot.
+
+        Requests hitting a rate limit (retCode 10006, HTTP 429/403) block their bucket until
+        the reset timestamp, then go back to the queue.
+
+        Args:
+            workers (int): Maximum number of requests in flight
+            limits (dict): Rate and burst of each endpoint class
+            max_retries (int): Number of retries after a rate limit error
+
+        """
+        self.workers = workers
+        self.max_retries = max_retries
+        self.buckets = {name: TokenBucket(rate, capacity) for name, (rate, capacity) in limits.items()}
+        self.queues: dict[str, list] = {name: [] for name in limits}
+        self.stats = {
+            name: {"queued": 0, "sent": 0, "throttled": 0, "waitTime": 0.0, "maxWait": 0.0} for name in limits
+        }
+
+        self.counter = itertools.count()
+        self.inflight = 0
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.dispatcher: asyncio.Task | None = None
+        self.tasks: set[asyncio.Task] = set()
+        self.wakeup: asyncio.Event | None = None
+
+        self.logger = logging.getLogger("greekMaster.client.fetcher.scheduler")
+
+    def counters(self) -> dict:
+        """Give the queue depth and the wait time counters of each endpoint class.
+
+        Returns:
+            dict:
+                Endpoint class:
+                    queued: Number of requests waiting
+                    sent: Number of requests sent
+                    throttled: Number of rate limit errors
+                    waitTime: Total time spent in the queue, in seconds
+                    maxWait: Longest time spent in the queue, in seconds
+                    meanWait: Mean time spent in the queue, in seconds
+
+        """
+        return {
+            name: {**stat, "meanWait": stat["waitTime"] / stat["sent"] if stat["sent"] else 0.0}
+            for name, stat in self.stats.items()
+        }
+
+    async def submit(
+        self,
+        path: str,
+        call: Callable[[], Awaitable[tuple[int, dict, dict]]],
+        priority: Priority = Priority.MARKET,
+    ) -> tuple[int, dict, dict]:
+        """Queue a request and wait for its response.
+
+        Args:
+            path (str): The path of the endpoint, used to find its endpoint class
+            call (callable): Sends the request, returns (status, body, headers). Called again on retries.
+            priority (Priority): The priority of the request
+        Returns:
+            tuple: (status, body, headers) of the last attempt
+
+        """
+        # The dispatcher lives in the event loop of the first request
+        if self.loop is not asyncio.get_running_loop():
+            self.loop = asyncio.get_running_loop()
+            self.wakeup = asyncio.Event()
+            self.inflight = 0
+            for name, queue in self.queues.items():
+                queue.clear()
+                self.stats[name]["queued"] = 0
+            self.dispatcher = self.loop.create_task(self._dispatch())
+
+        name = endpoint_class(path)
+        future = self.loop.create_future()
+        self._push(name, (priority, next(self.counter), time.monotonic(), 0, call, future))
+        return await future
+
+    def _push(self, name: str, item: tuple) -> None:
+        heapq.heappush(self.queues[name], item)
+        self.stats[name]["queued"] += 1
+        self.wakeup.set()
+
+    def _next(self) -> tuple[str | None, float]:
+        """Find the most urgent request that can be sent now.
+
+        Returns:
+            tuple: (endpoint class, 0) if a request can be sent, else (None, seconds before the next token)
+
+        """
+        best = None
+        sleep = None
+        for name, queue in self.queues.items():
+            if not queue:
+                continue
+            priority = queue[0][0]
+            # Keep the last slot for anything more urgent than a backfill
+            if priority == Priority.BACKFILL and self.inflight >= self.workers - 1:
+                continue
+            delay = self.buckets[name].delay()
+            if delay > 0:
+                sleep = delay if sleep is None else min(sleep, delay)
+            elif best is None or queue[0][:2] < self.queues[best][0][:2]:
+                best = name
+        return (best, 0.0) if best else (None, sleep)
+
+    async def _dispatch(self) -> None:
+        """Start the requests as soon as a token and a slot are available."""
+        while True:
+            name, sleep = (None, None) if self.inflight >= self.workers else self._next()
+
+            if name is None:
+                self.wakeup.clear()
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=sleep)
+                continue
+
+            item = heapq.heappop(self.queues[name])
+            self.buckets[name].take()
+
+            stat = self.stats[name]
+            stat["queued"] -= 1
+            stat["sent"] += 1
+            waited = time.monotonic() - item[2]
+            stat["waitTime"] += waited
+            stat["maxWait"] = max(stat["maxWait"], waited)
+
+            self.inflight += 1
+            task = self.loop.create_task(self._run(name, item))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, name: str, item: tuple) -> None:
+        """Send a request, and retry it later if it hit a rate limit."""
+        priority, seq, queued_at, retries, call, future = item
+        try:
+            status, body, headers = await call()
+        except asyncio.CancelledError:
+            # Closed while in flight, the caller must not wait forever
+            future.cancel()
+            raise
+        except Exception as e:  # noqa: BLE001
+            if not future.done():
+                future.set_exception(e)
+            return
+        finally:
+            self.inflight -= 1
+            self.wakeup.set()
+
+        bucket = self.buckets[name]
+        bucket.sync(headers)
+
+        limited = status in RATE_LIMIT_STATUS or (isinstance(body, dict) and body.get("retCode") in RATE_LIMIT_CODES)
+        if limited and retries < self.max_retries:
+            self.stats[name]["throttled"] += 1
+            reset = headers.get("X-Bapi-Limit-Reset-Timestamp") if headers else None
+            bucket.block(max(int(reset) / 1000 - time.time(), 0.1) if reset else 2**retries)
+            self.logger.warning(f"Rate limit hit on {name} endpoints, retrying ({retries + 1}/{self.max_retries})")
+            self._push(name, (priority, seq, queued_at, retries + 1, call, future))
+            return
+
+        if not future.done():
+            future.set_result((status, body, headers))
+
+    async def close(self) -> None:
+        """Cancel the dispatcher, the requests in flight and the queued ones, their callers get a CancelledError.
+
+        The next request starts a new dispatcher.
+        """
+        tasks = [task for task in [self.dispatcher, *self.tasks] if task is not None]
+        # Tasks of another (finished) event loop cannot be awaited from this one
+        if tasks and self.loop is asyncio.get_running_loop():
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        for name, queue in self.queues.items():
+            for item in queue:
+                item[-1].cancel()
+            queue.clear()
+            self.stats[name]["queued"] = 0
+        self.loop = None
+        self.dispatcher = None
+        self.tasks = set()
+        self.inflight = 0
@@ -1,27 +1,91 @@
+import functools
+from collections.abc import Callable
+
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
-from bybit.utils import load_klines_parquet
+from bybit.store import load_klines
+from bybit.utils import bucket_candles, compact_klines, get_epoch, lttb
+
+# Constants
+# Points drawn by a figure, shared by its traces: a year of 1-minute candles is 525,600 of them
+MAX_POINTS = 6000
+# Data of the traces, replaced when the visible range changes (see zoomable)
+TRACE_DATA = ["x", "y", "open", "high", "low", "close"]
+
+# Zooms repeat the same few limits
+cached_epoch = functools.lru_cache(maxsize=1024)(get_epoch)
 
 
 class Simulator:
-    __slots__ = ["encyclopedia"]
+    __slots__ = ["encyclopedia", "maxPoints", "precision"]
 
-    def __init__(self, contract: str | None = None) -> None:
+    def __init__(
+        self, contract: str | None = None, precision: str = "float32", maxPoints: int | None = MAX_POINTS
+    ) -> None:
         """Simulate for the contracts.
 
+        The klines are kept in their compact form (see compact_klines), the dates are only formatted by the plots.
+        The plots draw at most maxPoints points: the candles are merged into larger ones (see bucket_candles),
+        the lines keep their extremes (see lttb). The full resolution stays here, zoomable redraws a zoomed range.
+
         Args:
             contract: The contract to simulate
+            precision: The precision of the prices, float32 is enough to plot (see compact_klines)
+            maxPoints: The points of a figure, None to draw every candle
 
         """
+        self.precision = precision
+        self.maxPoints = maxPoints
         if contract is None:
             self.encyclopedia = {}
         else:
             self.encyclopedia = {
-                contract: load_klines_parquet(contract),
+                contract: self.load(contract),
             }
 
+    def load(self, contract: str, start: str | None = None, end: str | None = None) -> pd.DataFrame:
+        """Load the compact klines of a contract, between two dates (format: YYYY-MM-DD HH:MM)."""
+        # Only the row groups of the range are read
+        return compact_klines(load_klines(contract, start=start, end=end), precision=self.precision)
+
+    @staticmethod
+    def window(df: pd.DataFrame, lowerlimit: str | int, upperlimit: str | int) -> pd.DataFrame:
+        """Select the candles between two dates, both included, without a scan or a copy.
+
+        The index is sorted (see compact_klines), so each bound is a binary search on its epoch in milliseconds,
+        and the rows between them are a slice of the frame.
+
+        Args:
+            df (pd.DataFrame): Compact klines
+            lowerlimit (str | int): The lower bound date (format: YYYY-MM-DD HH:MM), or an epoch in milliseconds
+            upperlimit (str | int): The upper bound date (format: YYYY-MM-DD HH:MM), or an epoch in milliseconds
+        Returns:
+            pd.DataFrame: The candles of the range
+
+        """
+        # A view of the index, as_unit copies even to the same unit
+        times = df.index.asi8 if df.index.unit == "ms" else df.index.as_unit("ms").asi8
+        first = times.searchsorted(cached_epoch(lowerlimit) if isinstance(lowerlimit, str) else lowerlimit)
+        last = times.searchsorted(cached_epoch(upperlimit) if isinstance(upperlimit, str) else upperlimit, side="right")
+        return df.iloc[first:last]
+
+    def budget(self, traces: int) -> int | None:
+        """Give the points of each trace of a figure, None to draw everything."""
+        return None if self.maxPoints is None else max(3, self.maxPoints // traces)
+
+    @staticmethod
+    def line(x: pd.DatetimeIndex, y: pd.Series | np.ndarray, points: int | None) -> tuple[pd.DatetimeIndex, np.ndarray]:
+        """Keep at most points points of a line (see lttb), its NaN are dropped when it is downsampled."""
+        y = np.asarray(y, dtype=np.float64)
+        if points is None or len(y) <= points:
+            return x, y
+        finite = np.flatnonzero(np.isfinite(y))
+        kept = finite[lttb(x.asi8[finite], y[finite], points)]
+        return x[kept], y[kept]
+
     def to_graph(
         self,
         contract: str,
@@ -46,26 +110,27 @@ class Simulator:
 
         """
         if contract not in self.encyclopedia:
-            self.encyclopedia[contract] = load_klines_parquet(contract, pretty=True)
-
-        df = self.encyclopedia[contract]
+            # Loaded once, every redraw slices it
+            self.encyclopedia[contract] = self.load(contract)
 
         # Filter according to the date
-        # This syntax looks like numpy
-        df = df[(df["startTime"] >= lowerlimit) & (df["startTime"] <= upperlimit)]
+        df = self.window(self.encyclopedia[contract], lowerlimit, upperlimit)
 
         if onlyData is True:
             return df
 
+        # Larger candles over a long range, the extremes stay
+        candles = df if self.maxPoints is None else bucket_candles(df, self.maxPoints)
+
         # Use plotly
         fig = go.Figure(
             data=[
                 go.Candlestick(
-                    x=df["startTime"],
-                    open=df["openPrice"],
-                    high=df["highPrice"],
-                    low=df["lowPrice"],
-                    close=df["closePrice"],
+                    x=candles.index,
+                    open=candles["openPrice"],
+                    high=candles["highPrice"],
+                    low=candles["lowPrice"],
+                    close=candles["closePrice"],
                 ),
             ],
         )
@@ -86,7 +151,7 @@ class Simulator:
                 # To avoid overlapping text on x-axis
                 xaxis_tickangle=-45,
                 # Show a subset of x-axis labels for clarity
-                xaxis_tickvals=df["startTime"][:: len(df) // 5],
+                xaxis_tickvals=candles.index[:: max(1, len(candles) // 5)],
                 # Y-axis extension and more granular tick intervals
                 yaxis={"range": [y_min, y_max], "tickmode": "linear", "dtick": (y_max - y_min) / 10},
             )
@@ -95,53 +160,53 @@ class Simulator:
             raise
         return fig, df
 
-    def sub_fundings(self, df_contract: pd.DataFrame) -> tuple[go.Scatter, go.Scatter]:
-        """Draw the cumulated funding of a contract.
+    def sub_fundings(self, df_contract: pd.DataFrame, maxPoints: int | None = None) -> tuple[go.Scatter, go.Scatter]:
+        """Draw the cumulated funding of a contract, each trace with at most maxPoints points (see line).
 
         WARNING: The DataFrame should contain the 'fundingRate' column.
         WARNING2: For now, mostly works for 1-minute candles.
         """
-        # Convert startTime to datetime if it's not already
-        df_contract["startTime"] = pd.to_datetime(df_contract["startTime"])
-
-        # Funding rate trace
-        funding_trace = go.Scatter(x=df_contract["startTime"], y=df_contract["fundingRate"], name="FundingRate")
+        # Funding rate trace, in percent
+        x, y = self.line(df_contract.index, df_contract["fundingRate"] * 100, maxPoints)
+        funding_trace = go.Scatter(x=x, y=y, name="FundingRate")
 
         # Filter timestamps closest to 00:59, 08:59, and 16:59
-        filtered_dt = df_contract[
-            df_contract["startTime"].dt.strftime("%H:%M").isin(["00:59", "08:59", "16:59"])
-        ].copy()
+        dates = df_contract.index
+        filtered_dt = df_contract[dates.hour.isin([0, 8, 16]) & (dates.minute == 59)].copy()
 
         # Reverse the order and calculate cumulated funding
         filtered_dt = filtered_dt.iloc[::-1].copy()  # Reverse the order
-        filtered_dt["cumFunding"] = filtered_dt["fundingRate"].cumsum()  # Cumsum in reverse order
+        filtered_dt["cumFunding"] = filtered_dt["fundingRate"].cumsum() * 100  # Cumsum in reverse order
         filtered_dt = filtered_dt.iloc[::-1].copy()  # Reverse back to original order
 
         # Cumulated funding trace
+        x, y = self.line(filtered_dt.index, filtered_dt["cumFunding"], maxPoints)
         cum_funding_trace = go.Scatter(
-            x=filtered_dt["startTime"],
-            y=filtered_dt["cumFunding"],
+            x=x,
+            y=y,
             name="Cumulated Funding",
             marker={"color": "red"},
         )
 
         return funding_trace, cum_funding_trace
 
-    def sub_gap(self, merged_df: pd.DataFrame) -> tuple[go.Scatter, go.Scatter]:
-        """Draw the gap between two products."""
-        # Calculate and add the difference trace
+    def sub_gap(self, merged_df: pd.DataFrame, maxPoints: int | None = None) -> tuple[go.Scatter, go.Scatter]:
+        """Draw the gap between two products, each trace with at most maxPoints points (see line)."""
+        # Calculate and add the difference trace, on every candle
         diffCalc = 100 - merged_df["closePrice_long"] * 100 / merged_df["closePrice_short"]
+        x, y = self.line(merged_df.index, diffCalc, maxPoints)
         diff_graph = go.Scatter(
-            x=merged_df["startTime"],
-            y=diffCalc,
+            x=x,
+            y=y,
             name="Coefficient of difference",
             marker={"color": "blue"},
         )
 
         # Trendline of difference trace
+        x, y = self.line(merged_df.index, diffCalc.rolling(window=150).mean(), maxPoints)
         trendline = go.Scatter(
-            x=merged_df["startTime"],
-            y=diffCalc.rolling(window=150).mean(),
+            x=x,
+            y=y,
             name="Trendline",
             marker={"color": "black"},
         )
@@ -159,7 +224,7 @@ class Simulator:
     ) -> go.Figure:
         """Compare two datasets in a candlestick chart.
 
-        The two datasets are merged on the 'startTime' column to align them.
+        The two datasets are joined on their dates to align them.
 
         Args:
             longContract (str): File containing the long dataset
@@ -181,8 +246,12 @@ class Simulator:
             print("One limit is incorrect.")
             raise
 
-        # Merge both DataFrames on 'startTime' to align their data
-        merged_df = dfLong.merge(dfShort, suffixes=("_long", "_short"), how="inner", on="startTime")
+        # Join both DataFrames on their dates to align their data
+        merged_df = dfLong.join(dfShort, lsuffix="_long", rsuffix="_short", how="inner")
+
+        # The budget is shared by the traces, the gap and the funding are computed on every candle
+        maxPoints = self.budget(2 + 2 * int(draw_gap) + 2 * int(draw_funding))
+        candles = merged_df if maxPoints is None else bucket_candles(merged_df, maxPoints)
 
         # Initialize figure
         fig = make_subplots(
@@ -192,11 +261,11 @@ class Simulator:
         # Add Long position candlestick with specific color
         fig.add_trace(
             go.Candlestick(
-                x=merged_df["startTime"],
-                open=merged_df["openPrice_long"],
-                high=merged_df["highPrice_long"],
-                low=merged_df["lowPrice_long"],
-                close=merged_df["closePrice_long"],
+                x=candles.index,
+                open=candles["openPrice_long"],
+                high=candles["highPrice_long"],
+                low=candles["lowPrice_long"],
+                close=candles["closePrice_long"],
                 name=shortContract,
             ),
             row=1,
@@ -206,11 +275,11 @@ class Simulator:
         # Add Short position candlestick with specific color
         fig.add_trace(
             go.Candlestick(
-                x=merged_df["startTime"],
-                open=merged_df["openPrice_short"],
-                high=merged_df["highPrice_short"],
-                low=merged_df["lowPrice_short"],
-                close=merged_df["closePrice_short"],
+                x=candles.index,
+                open=candles["openPrice_short"],
+                high=candles["highPrice_short"],
+                low=candles["lowPrice_short"],
+                close=candles["closePrice_short"],
                 name=longContract,
             ),
             row=1,
@@ -229,12 +298,12 @@ class Simulator:
         fig.data[1].increasing.line.color = "red"
 
         if draw_gap:
-            diff_graph, trendline = self.sub_gap(merged_df=merged_df)
+            diff_graph, trendline = self.sub_gap(merged_df=merged_df, maxPoints=maxPoints)
             fig.add_trace(diff_graph, row=2, col=1)
             fig.add_trace(trendline, row=2, col=1)
 
         if draw_funding:
-            funding_trace, cum_funding_trace = self.sub_fundings(df_contract=merged_df)
+            funding_trace, cum_funding_trace = self.sub_fundings(df_contract=merged_df, maxPoints=maxPoints)
             fig.add_trace(funding_trace, row=3, col=1)
             fig.add_trace(cum_funding_trace, row=3, col=1)
 
@@ -254,3 +323,51 @@ class Simulator:
 
         fig.update_layout(modebar_add=["drawline"])
         return fig
+
+    def zoomable(self, plot: Callable, **kwargs: object) -> go.FigureWidget:
+        """Draw a figure in a notebook that is drawn again, at full resolution, for each zoomed range.
+
+        The points of each zoom stay under the budget: zooming in shows more candles, down to the 1-minute ones.
+        A double click goes back to the first range. Needs anywidget in the notebook kernel.
+
+        Args:
+            plot (Callable): A plot of the simulator (e.g. simulator.plot_compare), with lowerlimit and upperlimit
+            kwargs: The arguments of the plot
+
+        Returns:
+            go.FigureWidget: The figure, to display
+
+        """
+
+        def draw(lowerlimit: str | None = None, upperlimit: str | None = None) -> go.Figure:
+            limits = {"lowerlimit": lowerlimit, "upperlimit": upperlimit} if lowerlimit else {}
+            figure = plot(**{**kwargs, **limits})
+            # to_graph also gives its frame
+            return figure[0] if isinstance(figure, tuple) else figure
+
+        widget = go.FigureWidget(draw())
+        # The subplots share their x axis, any of them can be zoomed
+        axes = [name for name in widget.layout.to_plotly_json() if name.startswith("xaxis")]
+
+        # Range of each axis at the last drawing, to find the zoomed one
+        drawn = dict.fromkeys(axes)
+
+        def on_zoom(_: go.Layout, *values: object) -> None:
+            ranges, autoranges = values[: len(axes)], values[len(axes) :]
+            bounds = next((r for axis, r in zip(axes, ranges, strict=True) if r and r != drawn[axis]), None)
+            drawn.update(zip(axes, ranges, strict=True))
+            if bounds is not None:
+                lower, upper = (pd.Timestamp(bound).strftime("%Y-%m-%d %H:%M") for bound in bounds)
+                redrawn = draw(lower, upper)
+            elif any(autoranges):
+                redrawn = draw()
+            else:
+                return
+            with widget.batch_update():
+                for trace, new in zip(widget.data, redrawn.data, strict=False):
+                    trace.update({key: new[key] for key in TRACE_DATA if key in new})
+                widget.layout.xaxis.tickvals = redrawn.layout.xaxis.tickvals
+                widget.layout.yaxis.update(range=redrawn.layout.yaxis.range, dtick=redrawn.layout.yaxis.dtick)
+
+        widget.layout.on_change(on_zoom, *[f"{axis}.range" for axis in axes], *[f"{axis}.autorange" for axis in axes])
+        return widget
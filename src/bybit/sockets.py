@@ -0,0 +1,446 @@
+import asyncio
+import functools
+import itertools
+import json
+import logging
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future
+from uuid import uuid4
+
+from pybit.unified_trading import WebSocket
+
+from bybit.ticker import Ticker
+
+# Constants
+CHANNELS = ["spot", "linear", "inverse", "option", "private"]
+# Seconds to wait for a connection, an authentication or a subscription acknowledgement
+READY_TIMEOUT = 10.0
+
+
+class ManagedWebSocket(WebSocket):
+    """pybit WebSocket that can unsubscribe, and that records a subscription before sending it.
+
+    The acknowledgements resolve futures, so the event loop can wait for a subscription instead of sleeping.
+    """
+
+    def __init__(self, endpoint: str | None = None, tap: Callable[[str], None] | None = None, **kwargs: object) -> None:
+        """Connect like pybit (blocks until connected), kwargs are the ones of pybit's WebSocket.
+
+        Args:
+            endpoint (str | None): Override the host (e.g. ws://127.0.0.1:8790 for a MockExchange)
+            tap (Callable[[str], None] | None): Called with the text of every message, before pybit parses it
+            kwargs: The arguments of pybit's WebSocket
+
+        """
+        self.endpoint_override = endpoint
+        self.tap = tap
+        # Set before connecting, the authentication answer can come before pybit returns
+        # {req_id: Future}, True when the subscription is acknowledged
+        self.acks: dict[str, Future] = {}
+        self.authenticated: Future = Future()
+        self.logger = logging.getLogger("greekMaster.client.fetcher.sockets")
+        super().__init__(**kwargs)
+
+    def _on_message(self, message: str) -> None:
+        # pybit merges the deltas into dictionaries it keeps updating, the text is the message as sent
+        if self.tap is not None:
+            self.tap(message)
+        super()._on_message(message)
+
+    def _connect(self, url: str) -> None:
+        # pybit builds the URL from a template (wss://{SUBDOMAIN}.{DOMAIN}.com/v5/...), on every reconnection too
+        if self.endpoint_override:
+            url = self.endpoint_override + url[url.index("/v5/") :]
+        super()._connect(url)
+
+    def subscribe(self, topic: str, callback: Callable, symbol: str | list | bool = False) -> str:
+        """Subscribe like pybit, but the acknowledgement may come back before the subscription is recorded there.
+
+        pybit waits for the connection in a loop, this is called from the event loop: it fails instead.
+
+        Returns:
+            str: The req_id of the subscription
+
+        Raises:
+            ConnectionError: If the socket is not connected (e.g. reconnecting)
+
+        """
+        if topic in self.standard_private_topics:
+            args = [topic]
+        else:
+            args = [topic.format(symbol=s) for s in ([symbol] if isinstance(symbol, str) else symbol)]
+        self._check_callback_directory(args)
+
+        if not self.is_connected():
+            msg = f"The WebSocket is not connected, cannot subscribe to {args}"
+            raise ConnectionError(msg)
+
+        req_id = str(uuid4())
+        message = json.dumps({"op": "subscribe", "req_id": req_id, "args": args})
+
+        self.subscriptions[req_id] = message
+        self.acks[req_id] = Future()
+        for arg in args:
+            self._set_callback(arg, callback)
+        self.ws.send(message)
+        return req_id
+
+    def _process_auth_message(self, message: dict) -> None:
+        if not self.authenticated.done():
+            if message.get("success") is True:
+                self.authenticated.set_result(True)
+            else:
+                self.authenticated.set_exception(ConnectionError(f"Authorization failed: {message}"))
+        super()._process_auth_message(message)
+
+    def _process_subscription_message(self, message: dict) -> None:
+        req_id = message.get("req_id")
+        if req_id is None:
+            super()._process_subscription_message(message)
+            return
+        if req_id not in self.subscriptions:
+            # Answer to a subscription that was unsubscribed since
+            return
+
+        # Resubscriptions after a reconnection are acknowledged again
+        ack = self.acks.get(req_id)
+        if ack is not None and not ack.done():
+            if message.get("success") is True:
+                ack.set_result(True)
+            else:
+                ack.set_exception(ConnectionError(f"Subscription refused: {message.get('ret_msg')}"))
+
+        if message.get("success") is False:
+            # pybit would pop the first character of the message as a topic
+            for arg in json.loads(self.subscriptions.pop(req_id))["args"]:
+                self.callback_directory.pop(arg, None)
+            self.acks.pop(req_id, None)
+            self.logger.error(f"Couldn't subscribe: {message.get('ret_msg')}")
+            return
+        super()._process_subscription_message(message)
+
+    def _process_normal_message(self, message: dict) -> None:
+        topic = message["topic"]
+        # Sent before Bybit got the unsubscription: pybit has neither its callback nor its data anymore,
+        # and its error would close the socket shared by the other topics
+        if topic not in self.callback_directory:
+            self.logger.debug(f"Dropped a message of {topic}, unsubscribed")
+            return
+        try:
+            super()._process_normal_message(message)
+        except (KeyError, TypeError):
+            # Unsubscribed while pybit was merging it
+            if topic in self.callback_directory:
+                raise
+            self.logger.debug(f"Dropped a message of {topic}, unsubscribed")
+
+    def _handle_incoming_message(self, message: dict) -> None:
+        # pybit would look for the topic of the acknowledgement, and fail
+        if message.get("op") == "unsubscribe":
+            return
+        super()._handle_incoming_message(message)
+
+    def unsubscribe(self, topic: str) -> None:
+        """Unsubscribe from a topic, and forget it so it is not resubscribed after a reconnection."""
+        self.ws.send(json.dumps({"op": "unsubscribe", "req_id": str(uuid4()), "args": [topic]}))
+        for req_id, subscription in list(self.subscriptions.items()):
+            if json.loads(subscription)["args"] == [topic]:
+                del self.subscriptions[req_id]
+                self.acks.pop(req_id, None)
+        self.callback_directory.pop(topic, None)
+        self.data.pop(topic, None)
+
+
+class WebSocketManager:
+    __slots__ = [
+        "api_key",
+        "api_secret",
+        "connecting",
+        "demo",
+        "endpoint",
+        "handlers",
+        "lock",
+        "logger",
+        "requests",
+        "sockets",
+        "streams",
+        "taps",
+        "tokens",
+        "topics",
+    ]
+
+    def __init__(
+        self, api_key: str | None = None, api_secret: str | None = None, demo: bool = False, endpoint: str | None = None
+    ) -> None:
+        """One long-lived WebSocket per channel, shared by every subscriber.
+
+        pybit accepts one callback per topic, so the manager subscribes each topic once with its own dispatcher,
+        and counts the subscribers of each topic: the topic is unsubscribed when the last one leaves.
+        pybit resubscribes the remaining topics after a reconnection, and a socket pybit gave up on is replaced
+        (with its topics) the next time it is asked for.
+
+        Args:
+            api_key (str | None): The API key, needed by the private channel
+            api_secret (str | None): The API secret, needed by the private channel
+            demo (bool): If True, the private channel is the one of the demo account
+            endpoint (str | None): Override the host of every channel (e.g. ws://127.0.0.1:8790 for a MockExchange)
+
+        """
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.demo = demo
+        self.endpoint = endpoint
+
+        # {channel: ManagedWebSocket}
+        self.sockets: dict[str, ManagedWebSocket] = {}
+        # {(channel, topic): {token: callback}}
+        self.handlers: dict[tuple[str, str], dict[int, Callable]] = {}
+        # {(channel, topic): (topic template, symbol, parse)}, to subscribe the topic again on a new socket
+        self.streams: dict[tuple[str, str], tuple[str, str | None, Callable | None]] = {}
+        # {token: (channel, topic)}
+        self.topics: dict[int, tuple[str, str]] = {}
+        # {(channel, topic): req_id}, to find the acknowledgement of a topic
+        self.requests: dict[tuple[str, str], str] = {}
+        self.tokens = itertools.count()
+        # Called with the channel and the text of every message (e.g. TickRecorder.record)
+        self.taps: list[Callable[[str, str], None]] = []
+
+        # Subscriptions come from the event loop, messages from the WebSocket threads
+        self.lock = threading.Lock()
+        # Held while a socket connects, so the messages and the connections of the other sockets still flow
+        self.connecting = {channel: threading.Lock() for channel in CHANNELS}
+
+        self.logger = logging.getLogger("greekMaster.client.fetcher.sockets")
+
+    def socket(self, channel: str) -> ManagedWebSocket:
+        """Give the WebSocket of a channel, connect it on first use or if it exited (blocks until connected).
+
+        Args:
+            channel (str): spot, linear, inverse, option or private
+
+        """
+        if channel not in CHANNELS:
+            msg = f"Unknown channel {channel}, available: {CHANNELS}"
+            raise ValueError(msg)
+        with self.connecting[channel]:
+            ws = self.sockets.get(channel)
+            if ws is not None and not ws.exited:
+                return ws
+
+            if ws is None:
+                self.logger.info(f"Opening the {channel} WebSocket.")
+            else:
+                # pybit gave up on it (an error in a callback, or too many reconnection attempts)
+                self.logger.warning(f"The {channel} WebSocket exited, opening a new one.")
+                ws.handle_error = False
+            ws = ManagedWebSocket(
+                channel_type=channel,
+                api_key=self.api_key,
+                api_secret=self.api_secret,
+                testnet=False,
+                demo=self.demo and channel == "private",
+                endpoint=self.endpoint,
+                tap=functools.partial(self._tap, channel),
+                ping_interval=5,
+                ping_timeout=4,
+            )
+            with self.lock:
+                self.sockets[channel] = ws
+                # The subscribers keep their tokens, their topics move to the new socket
+                for key in self.handlers:
+                    if key[0] == channel:
+                        self.requests[key] = self._send(ws, key)
+                        self.logger.info(f"Resubscribed to {key[1]} on the {channel} WebSocket.")
+            return ws
+
+    def _send(self, ws: ManagedWebSocket, key: tuple[str, str]) -> str:
+        """Subscribe a topic of the manager on a socket, its messages go to _dispatch.
+
+        Args:
+            ws (ManagedWebSocket): The socket of the channel of the topic
+            key (tuple[str, str]): The channel and the topic
+        Returns:
+            str: The req_id of the subscription
+
+        """
+        topic, symbol, parse = self.streams[key]
+        return ws.subscribe(topic, callback=lambda message: self._dispatch(key, message, parse), symbol=symbol or False)
+
+    def subscribe(
+        self, channel: str, topic: str, callback: Callable, symbol: str | None = None, parse: Callable | None = None
+    ) -> int:
+        """Add a subscriber to a topic, the topic is subscribed on the socket if it is the first one.
+
+        Args:
+            channel (str): spot, linear, inverse, option or private
+            topic (str): The topic, with a {symbol} placeholder for public topics (e.g. tickers.{symbol})
+            callback (Callable): Called with each message, from the WebSocket thread
+            symbol (str | None): The symbol of the topic
+            parse (Callable | None): Applied once to each message before the subscribers get it,
+                the one of the first subscriber is kept
+        Returns:
+            int: The token to give to unsubscribe
+
+        """
+        key = (channel, topic.format(symbol=symbol) if symbol else topic)
+        token = next(self.tokens)
+        ws = self.socket(channel)
+
+        with self.lock:
+            if key not in self.handlers:
+                self.streams[key] = (topic, symbol, parse)
+                try:
+                    self.requests[key] = self._send(ws, key)
+                except ConnectionError:
+                    del self.streams[key]
+                    raise
+                self.logger.info(f"Subscribed to {key[1]} on the {channel} WebSocket.")
+            self.handlers.setdefault(key, {})[token] = callback
+            self.topics[token] = key
+
+        return token
+
+    def ticker_stream(self, channel: str, symbol: str, callback: Callable) -> int:
+        """Subscribe to the tickers of a symbol (see subscribe), the callbacks get a Ticker."""
+        return self.subscribe(channel, "tickers.{symbol}", callback, symbol, parse=Ticker.from_message)
+
+    async def open(self, channel: str, timeout: float = READY_TIMEOUT) -> ManagedWebSocket:  # noqa: ASYNC109
+        """Connect the WebSocket of a channel without blocking the event loop, the private one is also authenticated.
+
+        Args:
+            channel (str): spot, linear, inverse, option or private
+            timeout (float): Seconds to wait for the connection, then for the authentication
+        Returns:
+            ManagedWebSocket: The connected WebSocket
+
+        """
+        ws = await asyncio.wait_for(asyncio.to_thread(self.socket, channel), timeout)
+        if channel == "private":
+            # Shielded, a timeout must not cancel the future shared with the other waiters
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(ws.authenticated)), timeout)
+        return ws
+
+    async def subscribed(self, token: int, timeout: float = READY_TIMEOUT) -> None:  # noqa: ASYNC109
+        """Wait until the topic of a subscriber is acknowledged by Bybit.
+
+        The subscriber is removed if the subscription is refused or not acknowledged in time.
+
+        Args:
+            token (int): The token given by subscribe
+            timeout (float): Seconds to wait for the acknowledgement
+
+        """
+        with self.lock:
+            channel, topic = self.topics[token]
+            ack = self.sockets[channel].acks[self.requests[(channel, topic)]]
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(ack)), timeout)
+        except (TimeoutError, ConnectionError):
+            self.logger.warning(f"No subscription to {topic} on the {channel} WebSocket.")
+            self.unsubscribe(token)
+            raise
+
+    async def ticker_streams(
+        self,
+        streams: list[tuple[str, str, Callable]],
+        timeout: float = READY_TIMEOUT,  # noqa: ASYNC109
+    ) -> list[int]:
+        """Subscribe to several tickers at once, and return when all of them are acknowledged.
+
+        The sockets connect concurrently, then every subscription is sent before waiting:
+        the streams are live one round-trip after the connections are open.
+
+        Args:
+            streams (list[tuple[str, str, Callable]]): (channel, symbol, callback) of each stream
+            timeout (float): Seconds to wait for each step
+        Returns:
+            list[int]: The tokens, in the order of the streams
+
+        """
+        await asyncio.gather(*(self.open(channel, timeout) for channel in {channel for channel, _, _ in streams}))
+        tokens = []
+        try:
+            for channel, symbol, callback in streams:
+                tokens.append(self.ticker_stream(channel, symbol, callback))
+            await asyncio.gather(*(self.subscribed(token, timeout) for token in tokens))
+        except (TimeoutError, ConnectionError):
+            for token in tokens:
+                self.unsubscribe(token)
+            raise
+        return tokens
+
+    def unsubscribe(self, token: int) -> None:
+        """Remove a subscriber, the topic is unsubscribed from the socket if it was the last one.
+
+        Args:
+            token (int): The token given by subscribe
+
+        """
+        with self.lock:
+            key = self.topics.pop(token, None)
+            if key is None:
+                return
+            handlers = self.handlers[key]
+            handlers.pop(token)
+            if not handlers:
+                del self.handlers[key]
+                del self.streams[key]
+                self.requests.pop(key, None)
+                channel, topic = key
+                self.sockets[channel].unsubscribe(topic)
+                self.logger.info(f"Unsubscribed from {topic} on the {channel} WebSocket.")
+
+    def tap(self, callback: Callable[[str, str], None]) -> None:
+        """Give every message of every socket to a callback, as received and before pybit parses it.
+
+        The callback runs on the WebSocket threads, it must not block (e.g. TickRecorder.record).
+
+        Args:
+            callback (Callable[[str, str], None]): Called with the channel and the text of the message
+
+        """
+        with self.lock:
+            self.taps = [*self.taps, callback]
+
+    def untap(self, callback: Callable[[str, str], None]) -> None:
+        """Stop giving the messages to a callback given to tap."""
+        with self.lock:
+            self.taps = [tap for tap in self.taps if tap != callback]
+
+    def _tap(self, channel: str, message: str) -> None:
+        """Give a message to the taps, a failing tap does not stop the message."""
+        # Replaced, never modified: read without the lock
+        for tap in self.taps:
+            try:
+                tap(channel, message)
+            except Exception:
+                self.logger.exception(f"Error in a tap of the {channel} WebSocket")
+
+    def _dispatch(self, key: tuple[str, str], message: dict, parse: Callable | None = None) -> None:
+        """Give a message to every subscriber of its topic, a failing subscriber does not stop the others."""
+        if parse is not None:
+            try:
+                message = parse(message)
+            except Exception:
+                self.logger.exception(f"Could not parse a message of {key[1]}")
+                return
+        with self.lock:
+            callbacks = list(self.handlers.get(key, {}).values())
+        for callback in callbacks:
+            try:
+                callback(message)
+            except Exception:
+                self.logger.exception(f"Error in a callback of {key[1]}")
+
+    def close(self) -> None:
+        """Close every socket."""
+        with self.lock:
+            for channel, ws in self.sockets.items():
+                ws.exit()
+                self.logger.info(f"{channel} WebSocket closed")
+            self.sockets = {}
+            self.handlers = {}
+            self.streams = {}
+            self.topics = {}
+            self.requests = {}
@@ -0,0 +1,493 @@
+import json
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from bybit.utils import (
+    INTERVALS_MS,
+    KLINE_COLUMNS,
+    ROW_GROUP_SIZE,
+    format_klines,
+    get_epoch,
+    load_klines_parquet,
+    resample_klines,
+    time_filters,
+)
+
+# Constants
+MANIFEST = "manifest.json"
+FUNDING = "funding.parquet"
+FUNDING_COLUMNS = ["fundingRateTimestamp", "fundingRate"]
+# A partition is compacted into a single part past this number of parts
+MAX_PARTS = 16
+# Only the 1-minute klines are downloaded, the other intervals are built from them
+BASE_INTERVAL = "1"
+RESAMPLED_INTERVALS = ["5", "15", "60", "240", "D"]
+
+
+class KlineStore:
+    __slots__ = ["logger", "root"]
+
+    def __init__(self, root: str | Path = "store") -> None:
+        """Partitioned, append-only store of klines.
+
+        Layout:
+            root/
+                BTCPERP/1/manifest.json
+                BTCPERP/1/2024-05/part-00000.parquet
+                BTCPERP/1/2024-05/part-00001.parquet
+                BTCUSDT_spot/1/...
+
+        Each month is a partition, and each update writes new parts in the months it touches.
+        The manifest holds the min/max startTime, the number of rows and the parts of each partition,
+        so the bounds of a history are known without reading any data,
+        and a loader only opens the partitions overlapping the requested range.
+
+        Args:
+            root (str | Path): The root folder of the store
+
+        """
+        self.root = Path(root)
+        self.logger = logging.getLogger("greekMaster.client.fetcher.store")
+
+    def dataset(self, product: str, interval: str, category: str = "linear") -> Path:
+        """Give the folder of a product/interval (spot products are suffixed, like the old file names)."""
+        name = f"{product}_spot" if category == "spot" else product
+        return self.root / name / interval
+
+    def manifest(self, product: str, interval: str, category: str = "linear") -> dict:
+        """Give the manifest of a dataset, empty if it does not exist.
+
+        Returns:
+            dict:
+                partitions:
+                    YYYY-MM:
+                        min: Oldest startTime
+                        max: Newest startTime
+                        rows: Number of candles
+                        parts: Part files, oldest first (a later part overrides an earlier one)
+
+        """
+        path = self.dataset(product, interval, category) / MANIFEST
+        if not path.exists():
+            return {"partitions": {}}
+        with path.open() as f:
+            return json.load(f)
+
+    def _write_manifest(self, folder: Path, manifest: dict) -> None:
+        # Write then rename, a crash never leaves a half written manifest
+        tmp = folder / f"{MANIFEST}.tmp"
+        with tmp.open("w") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        tmp.replace(folder / MANIFEST)
+
+    def bounds(self, product: str, interval: str, category: str = "linear") -> tuple[int, int] | None:
+        """Give the oldest and newest startTime of a dataset, from the manifest only.
+
+        Returns:
+            tuple[int, int] | None: (oldest, newest), None if there is no data
+
+        """
+        partitions = self.manifest(product, interval, category)["partitions"].values()
+        if not partitions:
+            return None
+        return min(p["min"] for p in partitions), max(p["max"] for p in partitions)
+
+    @staticmethod
+    def _month(startTime: np.ndarray) -> np.ndarray:
+        """Give the partition (YYYY-MM) of each startTime."""
+        return np.datetime_as_string(startTime.astype("datetime64[ms]").astype("datetime64[M]"), unit="M")
+
+    def _read_parts(
+        self, folder: Path, partition: dict, columns: list[str] | None = None, filters: list | None = None
+    ) -> pd.DataFrame:
+        """Read the parts of a partition, a later part overrides an earlier one."""
+        df = pd.concat(
+            [pd.read_parquet(folder / part, columns=columns, filters=filters) for part in partition["parts"]]
+        )
+        if len(partition["parts"]) > 1:
+            df = df.drop_duplicates(subset="startTime", keep="last")
+        return df
+
+    def _write_part(self, folder: Path, name: str, df: pd.DataFrame) -> None:
+        (folder / name).parent.mkdir(parents=True, exist_ok=True)
+        df.sort_values("startTime", ascending=False).to_parquet(
+            folder / name, index=False, row_group_size=ROW_GROUP_SIZE
+        )
+
+    @staticmethod
+    def _next_part(month: str, partition: dict) -> str:
+        """Name a new part of a partition, after the ones it lists (never one of them)."""
+        index = max((int(part[-13:-8]) for part in partition["parts"]), default=-1) + 1
+        return f"{month}/part-{index:05d}.parquet"
+
+    def append(self, product: str, interval: str, df: pd.DataFrame, category: str = "linear") -> None:
+        """Add klines to the store.
+
+        Only the partitions touched by df are written:
+            - New candles after a partition, or a new version of its newest candle (the one that was
+              still open during the last update), go in a new part.
+            - Candles inside a partition (a repaired hole) rewrite this single partition.
+        A partition with too many parts is compacted.
+        A rewritten partition goes in a new part, its old parts are deleted once the manifest no longer lists them:
+        a crash leaves at most unlisted files.
+
+        Args:
+            product (str): The product of the klines
+            interval (str): The interval of the klines
+            df (pd.DataFrame): The klines, with an int startTime
+            category (str): The category of the product
+
+        """
+        if df.empty:
+            return
+
+        folder = self.dataset(product, interval, category)
+        folder.mkdir(parents=True, exist_ok=True)
+        manifest = self.manifest(product, interval, category)
+
+        startTime = df["startTime"].to_numpy(dtype=np.int64)
+        months = self._month(startTime)
+        # Parts replaced by a rewrite, deleted after the manifest
+        stale = []
+
+        for month in np.unique(months):
+            new = df[months == month]
+            newTimes = startTime[months == month]
+            partition = manifest["partitions"].get(month)
+
+            if partition is None:
+                partition = {"min": int(newTimes.min()), "max": int(newTimes.max()), "rows": 0, "parts": []}
+                manifest["partitions"][month] = partition
+
+            overlap = newTimes[newTimes <= partition["max"]] if partition["parts"] else newTimes[:0]
+            appendOnly = len(overlap) == 0 or (len(overlap) == 1 and overlap[0] == partition["max"])
+
+            if appendOnly and len(partition["parts"]) < MAX_PARTS:
+                part = self._next_part(month, partition)
+                self._write_part(folder, part, new)
+                partition["parts"].append(part)
+                partition["rows"] += len(new) - len(overlap)
+            else:
+                merged = pd.concat([self._read_parts(folder, partition), new]) if partition["parts"] else new
+                merged = merged.drop_duplicates(subset="startTime", keep="last")
+                part = self._next_part(month, partition)
+                self._write_part(folder, part, merged)
+                stale.extend(partition["parts"])
+                partition["parts"] = [part]
+                partition["rows"] = len(merged)
+
+            partition["min"] = min(partition["min"], int(newTimes.min()))
+            partition["max"] = max(partition["max"], int(newTimes.max()))
+
+        self._write_manifest(folder, manifest)
+        for part in stale:
+            (folder / part).unlink(missing_ok=True)
+        self.logger.info(f"Stored {len(df)} candles of {product} in {len(np.unique(months))} partitions.")
+
+    def load(  # noqa: PLR0913
+        self,
+        product: str,
+        interval: str,
+        category: str = "linear",
+        start: int | str | None = None,
+        end: int | str | None = None,
+        columns: list[str] | None = None,
+        pretty: bool = False,
+    ) -> pd.DataFrame:
+        """Load the klines of a dataset, opening only the partitions overlapping [start, end].
+
+        Inside a partition, the range and the columns are pushed down to the parquet reader.
+
+        Args:
+            product (str): The product of the klines
+            interval (str): The interval of the klines
+            category (str): The category of the product
+            start (int | str | None): Oldest startTime to load, epoch in milliseconds or a date (see get_epoch)
+            end (int | str | None): Newest startTime to load, epoch in milliseconds or a date (see get_epoch)
+            columns (list[str] | None): The columns to load (startTime is always loaded)
+            pretty (bool): If True, will format the DataFrame
+        Returns:
+            pd.DataFrame: The klines, newest first
+
+        Raises:
+            FileNotFoundError: If the dataset does not exist
+
+        """
+        folder = self.dataset(product, interval, category)
+        manifest = self.manifest(product, interval, category)
+        if not manifest["partitions"]:
+            msg = f"No klines stored in {folder}"
+            raise FileNotFoundError(msg)
+
+        if columns is not None and "startTime" not in columns:
+            columns = ["startTime", *columns]
+        start = get_epoch(start) if isinstance(start, str) else start
+        end = get_epoch(end) if isinstance(end, str) else end
+
+        partitions = [
+            partition
+            for _, partition in sorted(manifest["partitions"].items())
+            if (start is None or partition["max"] >= start) and (end is None or partition["min"] <= end)
+        ]
+        if not partitions:
+            return pd.DataFrame(columns=columns or KLINE_COLUMNS)
+
+        filters = time_filters(start, end)
+        df = pd.concat([self._read_parts(folder, partition, columns, filters) for partition in partitions])
+        df = df.sort_values("startTime", ascending=False, ignore_index=True)
+
+        return format_klines(df) if pretty else df
+
+    def holes(
+        self,
+        product: str,
+        interval: str,
+        category: str = "linear",
+        start: int | None = None,
+        end: int | None = None,
+    ) -> pd.DataFrame:
+        """List the missing candles inside the history of a dataset.
+
+        A partition whose number of rows matches its min/max bounds is complete, this is known from the manifest.
+        Only the startTime of the other ones is read, and diffed to find the holes.
+        The holes between two partitions come from the manifest too.
+        Ranges checked with the exchange and found empty (see mark_empty) are not listed.
+
+        Args:
+            product (str): The product of the klines
+            interval (str): The interval of the klines (not "M")
+            category (str): The category of the product
+            start (int | None): Oldest startTime to check
+            end (int | None): Newest startTime to check
+        Returns:
+            pd.DataFrame: One row per hole, oldest first
+                start: First missing startTime
+                end: Last missing startTime
+                candles: Number of missing candles
+
+        """
+        size = INTERVALS_MS[interval]
+        folder = self.dataset(product, interval, category)
+        manifest = self.manifest(product, interval, category)
+        partitions = [
+            partition
+            for _, partition in sorted(manifest["partitions"].items())
+            if (start is None or partition["max"] >= start) and (end is None or partition["min"] <= end)
+        ]
+
+        # Consecutive candles: the last and first ones of two partitions, then inside the partitions
+        bounds = np.array([[partition["min"], partition["max"]] for partition in partitions], dtype=np.int64)
+        bounds = bounds.reshape(-1, 2)
+        pairs = [np.column_stack([bounds[:-1, 1], bounds[1:, 0]])]
+        for partition in partitions:
+            if partition["rows"] == (partition["max"] - partition["min"]) // size + 1:
+                continue
+            startTime = np.sort(self._read_parts(folder, partition, ["startTime"])["startTime"].to_numpy(np.int64))
+            pairs.append(np.column_stack([startTime[:-1], startTime[1:]]))
+
+        pairs = np.concatenate(pairs)
+        pairs = pairs[pairs[:, 1] - pairs[:, 0] > size]
+        holes = pd.DataFrame({"start": pairs[:, 0] + size, "end": pairs[:, 1] - size})
+        if start is not None:
+            holes["start"] = holes["start"].clip(lower=start)
+        if end is not None:
+            holes["end"] = holes["end"].clip(upper=end)
+
+        # The exchange has no candle there (e.g. a maintenance)
+        empty = np.array(manifest.get("empty", []), dtype=np.int64).reshape(-1, 2)
+        first, last = holes["start"].to_numpy()[:, None], holes["end"].to_numpy()[:, None]
+        known = ((first >= empty[:, 0]) & (last <= empty[:, 1])).any(axis=1)
+        holes = holes[~known & (holes["start"] <= holes["end"])].sort_values("start", ignore_index=True)
+        holes["candles"] = (holes["end"] - holes["start"]) // size + 1
+        return holes
+
+    def mark_empty(self, product: str, interval: str, ranges: list[tuple[int, int]], category: str = "linear") -> None:
+        """Remember ranges that the exchange has no candle for, so holes stops listing them.
+
+        Args:
+            product (str): The product of the klines
+            interval (str): The interval of the klines
+            ranges (list[tuple[int, int]]): (first, last) startTime of each empty range
+            category (str): The category of the product
+
+        """
+        if not ranges:
+            return
+        folder = self.dataset(product, interval, category)
+        manifest = self.manifest(product, interval, category)
+        manifest["empty"] = sorted({*map(tuple, manifest.get("empty", [])), *map(tuple, ranges)})
+        self._write_manifest(folder, manifest)
+
+    def datasets(self) -> list[tuple[str, str, str]]:
+        """List the datasets of the store.
+
+        Returns:
+            list[tuple[str, str, str]]: (product, interval, category) of each dataset
+
+        """
+        datasets = []
+        for path in sorted(self.root.glob(f"*/*/{MANIFEST}")):
+            name, interval = path.parent.parent.name, path.parent.name
+            product, category = (name.removesuffix("_spot"), "spot") if name.endswith("_spot") else (name, "linear")
+            datasets.append((product, interval, category))
+        return datasets
+
+    def resample(
+        self,
+        product: str,
+        start: int | None = None,
+        end: int | None = None,
+        category: str = "linear",
+        intervals: list[str] = RESAMPLED_INTERVALS,
+    ) -> None:
+        """Update the larger intervals of a product from its 1-minute klines (see resample_klines).
+
+        Only the buckets touched by the 1-minute candles in [start, end] are rebuilt and appended,
+        so an update after a download rewrites the open bucket and adds the new ones.
+        An interval with no dataset yet is built from the whole 1-minute history.
+
+        Args:
+            product (str): The product of the klines
+            start (int | None): Oldest startTime of the new 1-minute candles (None for the whole history)
+            end (int | None): Newest startTime of the new 1-minute candles (None for the whole history)
+            category (str): The category of the product
+            intervals (list[str]): The intervals to build
+
+        """
+        bounds = self.bounds(product, BASE_INTERVAL, category)
+        if bounds is None:
+            return
+        start = bounds[0] if start is None else start
+        end = bounds[1] if end is None else end
+
+        # The first and last buckets of every interval are complete in the range of the largest one
+        complete = {interval: self.bounds(product, interval, category) is not None for interval in intervals}
+        size = max(INTERVALS_MS[interval] for interval in intervals)
+        first = start - start % size if all(complete.values()) else bounds[0]
+        candles = self.load(product, BASE_INTERVAL, category, start=first, end=end - end % size + size - 1)
+
+        for interval in intervals:
+            resampled = resample_klines(candles, interval)
+            if complete[interval]:
+                # Leave the untouched buckets, the update only appends to the partitions
+                bucket = INTERVALS_MS[interval]
+                touched = resampled["startTime"].between(start - start % bucket, end)
+                resampled = resampled[touched]
+            self.append(product, interval, resampled, category)
+
+    def import_file(self, file: str | Path, product: str, interval: str, category: str = "linear") -> None:
+        """Move a legacy {product}_{interval}.parquet file into the store (the file is kept)."""
+        self.logger.info(f"Importing {file} into the store.")
+        self.append(product, interval, pd.read_parquet(file), category)
+
+
+class FundingStore:
+    __slots__ = ["logger", "root"]
+
+    def __init__(self, root: str | Path = "store") -> None:
+        """Settled funding rates of each perpetual, next to its klines (root/BTCPERP/funding.parquet).
+
+        A funding rate is settled every 8 hours, so a full history is a few thousand rows: one small file per symbol.
+        The predicted funding rate of the current period is never stored, it changes until the settlement.
+
+        Args:
+            root (str | Path): The root folder of the store (the same as the KlineStore)
+
+        """
+        self.root = Path(root)
+        self.logger = logging.getLogger("greekMaster.client.fetcher.store")
+
+    def file(self, product: str) -> Path:
+        """Give the funding file of a product."""
+        return self.root / product / FUNDING
+
+    def load(self, product: str) -> pd.DataFrame:
+        """Load the funding rates of a product, oldest first (empty if there are none)."""
+        if not self.file(product).is_file():
+            return pd.DataFrame(
+                {"fundingRateTimestamp": pd.Series(dtype="int64"), "fundingRate": pd.Series(dtype=float)}
+            )
+        return pd.read_parquet(self.file(product))
+
+    def bounds(self, product: str) -> tuple[int, int] | None:
+        """Give the oldest and newest fundingRateTimestamp of a product.
+
+        Returns:
+            tuple[int, int] | None: (oldest, newest), None if there is no data
+
+        """
+        df = self.load(product)
+        if df.empty:
+            return None
+        return int(df["fundingRateTimestamp"].iloc[0]), int(df["fundingRateTimestamp"].iloc[-1])
+
+    def append(self, product: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Add funding rates to the store.
+
+        Args:
+            product (str): The perpetual of the funding rates
+            df (pd.DataFrame): fundingRateTimestamp (int) and fundingRate (float)
+
+        Returns:
+            pd.DataFrame: The whole history, oldest first
+
+        """
+        history = self.load(product)
+        if df.empty:
+            return history
+
+        history = (
+            pd.concat([history, df[FUNDING_COLUMNS]]) if not history.empty else df[FUNDING_COLUMNS]
+        ).drop_duplicates(subset="fundingRateTimestamp", keep="last")
+        history = history.sort_values("fundingRateTimestamp", ignore_index=True)
+
+        # Write then rename, like the manifests
+        self.file(product).parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.file(product).with_suffix(".tmp")
+        history.to_parquet(tmp, index=False)
+        tmp.replace(self.file(product))
+
+        self.logger.info(f"Stored {len(df)} funding rates of {product}.")
+        return history
+
+
+def parse_name(file: str | Path) -> tuple[Path, str, str, str]:
+    """Split a legacy file name (e.g. store/BTCUSDT_1_spot.parquet) into its store coordinates.
+
+    Returns:
+        tuple: (root, product, interval, category)
+
+    """
+    file = Path(file)
+    product, interval, *rest = file.stem.split("_")
+    category = "spot" if rest == ["spot"] else "linear"
+    return file.parent, product, interval, category
+
+
+def load_klines(
+    file: str | Path,
+    pretty: bool = False,
+    start: int | str | None = None,
+    end: int | str | None = None,
+    columns: list[str] | None = None,
+) -> pd.DataFrame:
+    """Load klines from a parquet file, or from the store if the file was moved into it.
+
+    Lets the Simulator and the notebooks keep using names like store/BTCPERP_1.parquet.
+
+    Args:
+        file (str | Path): The legacy file name
+        pretty (bool): If True, will format the DataFrame
+        start (int | str | None): Oldest startTime to load, epoch in milliseconds or a date (see get_epoch)
+        end (int | str | None): Newest startTime to load, epoch in milliseconds or a date (see get_epoch)
+        columns (list[str] | None): The columns to load (startTime is always loaded)
+
+    """
+    if Path(file).is_file():
+        return load_klines_parquet(file, pretty=pretty, start=start, end=end, columns=columns)
+
+    root, product, interval, category = parse_name(file)
+    return KlineStore(root).load(product, interval, category, start=start, end=end, columns=columns, pretty=pretty)
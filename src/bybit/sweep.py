@@ -0,0 +1,177 @@
+import concurrent.futures
+import itertools
+import logging
+import multiprocessing
+import os
+from collections.abc import Callable
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from bybit.backtest import CashAndCarry
+
+# Constants
+# Runs per task: a run takes milliseconds, a task amortizes the round trip to the worker
+BATCH_SIZE = 16
+SHARED_ARRAYS = ["times", "longPrice", "prices", "fundingRate"]
+
+# The backtest of a worker, attached once by _attach
+_backtest: CashAndCarry | None = None
+_blocks: list[shared_memory.SharedMemory] = []
+
+
+def grid(**values: list) -> list[dict]:
+    """Give every combination of the values, e.g. minimumGap=[0.2, 0.5] and leverage=[1, 2] give 4 sets."""
+    names = list(values)
+    return [dict(zip(names, combination, strict=True)) for combination in itertools.product(*values.values())]
+
+
+def random_samples(count: int, seed: int = 0, **ranges: tuple | list) -> list[dict]:
+    """Draw parameters at random.
+
+    Args:
+        count (int): Number of samples
+        seed (int): Seed of the draws
+        ranges (tuple | list): A (low, high) tuple is drawn uniformly (integers if both are), a list is a choice
+
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, values in ranges.items():
+        if isinstance(values, list):
+            columns[name] = [values[k] for k in rng.integers(0, len(values), count)]
+        elif all(isinstance(value, int) for value in values):
+            columns[name] = rng.integers(values[0], values[1], count, endpoint=True).tolist()
+        else:
+            columns[name] = rng.uniform(values[0], values[1], count).tolist()
+    return [{name: column[k] for name, column in columns.items()} for k in range(count)]
+
+
+class SharedBacktest:
+    __slots__ = ["blocks", "spec"]
+
+    def __init__(self, backtest: CashAndCarry) -> None:
+        """Copy the arrays of a backtest into shared memory, once, for the workers of a sweep.
+
+        The workers attach the blocks and build their backtest on views of them: the klines are never
+        pickled, and every worker reads the same physical pages.
+
+        Args:
+            backtest (CashAndCarry): The loaded backtest
+
+        """
+        self.blocks = []
+        arrays = {}
+        for name in SHARED_ARRAYS:
+            array = getattr(backtest, name)
+            if array is None:
+                arrays[name] = None
+                continue
+            block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            arrays[name] = (block.name, array.shape, array.dtype.str)
+
+        # Small enough to be pickled
+        self.spec = {"arrays": arrays, "futures": backtest.futures, "long": backtest.long}
+
+    def close(self) -> None:
+        """Free the shared memory."""
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def _attach(spec: dict) -> None:
+    """Build the backtest of a worker on the shared arrays (initializer of the pool)."""
+    global _backtest  # noqa: PLW0603
+
+    arrays = {}
+    for name, description in spec["arrays"].items():
+        if description is None:
+            arrays[name] = None
+            continue
+        blockName, shape, dtype = description
+        # Kept open as long as the worker lives, the parent unlinks it at the end of the sweep
+        block = shared_memory.SharedMemory(name=blockName)
+        _blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+    logging.getLogger("greekMaster.backtest").setLevel(logging.WARNING)
+    _backtest = CashAndCarry(
+        arrays["times"],
+        arrays["longPrice"],
+        spec["futures"],
+        arrays["prices"],
+        long=spec["long"],
+        fundingRate=arrays["fundingRate"],
+    )
+
+
+def _run_batch(batch: list[dict], quantityUSDC: float) -> list[dict]:
+    """Run the backtest of a worker for each parameter set of a batch."""
+    results = []
+    for params in batch:
+        trades = _backtest.run(**params, quantityUSDC=quantityUSDC)
+        results.append({**params, **CashAndCarry.summary(trades, quantityUSDC)})
+    return results
+
+
+def sweep(  # noqa: PLR0913
+    backtest: CashAndCarry,
+    samples: list[dict],
+    quantityUSDC: float = 10_000.0,
+    workers: int | None = None,
+    rankBy: str = "apr",
+    onResult: Callable[[dict], None] | None = None,
+) -> pd.DataFrame:
+    """Run the backtest for every parameter set across a process pool.
+
+    The arrays are shared once (see SharedBacktest), each worker builds its backtest on them,
+    then receives batches of parameter sets and sends back their summaries.
+    The results arrive as the batches end, in any order.
+
+    Args:
+        backtest (CashAndCarry): The loaded backtest
+        samples (list[dict]): Parameter sets of CashAndCarry.run (see grid and random_samples)
+        quantityUSDC (float): The balance of the first round of every run
+        workers (int | None): Number of processes, one per core if None
+        rankBy (str): The column of the summary to rank the results on, higher is better
+        onResult (Callable | None): Called with each result as it arrives
+
+    Returns:
+        pd.DataFrame: One row per parameter set, its summary (see CashAndCarry.summary) and its rank, best first
+
+    """
+    logger = logging.getLogger("greekMaster.backtest.sweep")
+    workers = workers or os.cpu_count() or 1
+    batches = [samples[k : k + BATCH_SIZE] for k in range(0, len(samples), BATCH_SIZE)]
+
+    rows = []
+    shared = SharedBacktest(backtest)
+    try:
+        # Spawned workers do not inherit the threads (WebSockets, loops) of the parent
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_attach,
+            initargs=(shared.spec,),
+        ) as pool:
+            for done in concurrent.futures.as_completed(
+                [pool.submit(_run_batch, batch, quantityUSDC) for batch in batches]
+            ):
+                for result in done.result():
+                    rows.append(result)
+                    if onResult is not None:
+                        onResult(result)
+                logger.info(f"{len(rows)}/{len(samples)} runs done.")
+    finally:
+        shared.close()
+
+    results = pd.DataFrame(rows)
+    if results.empty:
+        return results
+    results["rank"] = results[rankBy].rank(ascending=False, method="min").astype(int)
+    return results.sort_values("rank", kind="stable", ignore_index=True)
@@ -0,0 +1,95 @@
+import datetime
+import functools
+
+
+class Ticker:
+    __slots__ = ["ask", "bid", "delivery", "funding", "last", "mark", "symbol", "ts", "volume"]
+
+    def __init__(  # noqa: PLR0913
+        self,
+        symbol: str,
+        last: float,
+        bid: float = 0.0,
+        ask: float = 0.0,
+        mark: float = 0.0,
+        funding: float = 0.0,
+        delivery: float = 0.0,
+        volume: float = 0.0,
+        ts: float = 0.0,
+    ) -> None:
+        """Typed ticker of a contract, parsed once where it enters the application (REST or WebSocket).
+
+        Bybit sends every number as a string, the strategies and the analyser read these floats instead.
+
+        Args:
+            symbol (str): The symbol of the contract
+            last (float): Last traded price
+            bid (float): Best bid price
+            ask (float): Best ask price
+            mark (float): Mark price (0 for spot)
+            funding (float): Funding rate (0 if not perpetual)
+            delivery (float): Delivery time, epoch in seconds (0 for spot and perpetual)
+            volume (float): Turnover of the last 24 hours, in quote coin
+            ts (float): Timestamp of the exchange, epoch in seconds (0 if unknown)
+
+        """
+        self.symbol = symbol
+        self.last = last
+        self.bid = bid
+        self.ask = ask
+        self.mark = mark
+        self.funding = funding
+        self.delivery = delivery
+        self.volume = volume
+        self.ts = ts
+
+    @classmethod
+    def parse(cls, data: dict, ts: float = 0.0) -> "Ticker":
+        """Parse the tickers of a contract.
+
+        Args:
+            data (dict): Tickers, as returned by get_tickers or in the data of the tickers stream
+            ts (float): Timestamp of the exchange, epoch in seconds
+
+        Link: https://bybit-exchange.github.io/docs/v5/market/tickers
+
+        """
+        # Empty strings for the fields that do not apply (e.g. fundingRate of a future)
+        return cls(
+            data["symbol"],
+            float(data.get("lastPrice") or 0),
+            float(data.get("bid1Price") or 0),
+            float(data.get("ask1Price") or 0),
+            float(data.get("markPrice") or 0),
+            float(data.get("fundingRate") or 0),
+            cls.parse_delivery(data.get("deliveryTime")),
+            float(data.get("turnover24h") or 0),
+            ts,
+        )
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def parse_delivery(deliveryTime: str | None) -> float:
+        """Give a delivery time as epoch in seconds, 0 if there is none.
+
+        REST gives epoch in milliseconds, the stream gives an ISO date (e.g. 2024-12-27T08:00:00Z).
+        A few contracts are streamed, so the conversions are cached.
+        """
+        if not deliveryTime or deliveryTime == "0":
+            return 0.0
+        if deliveryTime.isdigit():
+            return int(deliveryTime) / 1000
+        return datetime.datetime.fromisoformat(deliveryTime).timestamp()
+
+    @classmethod
+    def from_message(cls, message: dict) -> "Ticker":
+        """Parse a message of the tickers stream (pybit merges the deltas, data is complete).
+
+        Link: https://bybit-exchange.github.io/docs/v5/websocket/public/ticker
+        """
+        # The message timestamp is in milliseconds
+        return cls.parse(message["data"], message.get("ts", 0) / 1000)
+
+    def __repr__(self) -> str:
+        """Show the prices, for the logs."""
+        return f"Ticker({self.symbol}, last={self.last}, bid={self.bid}, ask={self.ask}, ts={self.ts})"
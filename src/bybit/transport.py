@@ -0,0 +1,261 @@
+import datetime
+import hashlib
+import hmac
+import json
+import logging
+import time
+
+import aiohttp
+from pybit.exceptions import FailedRequestError, InvalidRequestError
+from yarl import URL
+
+from bybit.scheduler import Priority, RequestScheduler
+
+# Constants
+MAINNET_ENDPOINT = "https://api.bybit.com"
+DEMO_ENDPOINT = "https://api-demo.bybit.com"
+
+
+class AsyncHTTP:
+    __slots__ = [
+        "api_key",
+        "api_secret",
+        "endpoint",
+        "logger",
+        "pool_size",
+        "recv_window",
+        "scheduler",
+        "session",
+        "timeout",
+    ]
+
+    def __init__(  # noqa: PLR0913
+        self,
+        api_key: str | None = None,
+        api_secret: str | None = None,
+        demo: bool = False,
+        endpoint: str | None = None,
+        recv_window: int = 5000,
+        timeout: int = 10,
+        pool_size: int = 50,
+        scheduler: RequestScheduler | None = None,
+    ) -> None:
+        """Asynchronous transport for the Bybit v5 REST API.
+
+        Mirrors the pybit HTTP methods used by the Fetcher, but every call is awaitable.
+        Connections are pooled and kept alive, and requests are signed locally (HMAC SHA256).
+        Errors are raised with the pybit exceptions, so callers handle them the same way.
+        Every request goes through the scheduler, which enforces the rate limits and priorities.
+
+        The aiohttp session is created lazily, because it must live inside a running event loop.
+
+        Args:
+            api_key (str | None): The API key, only needed for private endpoints
+            api_secret (str | None): The API secret, only needed for private endpoints
+            demo (bool): If True, will use the demo trading endpoint
+            endpoint (str | None): Override the base URL (local stub server for example)
+            recv_window (int): Validity window of a signed request, in milliseconds
+            timeout (int): Timeout of a request, in seconds
+            pool_size (int): Maximum number of simultaneous connections in the pool
+            scheduler (RequestScheduler | None): The scheduler to share, a new one if None
+
+        """
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.endpoint = endpoint or (DEMO_ENDPOINT if demo else MAINNET_ENDPOINT)
+        self.recv_window = recv_window
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.scheduler = scheduler or RequestScheduler()
+
+        self.session: aiohttp.ClientSession | None = None
+
+        self.logger = logging.getLogger("greekMaster.client.fetcher.transport")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Give the pooled session, create it on first use."""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=30, ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"Content-Type": "application/json", "Accept": "application/json"},
+            )
+        return self.session
+
+    async def close(self) -> None:
+        """Cancel the requests of the scheduler, and close the pooled connections."""
+        await self.scheduler.close()
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    @staticmethod
+    def _prepare_payload(method: str, query: dict) -> str:
+        """Build the query string (GET) or the JSON body (POST), exactly as it will be signed.
+
+        Same rules as pybit: sorted keys for GET, and quantities/prices cast to strings for POST.
+        """
+        # Floating whole numbers would break the signature
+        query = {k: int(v) if isinstance(v, float) and v == int(v) else v for k, v in query.items()}
+
+        if method == "GET":
+            return "&".join(f"{k}={v}" for k, v in sorted(query.items()) if v is not None)
+
+        for key in ["qty", "price", "triggerPrice", "takeProfit", "stopLoss"]:
+            if key in query and not isinstance(query[key], str):
+                query[key] = str(query[key])
+        return json.dumps(query)
+
+    def _sign(self, payload: str) -> dict:
+        """Give the authentication headers of a request.
+
+        Link: https://bybit-exchange.github.io/docs/v5/guide#authentication
+        """
+        if self.api_key is None or self.api_secret is None:
+            msg = "Authenticated endpoints require keys."
+            raise PermissionError(msg)
+
+        timestamp = str(int(time.time() * 1000))
+        param_str = timestamp + self.api_key + str(self.recv_window) + payload
+        signature = hmac.new(self.api_secret.encode(), param_str.encode(), hashlib.sha256).hexdigest()
+
+        return {
+            "X-BAPI-API-KEY": self.api_key,
+            "X-BAPI-SIGN": signature,
+            "X-BAPI-SIGN-TYPE": "2",
+            "X-BAPI-TIMESTAMP": timestamp,
+            "X-BAPI-RECV-WINDOW": str(self.recv_window),
+        }
+
+    async def _send(self, method: str, path: str, payload: str, auth: bool) -> tuple[int, dict, dict]:
+        """Send a request on the pooled session.
+
+        The request is signed here, and not when queued, so the timestamp is always fresh.
+
+        Returns:
+            tuple: (status, body, headers)
+
+        """
+        headers = self._sign(payload) if auth else {}
+
+        session = self._get_session()
+        if method == "GET":
+            url = URL(f"{self.endpoint}{path}?{payload}" if payload else f"{self.endpoint}{path}", encoded=True)
+            request = session.get(url, headers=headers)
+        else:
+            request = session.post(URL(f"{self.endpoint}{path}", encoded=True), data=payload, headers=headers)
+
+        async with request as response:
+            body = await response.json(content_type=None) if response.status == 200 else {}
+            return response.status, body, response.headers
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        query: dict | None = None,
+        auth: bool = False,
+        priority: Priority = Priority.MARKET,
+    ) -> dict:
+        """Schedule a request, and check both the HTTP status and the Bybit retCode.
+
+        Args:
+            method (str): Either "GET" or "POST"
+            path (str): The path of the endpoint (e.g. /v5/market/kline)
+            query (dict | None): The parameters of the request
+            auth (bool): If True, the request is signed
+            priority (Priority): The priority of the request in the scheduler
+        Returns:
+            dict: The JSON response
+
+        """
+        payload = self._prepare_payload(method, query or {})
+
+        status, body, headers = await self.scheduler.submit(
+            path, lambda: self._send(method, path, payload, auth), priority=priority
+        )
+
+        if status != 200:
+            raise FailedRequestError(
+                request=f"{method} {path}: {payload}",
+                message="HTTP status code is not 200.",
+                status_code=status,
+                time=datetime.datetime.now(datetime.UTC).strftime("%H:%M:%S"),
+                resp_headers=headers,
+            )
+
+        if body["retCode"]:
+            raise InvalidRequestError(
+                request=f"{method} {path}: {payload}",
+                message=body["retMsg"],
+                status_code=body["retCode"],
+                time=datetime.datetime.now(datetime.UTC).strftime("%H:%M:%S"),
+                resp_headers=headers,
+            )
+        return body
+
+    # Market endpoints
+    async def get_kline(self, priority: Priority = Priority.MARKET, **kwargs) -> dict:  # noqa: ANN003
+        """Get the klines of a product.
+
+        Link: https://bybit-exchange.github.io/docs/v5/market/kline
+        """
+        return await self._request("GET", "/v5/market/kline", kwargs, priority=priority)
+
+    async def get_tickers(self, priority: Priority = Priority.MARKET, **kwargs) -> dict:  # noqa: ANN003
+        """Get the tickers of one or all products of a category.
+
+        Link: https://bybit-exchange.github.io/docs/v5/market/tickers
+        """
+        return await self._request("GET", "/v5/market/tickers", kwargs, priority=priority)
+
+    async def get_funding_rate_history(self, priority: Priority = Priority.MARKET, **kwargs) -> dict:  # noqa: ANN003
+        """Get the funding rate history of a perpetual contract.
+
+        Link: https://bybit-exchange.github.io/docs/v5/market/history-fund-rate
+        """
+        return await self._request("GET", "/v5/market/funding/history", kwargs, priority=priority)
+
+    async def get_instruments_info(self, priority: Priority = Priority.MARKET, **kwargs) -> dict:  # noqa: ANN003
+        """Get the specifications of the instruments.
+
+        Link: https://bybit-exchange.github.io/docs/v5/market/instrument
+        """
+        return await self._request("GET", "/v5/market/instruments-info", kwargs, priority=priority)
+
+    # Private endpoints
+    async def get_wallet_balance(self, priority: Priority = Priority.ACCOUNT, **kwargs) -> dict:  # noqa: ANN003
+        """Get the wallet balance of the account.
+
+        Link: https://bybit-exchange.github.io/docs/v5/account/wallet-balance
+        """
+        return await self._request("GET", "/v5/account/wallet-balance", kwargs, auth=True, priority=priority)
+
+    async def get_coin_greeks(self, priority: Priority = Priority.ACCOUNT, **kwargs) -> dict:  # noqa: ANN003
+        """Get the greeks of the account.
+
+        Link: https://bybit-exchange.github.io/docs/v5/account/coin-greeks
+        """
+        return await self._request("GET", "/v5/asset/coin-greeks", kwargs, auth=True, priority=priority)
+
+    async def get_positions(self, priority: Priority = Priority.ACCOUNT, **kwargs) -> dict:  # noqa: ANN003
+        """Get the positions of the account.
+
+        Link: https://bybit-exchange.github.io/docs/v5/position
+        """
+        return await self._request("GET", "/v5/position/list", kwargs, auth=True, priority=priority)
+
+    async def set_leverage(self, priority: Priority = Priority.TRADE, **kwargs) -> dict:  # noqa: ANN003
+        """Set the leverage of a contract.
+
+        Link: https://bybit-exchange.github.io/docs/v5/position/leverage
+        """
+        return await self._request("POST", "/v5/position/set-leverage", kwargs, auth=True, priority=priority)
+
+    async def place_order(self, priority: Priority = Priority.TRADE, **kwargs) -> dict:  # noqa: ANN003
+        """Place an order.
+
+        Link: https://bybit-exchange.github.io/docs/v5/order/create-order
+        """
+        return await self._request("POST", "/v5/order/create", kwargs, auth=True, priority=priority)
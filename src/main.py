@@ -14,6 +14,8 @@ def init() -> GreekMaster:
     # Create a Bybit client
     now = datetime.datetime.now(tz=datetime.UTC)
     Master = GreekMaster(client=UlysseSpotFut(demo=True))
+    # The selectors read the streamed gaps instead of querying every ticker
+    Master.watch_gaps(quoteCoins=["USDC"])
     then = datetime.datetime.now(tz=datetime.UTC)
     print(f"Time taken to create the client: {then - now}")
     return Master
@@ -0,0 +1,54 @@
+import argparse  # noqa: INP001
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append("..")
+
+from bybit.backtest import SELECTORS, CashAndCarry
+from bybit.utils import ColorFormatter
+
+
+def main() -> None:
+    """Backtest the stable_collateral cycle on the kline store, and print its trades."""
+    parser = argparse.ArgumentParser(description="Cash-and-carry backtest over the kline store")
+    parser.add_argument("--dest", default="../store", help="Root of the kline store")
+    parser.add_argument("--coin", default="BTC")
+    parser.add_argument("--long", help="Perpetual long leg (e.g. BTCPERP), the USDT spot if not given")
+    parser.add_argument("--start", help="First date (DD/MM/YYYY)")
+    parser.add_argument("--end", help="Last date (DD/MM/YYYY)")
+    parser.add_argument("--gap", type=float, default=-0.2, help="Minimum gap in percent to enter")
+    parser.add_argument("--quantity", type=float, default=10_000.0, help="Balance of the first round in USDC")
+    parser.add_argument("--selector", choices=SELECTORS, default="quickest")
+    parser.add_argument("--max-days", type=float, default=25, help="Maximum days left of the best selector")
+    parser.add_argument("--leverage", type=int, default=1)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    backtest = CashAndCarry.from_store(args.dest, coin=args.coin, long=args.long, start=args.start, end=args.end)
+    loaded = time.perf_counter()
+    trades = backtest.run(
+        minimumGap=args.gap,
+        quantityUSDC=args.quantity,
+        selector=args.selector,
+        maxDays=args.max_days,
+        leverage=args.leverage,
+    )
+    ran = time.perf_counter()
+    summary = CashAndCarry.summary(trades, args.quantity)
+
+    print(f"{len(backtest.times):,} candles of {len(backtest.futures)} futures")
+    print(f"Loaded in {loaded - start:.2f} s, backtested in {ran - loaded:.3f} s")
+    if not trades.empty:
+        # Dates are only formatted here
+        for column in ["selected", "entry", "delivery"]:
+            trades[column] = pd.to_datetime(trades[column], unit="ms")
+        print(trades.drop(columns=["balance", "quantity"]).round(4).to_string())
+    for name, value in summary.items():
+        print(f"{name:>9}: {value:.4f}")
+
+
+if __name__ == "__main__":
+    ColorFormatter.configure_logging(verbose=1, run_name="backtest.log")
+    main()
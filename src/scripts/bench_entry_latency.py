@@ -0,0 +1,105 @@
+import asyncio  # noqa: INP001
+import statistics
+import sys
+import threading
+import time
+from collections.abc import Callable
+
+sys.path.append("..")
+
+from bybit import client as client_module
+from bybit.client import UlysseSpotFut
+from bybit.ticker import Ticker
+
+# Parameters of the benchmark
+ROUNDS = 50
+# Ticks below the minimum gap before the triggering one, and time between ticks
+TICKS_BEFORE = 20
+TICK_INTERVAL = 0.002
+MINIMUM_GAP = 0.5
+
+
+class StubSockets:
+    def __init__(self) -> None:
+        """Feed the tickers from a thread, like the pybit WebSocket threads."""
+        self.triggeredAt = 0.0
+
+    def feed(self, longHandler: Callable, shortHandler: Callable) -> None:
+        """Stream gaps under the minimum, then one above it, and remember when the triggering tick was sent."""
+        longHandler(Ticker("BTCUSDC", 50000.0))
+        for _ in range(TICKS_BEFORE):
+            time.sleep(TICK_INTERVAL)
+            shortHandler(Ticker("BTC-27DEC24", 50100.0))
+        time.sleep(TICK_INTERVAL)
+        self.triggeredAt = time.perf_counter()
+        shortHandler(Ticker("BTC-27DEC24", 50500.0))
+
+    async def ticker_streams(self, streams: list) -> list[int]:
+        """Start the feed once both handlers are known."""
+        (_, _, longHandler), (_, _, shortHandler) = streams
+        threading.Thread(target=self.feed, args=(longHandler, shortHandler), daemon=True).start()
+        return [0, 1]
+
+    def unsubscribe(self, token: int) -> None:
+        """Nothing to leave."""
+
+
+class StubFetcher:
+    def __init__(self, demo: bool = False, endpoint: str | None = None) -> None:  # noqa: ARG002
+        """Record when the entry orders are sent."""
+        self.sockets = StubSockets()
+        self.orderedAt = 0.0
+
+    async def set_leverage(self, symbol: str, leverage: str) -> None:
+        """No leverage to set."""
+
+    async def enter_spot_linear(self, *_args: object) -> list:
+        """Send nothing, only record the time."""
+        self.orderedAt = time.perf_counter()
+        return []
+
+    def get_wallet(self) -> dict:
+        """Give a wallet with some BTC."""
+        return {"BTC": {"Available": 1.0}}
+
+
+class PollingClient(UlysseSpotFut):
+    """The previous executor: polls the active flag every 100 ms."""
+
+    async def base_executor(self, strategy: Callable, leverage: str = "1", minimumGap: float = -0.2) -> None:  # noqa: ARG002
+        """Enter once the flag is down."""
+        await self._setup_contracts(strategy, minimumGap)
+        while self.active:  # noqa: ASYNC110
+            await asyncio.sleep(0.1)
+        await self._enter_amount()
+        self._deactivate_websockets()
+
+
+async def measure(client: UlysseSpotFut) -> list[float]:
+    """Trigger-to-order latency of each round, in milliseconds."""
+    latencies = []
+    for _ in range(ROUNDS):
+        client.new_round()
+        client.longContract["symbol"] = "BTCUSDC (Spot)"
+        client.shortContract["symbol"] = "BTC-27DEC24"
+        client.balance = 1000
+        await client.base_executor(client.most_basic_arb, minimumGap=MINIMUM_GAP)
+        latencies.append((client.fetcher.orderedAt - client.fetcher.sockets.triggeredAt) * 1000)
+    return latencies
+
+
+async def main() -> None:
+    """Compare the event-signalled executor with the polling one."""
+    # No API keys or network needed
+    client_module.Fetcher = StubFetcher
+
+    for name, client in [("event", UlysseSpotFut()), ("polling", PollingClient())]:
+        latencies = await measure(client)
+        print(
+            f"{name:>8}: mean {statistics.mean(latencies):7.3f} ms, "
+            f"median {statistics.median(latencies):7.3f} ms, max {max(latencies):7.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+import resource  # noqa: INP001
+import subprocess
+import sys
+import time
+from collections.abc import Iterator
+
+import numpy as np
+import pandas as pd
+
+sys.path.append("..")
+
+from bybit.utils import KLINE_COLUMNS, KlineAccumulator
+
+# Parameters of the benchmark
+CANDLES = 2_000_000
+PAGE = 1000
+
+
+def synthetic_pages(candles: int) -> Iterator[list]:
+    """Yield the pages Bybit would return when walking back a 1-minute history.
+
+    Pages are newest first, made of strings, and two consecutive pages share their boundary candle.
+    They are generated on the fly, so only the accumulation weighs on the peak RSS.
+    """
+    rng = np.random.default_rng(0)
+    startTime = 1_700_000_000_000 - np.arange(candles, dtype=np.int64) * 60_000
+    prices = 40_000 + rng.standard_normal(candles).cumsum()
+    rows = np.column_stack([prices, prices + 5, prices - 5, prices + 1, prices / 1e3, prices * 10])
+
+    for i in range(0, candles - 1, PAGE - 1):
+        page = np.column_stack([startTime[i : i + PAGE].astype(str), rows[i : i + PAGE].astype(str)])
+        yield page.tolist()
+
+
+def old_accumulation(pages: Iterator[list]) -> pd.DataFrame:
+    """Accumulate like the old get_history_pd loop: one concat per page, types at the end."""
+    acc_data = pd.DataFrame(columns=KLINE_COLUMNS)
+    for page in pages:
+        new_data = pd.DataFrame(page, columns=KLINE_COLUMNS)
+        acc_data = pd.concat([acc_data.iloc[:-1], new_data], ignore_index=True)
+    return acc_data.astype({column: "int" if column == "startTime" else "float" for column in KLINE_COLUMNS})
+
+
+def new_accumulation(pages: Iterator[list]) -> pd.DataFrame:
+    """Accumulate in typed buffers, build the frame once."""
+    accumulator = KlineAccumulator()
+    for page in pages:
+        accumulator.add(page)
+    return accumulator.to_frame()
+
+
+def run(mode: str, candles: int) -> None:
+    """Run one mode in this process and print its time and peak RSS."""
+    pages = synthetic_pages(candles)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    df = old_accumulation(pages) if mode == "old" else new_accumulation(pages)
+    elapsed = time.perf_counter() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(
+        f"{mode}: {len(df)} candles in {elapsed:.2f} s, "
+        f"peak RSS {peak / 1024:.0f} MB (+{(peak - baseline) / 1024:.0f} MB)"
+    )
+
+
+if __name__ == "__main__":
+    # Usage: python bench_klines_accumulation.py [candles]
+    if len(sys.argv) > 2:
+        run(sys.argv[1], int(sys.argv[2]))
+    else:
+        candles = int(sys.argv[1]) if len(sys.argv) > 1 else CANDLES
+        # One process per mode, so the peak RSS of one does not hide the other
+        for mode in ["old", "new"]:
+            subprocess.run([sys.executable, __file__, mode, str(candles)], check=True)  # noqa: S603
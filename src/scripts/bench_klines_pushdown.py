@@ -0,0 +1,83 @@
+import sys  # noqa: INP001
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+sys.path.append("..")
+
+from bybit.utils import KLINE_COLUMNS, load_klines_parquet, save_klines_parquet
+
+# Parameters of the benchmark
+YEARS = 2
+WEEK = 7 * 24 * 60 * 60_000
+REPEAT = 5
+
+
+def synthetic_klines(years: int) -> pd.DataFrame:
+    """Build a 1-minute history, newest first, typed like get_history_pd saves it."""
+    candles = years * 365 * 24 * 60
+    rng = np.random.default_rng(0)
+    startTime = 1_700_000_000_000 - np.arange(candles, dtype=np.int64) * 60_000
+    prices = 40_000 + rng.standard_normal(candles).cumsum()
+    columns = [startTime, prices, prices + 5, prices - 5, prices + 1, prices / 1e3, prices * 10]
+    return pd.DataFrame(dict(zip(KLINE_COLUMNS, columns, strict=True)))
+
+
+def row_groups_read(file: Path, start: int, end: int) -> int:
+    """Count the row groups whose startTime statistics overlap [start, end]."""
+    metadata = pq.ParquetFile(file).metadata
+    column = metadata.schema.names.index("startTime")
+    count = 0
+    for i in range(metadata.num_row_groups):
+        stats = metadata.row_group(i).column(column).statistics
+        count += stats.max >= start and stats.min <= end
+    return count
+
+
+def timed(function: Callable[[], pd.DataFrame]) -> tuple[float, pd.DataFrame]:
+    """Give the best time of REPEAT runs, and the result."""
+    best = float("inf")
+    for _ in range(REPEAT):
+        begin = time.perf_counter()
+        df = function()
+        best = min(best, time.perf_counter() - begin)
+    return best, df
+
+
+def main() -> None:
+    """Load one week of a two-year 1-minute history, with and without pushdown."""
+    df = synthetic_klines(YEARS)
+    # One week in the middle of the history
+    start = int(df["startTime"].iloc[len(df) // 2])
+    end = start + WEEK - 1
+
+    with tempfile.TemporaryDirectory() as folder:
+        file = Path(folder) / "BTCPERP_1.parquet"
+        save_klines_parquet(file, df)
+        groups = pq.ParquetFile(file).metadata.num_row_groups
+
+        def _full() -> pd.DataFrame:
+            full = pd.read_parquet(file)
+            return full[(full["startTime"] >= start) & (full["startTime"] <= end)]
+
+        full_time, full_df = timed(_full)
+        range_time, range_df = timed(lambda: load_klines_parquet(file, start=start, end=end))
+        close_time, _ = timed(lambda: load_klines_parquet(file, start=start, end=end, columns=["closePrice"]))
+
+        if not full_df.reset_index(drop=True).equals(range_df.reset_index(drop=True)):
+            msg = "The pushdown did not load the same klines"
+            raise RuntimeError(msg)
+
+        print(f"{len(df)} candles, {groups} row groups, loading {len(range_df)} candles (one week)")
+        print(f"Full read then filter:      {full_time * 1000:.1f} ms, {groups} row groups")
+        print(f"Range pushdown:             {range_time * 1000:.1f} ms, {row_groups_read(file, start, end)} row groups")
+        print(f"Range + closePrice column:  {close_time * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import sys  # noqa: INP001
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append("..")
+
+from bybit.simulator import Simulator
+from bybit.utils import compact_klines
+
+# Parameters of the benchmark
+YEARS = 3
+ZOOMS = 2_000
+
+
+def zoom_limits(times: np.ndarray, zooms: int) -> list[tuple[str, str]]:
+    """Give random ranges of a few hours to a few weeks, as the dates typed in the notebooks."""
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(60, 60 * 24 * 30, zooms)
+    starts = rng.integers(0, len(times) - lengths)
+    dates = pd.to_datetime(times, unit="ms")
+    return [
+        (dates[start].strftime("%Y-%m-%d %H:%M"), dates[start + length].strftime("%Y-%m-%d %H:%M"))
+        for start, length in zip(starts, lengths, strict=True)
+    ]
+
+
+def main() -> None:
+    """Compare the time of a range query on years of 1-minute klines."""
+    candles = YEARS * 525_600
+    times = 1_700_000_020_000 // 60_000 * 60_000 + np.arange(candles, dtype=np.int64) * 60_000
+    closePrice = 60_000 + np.random.default_rng(0).standard_normal(candles).cumsum()
+    df = pd.DataFrame({"startTime": times, "openPrice": closePrice, "highPrice": closePrice + 5})
+    df = df.assign(lowPrice=closePrice - 5, closePrice=closePrice, volume=1.0, turnover=closePrice)
+
+    # The previous encyclopedia: dates as strings, filtered by a mask
+    legacy = df.assign(startTime=pd.to_datetime(df["startTime"], unit="ms").dt.strftime("%Y-%m-%d %H:%M"))
+    compact = compact_klines(df, precision="float32")
+    limits = zoom_limits(times, ZOOMS)
+
+    methods = {
+        "string mask": lambda low, up: legacy[(legacy["startTime"] >= low) & (legacy["startTime"] <= up)],
+        "index .loc": lambda low, up: compact.loc[low:up],
+        "searchsorted": lambda low, up: Simulator.window(compact, low, up),
+    }
+
+    lengths = {}
+    for name, method in methods.items():
+        # The mask is too slow for all the zooms
+        zooms = limits[:20] if name == "string mask" else limits
+        start = time.perf_counter()
+        lengths[name] = [len(method(low, up)) for low, up in zooms]
+        elapsed = (time.perf_counter() - start) / len(zooms)
+        print(f"{name:>13}: {elapsed * 1e6:10.1f} us per slice of {candles:,} candles")
+
+    if lengths["searchsorted"][:20] != lengths["string mask"] or lengths["searchsorted"] != lengths["index .loc"]:
+        msg = "The methods do not select the same candles"
+        raise RuntimeError(msg)
+
+
+if __name__ == "__main__":
+    main()
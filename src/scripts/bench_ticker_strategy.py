@@ -0,0 +1,126 @@
+import datetime  # noqa: INP001
+import sys
+import time
+from collections.abc import Iterable
+
+import numpy as np
+
+sys.path.append("..")
+
+from bybit.analyser import Analyser
+from bybit.ticker import Ticker
+
+# Parameters of the benchmark
+MESSAGES = 200_000
+MINIMUM_GAP = 0.5
+DELIVERY = 1_735_286_400_000
+
+
+def recorded_stream(messages: int) -> list[dict]:
+    """Build a stream of tickers messages like pybit gives them (spot and future alternately, numbers as strings)."""
+    rng = np.random.default_rng(0)
+    prices = 50_000 + rng.standard_normal(messages).cumsum()
+    stream = []
+    for i, price in enumerate(prices):
+        ts = 1_700_000_000_000 + i * 50
+        if i % 2:
+            data = {
+                "symbol": "BTC-27DEC24",
+                "lastPrice": f"{price + 300:.2f}",
+                "bid1Price": f"{price + 299.5:.2f}",
+                "ask1Price": f"{price + 300.5:.2f}",
+                "markPrice": f"{price + 300:.2f}",
+                "fundingRate": "",
+                "deliveryTime": str(DELIVERY),
+                "turnover24h": "123456789.5",
+            }
+        else:
+            data = {
+                "symbol": "BTCUSDC",
+                "lastPrice": f"{price:.2f}",
+                "bid1Price": f"{price - 0.5:.2f}",
+                "ask1Price": f"{price + 0.5:.2f}",
+                "turnover24h": "98765432.1",
+            }
+        stream.append({"topic": f"tickers.{data['symbol']}", "type": "snapshot", "ts": ts, "data": data})
+    return stream
+
+
+def legacy_get_gap(longTickers: dict, shortTickers: dict) -> float:
+    """Compute the gap like Analyser.get_gap before the Ticker: parse the strings, and read the clock for each pair."""
+    cumVolume = float(longTickers["turnover24h"]) + float(shortTickers["turnover24h"])
+    longPrice = float(longTickers["lastPrice"])
+    shortPrice = float(shortTickers["lastPrice"])
+    roi = round((shortPrice / longPrice - 1), 3) - 0.0022
+    longDelivery = int(longTickers.get("deliveryTime", 0)) / 1000
+    shortDelivery = int(shortTickers["deliveryTime"]) / 1000
+    todayDate = datetime.datetime.now(datetime.UTC).timestamp()
+    maximumTime = longDelivery if longDelivery != 0 else shortDelivery
+    daysLeft = (maximumTime - todayDate) / 86400 + 1
+    funding = float(longTickers.get("fundingRate") or 0) * (int((maximumTime - todayDate) / (8 * 3600)) - 1)
+    return roi * 365 / daysLeft + funding + cumVolume * 0
+
+
+def before(stream: list[dict]) -> int:
+    """Evaluate the strategy on the raw messages, like most_basic_arb did."""
+    contracts = {}
+    found = 0
+    for message in stream:
+        contracts[message["data"]["symbol"] == "BTCUSDC"] = message
+        if len(contracts) < 2:
+            continue
+        longTickers = contracts[True]["data"]
+        shortTickers = contracts[False]["data"]
+        coeff = (float(shortTickers["lastPrice"]) / float(longTickers["lastPrice"]) - 1) * 100
+        legacy_get_gap(longTickers, shortTickers)
+        found += coeff >= MINIMUM_GAP
+    return found
+
+
+def after(stream: list[dict]) -> int:
+    """Parse each message once at the socket boundary, then evaluate the strategy on Tickers."""
+    return evaluate_tickers(Ticker.from_message(message) for message in stream)
+
+
+def evaluate_tickers(tickers: Iterable[Ticker]) -> int:
+    """Evaluate the strategy on parsed Tickers."""
+    contracts = {}
+    found = 0
+    for ticker in tickers:
+        contracts[ticker.symbol == "BTCUSDC"] = ticker
+        if len(contracts) < 2:
+            continue
+        longTickers = contracts[True]
+        shortTickers = contracts[False]
+        coeff = (shortTickers.last / longTickers.last - 1) * 100
+        # The exchange timestamp replaces the clock
+        Analyser.get_gap(longTickers, shortTickers, now=ticker.ts)
+        found += coeff >= MINIMUM_GAP
+    return found
+
+
+def main() -> None:
+    """Compare the evaluations per second of the dict and Ticker hot paths."""
+    stream = recorded_stream(MESSAGES)
+
+    # The sockets parse on their threads, the loop only evaluates
+    parsed = [Ticker.from_message(message) for message in stream]
+
+    results = {}
+    for name, evaluate, messages in [
+        ("before", before, stream),
+        ("after", after, stream),
+        ("after, loop only", evaluate_tickers, parsed),
+    ]:
+        start = time.perf_counter()
+        results[name] = evaluate(messages)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>16}: {MESSAGES / elapsed:>10,.0f} evaluations/s ({elapsed * 1e6 / MESSAGES:.2f} us each)")
+
+    if len(set(results.values())) != 1:
+        msg = f"Different signals: {results}"
+        raise RuntimeError(msg)
+
+
+if __name__ == "__main__":
+    main()
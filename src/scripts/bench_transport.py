@@ -0,0 +1,81 @@
+import asyncio  # noqa: INP001
+import sys
+import threading
+import time
+
+from aiohttp import web
+from pybit.unified_trading import HTTP
+
+sys.path.append("..")
+
+from bybit.scheduler import RequestScheduler
+from bybit.transport import AsyncHTTP
+
+# Parameters of the benchmark
+HOST = "127.0.0.1"
+PORT = 8765
+LATENCY = 0.05  # Seconds the stub server waits before answering
+CALLS = 50  # Number of concurrent calls
+
+
+def start_stub_server() -> None:
+    """Start a stub of the tickers endpoint in its own thread and event loop."""
+
+    async def tickers(_request: web.Request) -> web.Response:
+        await asyncio.sleep(LATENCY)
+        return web.json_response(
+            {"retCode": 0, "retMsg": "OK", "result": {"category": "linear", "list": [{"symbol": "BTCUSDT"}]}}
+        )
+
+    async def serve() -> None:
+        app = web.Application()
+        app.router.add_get("/v5/market/tickers", tickers)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, HOST, PORT).start()
+        await asyncio.Event().wait()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+    time.sleep(0.5)
+
+
+async def sequential_behavior() -> float:
+    """Measure the old behavior: async methods calling the synchronous pybit session."""
+    session = HTTP()
+    session.endpoint = f"http://{HOST}:{PORT}"
+
+    async def call() -> dict:
+        return session.get_tickers(category="linear", symbol="BTCUSDT")
+
+    start = time.perf_counter()
+    await asyncio.gather(*[call() for _ in range(CALLS)])
+    return time.perf_counter() - start
+
+
+async def async_behavior() -> float:
+    """Measure the new behavior: awaitable calls on pooled connections."""
+    # Limits of the scheduler are lifted, only the transport is measured
+    scheduler = RequestScheduler(workers=CALLS, limits={"market": (CALLS, CALLS)})
+    session = AsyncHTTP(endpoint=f"http://{HOST}:{PORT}", scheduler=scheduler)
+
+    # Warm the pool, like a long-lived Fetcher would
+    await session.get_tickers(category="linear", symbol="BTCUSDT")
+
+    start = time.perf_counter()
+    await asyncio.gather(*[session.get_tickers(category="linear", symbol="BTCUSDT") for _ in range(CALLS)])
+    elapsed = time.perf_counter() - start
+
+    await session.close()
+    return elapsed
+
+
+if __name__ == "__main__":
+    start_stub_server()
+
+    sequential = asyncio.run(sequential_behavior())
+    concurrent = asyncio.run(async_behavior())
+
+    print(f"{CALLS} concurrent calls, {LATENCY * 1000:.0f} ms of server latency")
+    print(f"pybit HTTP (blocking): {sequential:.3f} s")
+    print(f"AsyncHTTP (pooled):    {concurrent:.3f} s")
+    print(f"Speedup: x{sequential / concurrent:.1f}")
@@ -0,0 +1,75 @@
+import asyncio  # noqa: INP001
+import contextlib
+import json
+import sys
+import time
+from collections import Counter
+
+sys.path.append("..")
+
+from bybit.mock_exchange import MockExchange
+from bybit.sockets import WebSocketManager
+from bybit.ticker import Ticker
+from bybit.utils import ColorFormatter
+
+# Parameters of the check
+TICK_INTERVAL = 0.05
+# Seconds of streaming between two checks
+WAIT = 0.5
+
+
+def check(condition: bool, message: str) -> None:
+    """Stop the script on a failed check."""
+    if not condition:
+        msg = f"FAILED: {message}"
+        raise SystemExit(msg)
+    print(f"ok: {message}")
+
+
+async def main() -> None:
+    """Check the shared sockets against a MockExchange: late ticks after an unsubscription, and a socket that died."""
+    exchange = MockExchange(tickInterval=TICK_INTERVAL)
+    url = exchange.start_in_thread()
+    manager = WebSocketManager(endpoint=url.replace("http", "ws", 1))
+    received: Counter = Counter()
+
+    def count(ticker: Ticker) -> None:
+        received[ticker.symbol] += 1
+
+    try:
+        tokens = await manager.ticker_streams([("linear", "BTCPERP", count), ("linear", "BTCUSDT", count)])
+        await asyncio.sleep(WAIT)
+        check(received["BTCPERP"] > 0 and received["BTCUSDT"] > 0, "both streams tick")
+
+        # Bybit keeps sending a topic until it gets the unsubscription
+        ws = manager.socket("linear")
+        manager.unsubscribe(tokens[1])
+        now = int(time.time() * 1000)
+        for kind in ["snapshot", "delta"]:
+            message = {"topic": "tickers.BTCUSDT", "type": kind, "ts": now, "data": {"symbol": "BTCUSDT"}}
+            ws._on_message(json.dumps(message))  # noqa: SLF001
+        check(not ws.exited, "late ticks of an unsubscribed topic leave the socket open")
+
+        before = received["BTCPERP"]
+        await asyncio.sleep(WAIT)
+        check(received["BTCPERP"] > before, "the other stream still ticks")
+
+        # An error pybit does not recover from (e.g. in a callback) exits the socket
+        with contextlib.suppress(ValueError):
+            ws._on_error(ValueError("Simulated error"))  # noqa: SLF001
+        check(ws.exited, "the socket exited")
+
+        replaced = await manager.open("linear")
+        check(replaced is not ws and not replaced.exited, "a new socket replaces the exited one")
+        await manager.subscribed(tokens[0])
+        before = received["BTCPERP"]
+        await asyncio.sleep(WAIT)
+        check(received["BTCPERP"] > before, "the remaining topic is resubscribed on the new socket")
+    finally:
+        manager.close()
+    print("All the checks passed")
+
+
+if __name__ == "__main__":
+    ColorFormatter.configure_logging(verbose=1, run_name="check_sockets.log")
+    asyncio.run(main())
@@ -0,0 +1,57 @@
+import argparse  # noqa: INP001
+import asyncio
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append("..")
+
+from bybit.api_fetcher import Fetcher
+from bybit.store import BASE_INTERVAL, KlineStore
+from bybit.utils import ColorFormatter
+
+
+async def main() -> None:
+    """List the missing candles of every dataset of the store, and fetch them with --repair."""
+    parser = argparse.ArgumentParser(description="Holes inside the histories of the kline store")
+    parser.add_argument("--dest", default="../store", help="Root of the kline store")
+    parser.add_argument("--repair", action="store_true", help="Fetch the missing candles")
+    parser.add_argument("--endpoint", help="Server to fetch from (e.g. a MockExchange)")
+    args = parser.parse_args()
+
+    store = KlineStore(args.dest)
+    start = time.perf_counter()
+    report = {dataset: store.holes(*dataset) for dataset in store.datasets()}
+    print(f"Checked {len(report)} datasets in {time.perf_counter() - start:.2f} s")
+
+    for (product, interval, category), holes in report.items():
+        if holes.empty:
+            continue
+        print(f"{product} {interval} ({category}): {holes['candles'].sum()} candles missing in {len(holes)} holes")
+        for hole in holes.head(5).itertuples():
+            first, last = pd.to_datetime([hole.start, hole.end], unit="ms")
+            print(f"    {first} -> {last} ({hole.candles} candles)")
+
+    if args.repair:
+        # The resampled intervals are rebuilt by the repair of their 1-minute klines
+        repairs = [
+            (product, interval, category)
+            for (product, interval, category), holes in report.items()
+            if not holes.empty and (interval == BASE_INTERVAL or (product, BASE_INTERVAL, category) not in report)
+        ]
+        fetcher = Fetcher(demo=True, endpoint=args.endpoint)
+        try:
+            await asyncio.gather(
+                *[
+                    fetcher.repair_history(product, interval, category, dest=args.dest)
+                    for product, interval, category in repairs
+                ]
+            )
+        finally:
+            await fetcher.close()
+
+
+if __name__ == "__main__":
+    ColorFormatter.configure_logging(verbose=1, run_name="klines_holes.log")
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+import argparse  # noqa: INP001
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append("..")
+
+from bybit.store import load_klines
+from bybit.utils import compact_klines, format_klines
+
+# Parameters of the report
+CANDLES = 1_000_000
+
+
+def synthetic_klines(candles: int) -> pd.DataFrame:
+    """Build 1-minute klines of a perpetual, as loaded from the store (newest first)."""
+    rng = np.random.default_rng(0)
+    closePrice = 60_000 + rng.standard_normal(candles).cumsum()
+    return pd.DataFrame(
+        {
+            "startTime": 1_700_000_000_000 + np.arange(candles, dtype=np.int64)[::-1] * 60_000,
+            "openPrice": closePrice + rng.standard_normal(candles),
+            "highPrice": closePrice + 5,
+            "lowPrice": closePrice - 5,
+            "closePrice": closePrice,
+            "volume": rng.random(candles) * 10,
+            "turnover": rng.random(candles) * 600_000,
+            "fundingRate": np.repeat(rng.random(candles // 480 + 1) * 1e-4, 480)[:candles],
+        }
+    )
+
+
+def legacy_pretty(df: pd.DataFrame) -> pd.DataFrame:
+    """Format like load_klines(pretty=True) did, with the dates as strings."""
+    df = df.copy()
+    df["startTime"] = pd.to_datetime(df["startTime"], unit="ms").dt.strftime("%Y-%m-%d %H:%M")
+    df["fundingRate"] = df["fundingRate"] * 100
+    return df
+
+
+def main() -> None:
+    """Report the memory of the in-memory forms of the klines, per million candles."""
+    parser = argparse.ArgumentParser(description="Memory of the loaded klines per million candles")
+    parser.add_argument("--klines", help="Stored klines to measure (e.g. ../store/BTCPERP_1.parquet)")
+    args = parser.parse_args()
+
+    df = load_klines(args.klines) if args.klines else synthetic_klines(CANDLES)
+    forms = {
+        "loaded (int64 + float64)": df,
+        "pretty, dates as strings (before)": legacy_pretty(df),
+        "pretty, datetime64 (now)": format_klines(df.copy()),
+        "compact float64": compact_klines(df),
+        "compact float32 + symbol": compact_klines(df, symbol="BTCPERP", precision="float32"),
+    }
+
+    print(f"{len(df):,} candles, {', '.join(df.columns)}")
+    for name, frame in forms.items():
+        # Bytes per candle are megabytes per million candles
+        megabytes = frame.memory_usage(deep=True).sum() / len(df)
+        print(f"{name:>34}: {megabytes:8.1f} MB per million candles")
+
+    # Precision of float32 on these prices
+    compact = forms["compact float32 + symbol"]
+    error = np.abs(compact["closePrice"].to_numpy(np.float64) - df["closePrice"].to_numpy()[::-1]).max()
+    print(f"Largest float32 error on closePrice: {error:.5f}")
+
+
+if __name__ == "__main__":
+    main()
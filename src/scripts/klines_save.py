@@ -12,7 +12,7 @@ from bybit.utils import ColorFormatter
 async def main() -> None:
     """Take the klines and saves them to a file."""
     schedule.every().friday.at("09:05", "Europe/Paris").do(
-        lambda: asyncio.ensure_future(fetcher.save_klines(dest="../store"))
+        lambda: asyncio.ensure_future(fetcher.save_klines(dest="../store", parallel=True))
     )
 
     while True:
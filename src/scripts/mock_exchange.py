@@ -0,0 +1,37 @@
+import argparse  # noqa: INP001
+import asyncio
+import sys
+
+sys.path.append("..")
+
+from bybit.mock_exchange import MOCK_LIMITS, MockExchange
+from bybit.store import load_klines
+from bybit.utils import ColorFormatter
+
+
+async def main() -> None:
+    """Serve the mock exchange until interrupted, point a Fetcher or a client at the printed endpoint."""
+    parser = argparse.ArgumentParser(description="Local stand-in for the Bybit v5 REST and WebSocket APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--klines", help="Klines driving the index price (e.g. ../store/BTCPERP_1.parquet)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response and push")
+    parser.add_argument("--rate", type=int, help="Requests per second of every endpoint class")
+    parser.add_argument("--tick", type=float, default=0.1, help="Seconds between two pushes of the streams")
+    args = parser.parse_args()
+
+    klines = load_klines(args.klines, columns=["closePrice"]) if args.klines else None
+    limits = dict.fromkeys(MOCK_LIMITS, args.rate) if args.rate else None
+    exchange = MockExchange(klines=klines, latency=args.latency, limits=limits, tickInterval=args.tick)
+
+    url = await exchange.start(args.host, args.port)
+    exchange.logger.info(f"Point the fetcher or the clients at it: BybitClient(endpoint='{url}')")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await exchange.stop()
+
+
+if __name__ == "__main__":
+    ColorFormatter.configure_logging(verbose=1, run_name="mock_exchange.log")
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+import argparse  # noqa: INP001
+import asyncio
+import sys
+import time
+
+sys.path.append("..")
+
+from bybit.api_fetcher import Fetcher
+from bybit.recorder import TickRecorder
+from bybit.utils import ColorFormatter
+
+
+async def main() -> None:
+    """Record the tickers (and order books) of some symbols to hourly zstd logs, until interrupted."""
+    parser = argparse.ArgumentParser(description="Record the raw WebSocket messages of the fetcher")
+    parser.add_argument("--dest", default="../store/ticks", help="Folder of the logs")
+    parser.add_argument("--spot", nargs="*", default=["BTCUSDC"], help="Spot symbols")
+    parser.add_argument("--linear", nargs="*", default=["BTCPERP"], help="Linear symbols")
+    parser.add_argument("--orderbook", type=int, default=0, help="Depth of the order books to record, 0 for none")
+    parser.add_argument("--duration", type=float, default=0.0, help="Seconds to record, 0 until interrupted")
+    parser.add_argument("--every", type=float, default=60.0, help="Seconds between two logs of the counters")
+    parser.add_argument("--endpoint", help="Server to record from (e.g. a MockExchange)")
+    args = parser.parse_args()
+
+    fetcher = Fetcher(demo=True, endpoint=args.endpoint)
+    recorder = TickRecorder(args.dest)
+    recorder.start()
+    # Every message of the sockets goes to the recorder, the subscribers only keep the topics open
+    fetcher.sockets.tap(recorder.record)
+
+    def ignore(_: object) -> None:
+        return None
+
+    streams = [("spot", symbol) for symbol in args.spot] + [("linear", symbol) for symbol in args.linear]
+    await fetcher.sockets.ticker_streams([(channel, symbol, ignore) for channel, symbol in streams])
+    if args.orderbook:
+        for channel, symbol in streams:
+            await asyncio.to_thread(
+                fetcher.sockets.subscribe, channel, f"orderbook.{args.orderbook}.{{symbol}}", ignore, symbol
+            )
+
+    start = time.perf_counter()
+    try:
+        while not args.duration or (remaining := args.duration - (time.perf_counter() - start)) > 0:
+            await asyncio.sleep(min(args.every, remaining) if args.duration else args.every)
+            recorder.logger.info(f"Tick recorder: {recorder.stats()}")
+    finally:
+        fetcher.sockets.untap(recorder.record)
+        fetcher.close_websockets()
+        recorder.close()
+        await fetcher.close()
+
+    stats = recorder.stats()
+    elapsed = time.perf_counter() - start
+    print(f"{stats['written']:,} messages in {elapsed:.1f} s ({stats['written'] / elapsed:,.0f}/s)")
+    print(f"{stats['dropped']:,} dropped, {stats['bytes'] / max(1, stats['written']):.1f} compressed bytes each")
+
+
+if __name__ == "__main__":
+    ColorFormatter.configure_logging(verbose=1, run_name="record_ticks.log")
+    asyncio.run(main())
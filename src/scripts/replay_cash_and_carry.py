@@ -0,0 +1,86 @@
+import argparse  # noqa: INP001
+import asyncio
+import re
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append("..")
+
+from bybit.backtest import FUTURE_PATTERN, delivery_time
+from bybit.client import UlysseSpotFut
+from bybit.replay import ReplayEngine, TickTape, split_spot
+from bybit.store import KlineStore
+from bybit.utils import ColorFormatter
+
+
+async def replay(engine: ReplayEngine, long: str, futures: list[str], quantity: float, gap: float) -> list[dict]:
+    """Roll the client over the futures, in delivery order, reinvesting the P&L of each round."""
+    client = UlysseSpotFut(fetcher=engine.fetcher)
+    rounds = []
+    for future in futures:
+        # Delivered while the previous round was held
+        if delivery_time(future) / 1000 <= engine.clock.now:
+            continue
+        result = await engine.run_round(client, f"{long} (Spot)", future, quantity, minimumGap=gap)
+        if result is not None:
+            rounds.append(result)
+            quantity += result["pnl"]
+    return rounds
+
+
+def main() -> None:
+    """Replay the ticks of the kline store through UlysseSpotFut, and print its rounds, throughput and P&L."""
+    parser = argparse.ArgumentParser(description="Tick replay of the cash-and-carry client over the kline store")
+    parser.add_argument("--dest", default="../store", help="Root of the kline store")
+    parser.add_argument("--coin", default="BTC")
+    parser.add_argument("--long", help="Spot long leg, the USDT spot if not given")
+    parser.add_argument("--futures", nargs="*", help="Dated futures to roll over, all the stored ones if not given")
+    parser.add_argument("--start", help="First date (DD/MM/YYYY)")
+    parser.add_argument("--end", help="Last date (DD/MM/YYYY)")
+    parser.add_argument("--gap", type=float, default=-0.2, help="Minimum gap in percent to enter")
+    parser.add_argument("--quantity", type=float, default=10_000.0, help="Balance of the first round")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds between an order and its fill")
+    parser.add_argument("--slippage", type=float, default=2.0, help="Slippage of each fill, in basis points")
+    args = parser.parse_args()
+
+    long = args.long or f"{args.coin}USDT"
+    pattern = re.compile(FUTURE_PATTERN.format(coin=args.coin))
+    futures = args.futures or [
+        product
+        for product, _, category in KlineStore(args.dest).datasets()
+        if category == "linear" and pattern.match(product)
+    ]
+    futures = sorted(set(futures), key=delivery_time)
+
+    start = time.perf_counter()
+    tape = TickTape.from_store(
+        [("spot", long)] + [("linear", future) for future in futures], args.dest, start=args.start, end=args.end
+    )
+    print(f"{len(tape):,} ticks of {len(futures)} futures, loaded in {time.perf_counter() - start:.2f} s")
+
+    engine = ReplayEngine(
+        tape,
+        latency=args.latency,
+        slippage=args.slippage / 10_000,
+        wallet={split_spot(long)[1]: args.quantity},
+    )
+    # A round needs the delivery of its future on the tape
+    delivered = [future for future in futures if delivery_time(future) / 1000 <= tape.times[-1]]
+    rounds = pd.DataFrame(asyncio.run(replay(engine, long, delivered, args.quantity, args.gap)))
+    if not rounds.empty:
+        # Dates are only formatted here
+        for column in ["entry", "exit"]:
+            rounds[column] = pd.to_datetime(rounds[column], unit="s")
+        print(rounds.round(4).to_string())
+
+    report = engine.report()
+    report["pnl"] = report["equity"] - args.quantity
+    for name, value in report.items():
+        print(f"{name:>15}: {value:,.4f}")
+
+
+if __name__ == "__main__":
+    ColorFormatter.configure_logging(verbose=1, run_name="replay.log")
+    main()
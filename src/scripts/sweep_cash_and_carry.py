@@ -0,0 +1,63 @@
+import argparse  # noqa: INP001
+import csv
+import sys
+import time
+
+sys.path.append("..")
+
+from bybit.backtest import SELECTORS, CashAndCarry
+from bybit.sweep import grid, random_samples, sweep
+from bybit.utils import ColorFormatter
+
+
+def main() -> None:
+    """Sweep the thresholds of the cash-and-carry backtest, stream the results into a CSV, and print the best."""
+    parser = argparse.ArgumentParser(description="Parameter sweep of the cash-and-carry backtest")
+    parser.add_argument("--dest", default="../store", help="Root of the kline store")
+    parser.add_argument("--long", help="Perpetual long leg (e.g. BTCPERP), the USDT spot if not given")
+    parser.add_argument("--start", help="First date (DD/MM/YYYY)")
+    parser.add_argument("--end", help="Last date (DD/MM/YYYY)")
+    parser.add_argument("--gaps", type=float, nargs="+", default=[0.0, 0.2, 0.4, 0.6, 0.8, 1.0])
+    parser.add_argument("--selectors", nargs="+", choices=SELECTORS, default=SELECTORS)
+    parser.add_argument("--max-days", type=float, nargs="+", default=[15, 25, 40, 60, 90])
+    parser.add_argument("--leverages", type=int, nargs="+", default=[1, 2])
+    parser.add_argument("--random", type=int, help="Draw this many samples in the ranges of the lists instead")
+    parser.add_argument("--workers", type=int, help="Number of processes, one per core by default")
+    parser.add_argument("--rank-by", default="apr", help="Column of the summary to rank on")
+    parser.add_argument("--output", default="sweep.csv", help="CSV receiving the results as they arrive")
+    args = parser.parse_args()
+
+    if args.random:
+        samples = random_samples(
+            args.random,
+            minimumGap=(min(args.gaps), max(args.gaps)),
+            selector=args.selectors,
+            maxDays=(min(args.max_days), max(args.max_days)),
+            leverage=args.leverages,
+        )
+    else:
+        samples = grid(minimumGap=args.gaps, selector=args.selectors, maxDays=args.max_days, leverage=args.leverages)
+
+    backtest = CashAndCarry.from_store(args.dest, long=args.long, start=args.start, end=args.end)
+
+    with open(args.output, "w", newline="") as f:  # noqa: PTH123
+        writer = None
+
+        def stream(result: dict) -> None:
+            nonlocal writer
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(result))
+                writer.writeheader()
+            writer.writerow(result)
+            f.flush()
+
+        start = time.perf_counter()
+        results = sweep(backtest, samples, workers=args.workers, rankBy=args.rank_by, onResult=stream)
+
+    print(f"{len(samples)} runs in {time.perf_counter() - start:.2f} s, streamed into {args.output}")
+    print(results.head(10).round(4).to_string())
+
+
+if __name__ == "__main__":
+    ColorFormatter.configure_logging(verbose=1, run_name="sweep.log")
+    main()